@@ -9,13 +9,23 @@ from rest_framework.viewsets import ViewSet
 
 from api.serialisers.games import GameCreationSerialiser, GameSerialiser, PlayerSerialiser
 from core.models import DM, Game, Player
-from core.utils.sanctions import check_discord_user_good_standing
 from core.utils.players import populate_game_from_waitlist
-from core.utils.user import get_user_available_credit, user_in_game
-from core.utils.user import user_on_dm_banlist, user_signup_permissions_valid
-from core.utils.games import game_has_player_by_discord_id, player_dropout_permitted
+from core.utils.user import user_in_game
+from core.utils.games import player_dropout_permitted
+from core.utils.signups import Eligibility, get_signup_eligibility
 from core.utils.games_rework import add_user_to_game, remove_user_from_game
 
+# Response codes returned when a signup is refused, for each reason
+SIGNUP_REFUSAL_STATUS = {
+    Eligibility.IS_DM: HTTP_400_BAD_REQUEST,
+    Eligibility.ALREADY_JOINED: HTTP_400_BAD_REQUEST,
+    Eligibility.BANNED: HTTP_403_FORBIDDEN,
+    Eligibility.NOT_RELEASED: HTTP_200_OK,
+    Eligibility.DM_BANLISTED: HTTP_401_UNAUTHORIZED,
+    Eligibility.NO_CREDIT: HTTP_401_UNAUTHORIZED,
+    Eligibility.LOTTERY_PENDING: HTTP_400_BAD_REQUEST,
+}
+
 
 class GamesViewSet(ViewSet):
     """Views for game objects"""
@@ -30,29 +40,20 @@ class GamesViewSet(ViewSet):
         except Game.DoesNotExist:
             return Response({"message": "Invalid game ID"}, HTTP_400_BAD_REQUEST)
 
-        if game.dm.user == request.user:
-            return Response({"message": "You cannot play in your own game"}, HTTP_400_BAD_REQUEST)
-        if game_has_player_by_discord_id(game, request.user.discord_id):
-            return Response({"message": "You are already in this game"}, HTTP_400_BAD_REQUEST)
-        if not check_discord_user_good_standing(request.user.discord_id):
-            return Response({"message": "You are currently banned from using this system"}, HTTP_403_FORBIDDEN)
-
-        if not user_signup_permissions_valid(request.user, game):
-            return Response({"message": "You lack the roles needed to sign up to this game"})
-        if user_on_dm_banlist(request.user, game.dm):
-            return Response({"message": "You may not sign up to games run by this DM"}, HTTP_401_UNAUTHORIZED)
-
-        available_credit = get_user_available_credit(request.user)
-        if not available_credit > 0:
-            return Response({"message": "You do not have any available credits"}, HTTP_401_UNAUTHORIZED)
+        verdict = get_signup_eligibility(request.user, game)
+        if not verdict:
+            return Response({"message": str(verdict)}, SIGNUP_REFUSAL_STATUS[verdict.reason])
         # Ensure that any waitlisted players get priority
         populate_game_from_waitlist(game)
-        player = add_user_to_game(request.user, game)
+        player = add_user_to_game(request.user, game, check_release=True)
         if player:
             serialiser = PlayerSerialiser(player)
             return Response(serialiser.data, HTTP_200_OK)
-        else:
-            return Response({"message": "Unable to add you to this game"}, HTTP_500_INTERNAL_SERVER_ERROR)
+        # Eligibility is checked again under the signup lock, and may have changed since the check above
+        verdict = get_signup_eligibility(request.user, game)
+        if not verdict:
+            return Response({"message": str(verdict)}, SIGNUP_REFUSAL_STATUS[verdict.reason])
+        return Response({"message": "Unable to add you to this game"}, HTTP_500_INTERNAL_SERVER_ERROR)
 
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
     def drop(self, request, pk):
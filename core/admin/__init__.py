@@ -2,7 +2,7 @@ from django.contrib import admin
 
 from core.models import DM, CustomUser, Game, GameChannel, GameChannelMember
 from core.models import BonusCredit, Rank, Player, Strike, Ban, Announcement
-from core.models import DMBanList
+from core.models import DMBanList, GamePosting, PostingChannel, CalendarPosting
 
 from core.admin.admin_players import PlayerAdmin
 from core.admin.admin_channels import ChannelAdmin, ChannelMemberAdmin
@@ -13,6 +13,9 @@ admin.site.register(DMBanList)
 admin.site.register(Game)
 admin.site.register(GameChannel, ChannelAdmin)
 admin.site.register(GameChannelMember, ChannelMemberAdmin)
+admin.site.register(GamePosting)
+admin.site.register(PostingChannel)
+admin.site.register(CalendarPosting)
 
 admin.site.register(Player, PlayerAdmin)
 admin.site.register(BonusCredit)
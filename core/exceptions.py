@@ -1,2 +1,6 @@
 class GameCreditException(Exception):
     pass
+
+
+class LotteryException(Exception):
+    pass
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.1 on 2026-10-18 08:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0044_remove_dm_core_dm_name_84ef8b_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GamePosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel_id', models.CharField(help_text='Discord ID of the channel the game was posted to', max_length=32)),
+                ('message_id', models.CharField(help_text='Discord ID of the announcement message', max_length=32)),
+                ('jump_url', models.URLField(blank=True, help_text='Link to the announcement message on discord', null=True)),
+                ('datetime_posted', models.DateTimeField(default=django.utils.timezone.now, help_text='Date/Time the announcement was made')),
+                ('digest', models.CharField(blank=True, default='', help_text='Digest of the most recently rendered announcement', max_length=64)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='core.game')),
+            ],
+            options={
+                'indexes': [models.Index(models.F('game'), name='gameposting_game_idx'), models.Index(models.F('channel_id'), name='gameposting_channel_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0045_gameposting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incremented whenever the game or its players are changed'),
+        ),
+    ]
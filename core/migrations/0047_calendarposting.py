@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-18 08:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0046_game_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel_id', models.CharField(help_text='Discord ID of the calendar channel', max_length=32, unique=True)),
+                ('message_id', models.CharField(help_text='Discord ID of the calendar message', max_length=32)),
+                ('digest', models.CharField(blank=True, default='', help_text='Digest of the most recently rendered calendar', max_length=64)),
+                ('datetime_updated', models.DateTimeField(default=django.utils.timezone.now, help_text='Date/Time the calendar was last edited')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0047_calendarposting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamechannel',
+            name='membership_dirty',
+            field=models.BooleanField(default=False, help_text='Membership has changed and needs to be applied to the discord channel'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0048_gamechannel_membership_dirty'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamechannel',
+            name='message_id',
+            field=models.CharField(blank=True, help_text='Discord ID of the mustering banner message', max_length=32, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-18 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0049_gamechannel_message_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lottery',
+            name='tickets_sold',
+            field=models.IntegerField(default=0, help_text='Number of tickets purchased so far'),
+        ),
+        migrations.AddIndex(
+            model_name='lotteryticket',
+            index=models.Index(fields=['lottery', 'user'], name='core_lotter_lottery_68d3c3_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='lottery',
+            constraint=models.CheckConstraint(condition=models.Q(('tickets_sold__gte', 0), ('tickets_sold__lte', models.F('max_tickets'))), name='lottery_tickets_within_limit'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-18 09:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0050_lottery_tickets_sold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCreditBalance',
+            fields=[
+                ('discord_id', models.CharField(help_text='Discord ID of player', max_length=32, primary_key=True, serialize=False)),
+                ('rank_games', models.IntegerField(default=0, help_text="Games allowed by the player's highest rank")),
+                ('bonus_games', models.IntegerField(default=0, help_text='Bonus games currently valid')),
+                ('pending_games', models.IntegerField(default=0, help_text='Games signed up to which have not yet started')),
+                ('valid_until', models.DateTimeField(blank=True, help_text='When a pending game starts or a bonus expires, so the balance must be recalculated', null=True)),
+                ('datetime_calculated', models.DateTimeField(blank=True, help_text='Last full calculation of the balance', null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-18 09:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0051_usercreditbalance'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='credit',
+            name='target_type',
+            field=models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype'),
+        ),
+        migrations.AddIndex(
+            model_name='credit',
+            index=models.Index(fields=['target_type', 'target_id'], name='core_credit_target__20bd74_idx'),
+        ),
+    ]
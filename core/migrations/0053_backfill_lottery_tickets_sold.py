@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:02
+
+from django.db import migrations
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Least
+
+
+def backfill_tickets_sold(apps, schema_editor):
+    Lottery = apps.get_model("core", "lottery")
+    LotteryTicket = apps.get_model("core", "lotteryticket")
+    sold = LotteryTicket.objects.filter(lottery=OuterRef("pk")).values("lottery")
+    sold = sold.annotate(total=Count("pk")).values("total")
+    # Lotteries oversold before tickets were counted are treated as sold out
+    Lottery.objects.update(tickets_sold=Least(Coalesce(Subquery(sold), Value(0)), F("max_tickets")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0052_credit_target_nullable'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_tickets_sold, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:17
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0053_backfill_lottery_tickets_sold'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='gameposting',
+            name='digest',
+        ),
+    ]
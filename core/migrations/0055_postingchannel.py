@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0054_remove_gameposting_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostingChannel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel_id', models.CharField(help_text='Discord ID of the signup channel', max_length=32, unique=True)),
+                ('datetime_adopted', models.DateTimeField(default=django.utils.timezone.now, help_text="Date/Time the channel's message history was scanned")),
+            ],
+        ),
+    ]
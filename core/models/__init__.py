@@ -7,3 +7,4 @@ from .game import *
 from .players import *
 from .announce import *
 from .lottery import *
+from .posting import *
@@ -19,6 +19,9 @@ class GameChannel(models.Model):
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="text_channel")
     discord_id = models.CharField(null=True, blank=True, max_length=32, help_text="Discord channel ID")
     link = models.URLField(null=True, blank=True, help_text="Link to the channel on discord")
+    message_id = models.CharField(
+        null=True, blank=True, max_length=32, help_text="Discord ID of the mustering banner message"
+    )
     name = models.CharField(blank=False, max_length=64, default="Unnamed game")
     status = models.TextField(
         choices=ChannelStatuses.choices,
@@ -26,6 +29,9 @@ class GameChannel(models.Model):
         default=ChannelStatuses.READY,
         help_text="Status of the channel",
     )
+    membership_dirty = models.BooleanField(
+        default=False, help_text="Membership has changed and needs to be applied to the discord channel"
+    )
 
     members = models.ManyToManyField(CustomUser, related_name="game_channels", through="gamechannelmember")
 
@@ -12,7 +12,7 @@ class Credit(models.Model):
     origin = models.CharField(max_length=32, blank=True, null=True)
     locked = models.BooleanField(default=False, help_text="User prevented from modifying")
 
-    target_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, default=None, blank=True)
+    target_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, default=None, blank=True, null=True)
     target_id = models.PositiveIntegerField(blank=True, null=True)
     target = GenericForeignKey("target_type", "target_id")
 
@@ -21,10 +21,13 @@ class Credit(models.Model):
     datetime_expiry = models.DateTimeField(blank=True, null=True, help_text="When the credit becomes unspendable")
 
     def __str__(self):
-        return f"Credit - {self.owner.discord_name}{' (unspent)' if self.available else ''}"
+        return f"Credit - {self.owner.discord_name}{' (unspent)' if not self.datetime_spent else ''}"
 
     class Meta:
-        indexes = [models.Index(fields=["owner", "locked", "origin", "datetime_expiry", "datetime_spent"])]
+        indexes = [
+            models.Index(fields=["owner", "locked", "origin", "datetime_expiry", "datetime_spent"]),
+            models.Index(fields=["target_type", "target_id"]),
+        ]
 
 
 class PrioritySeat(models.Model):
@@ -79,6 +79,9 @@ class Game(models.Model):
     datetime = models.DateTimeField(help_text="Date/Time game is starting (UTC)", verbose_name="Game Time")
     duration = models.IntegerField(default=4, null=True, help_text="Planned duration of game (hours)")
     ready = models.BooleanField(default=True, help_text="Game is ready for release")
+    version = models.PositiveIntegerField(
+        default=0, editable=False, help_text="Incremented whenever the game or its players are changed"
+    )
 
     def __str__(self):
         return f"{self.datetime.date()} | {self.dm.user.discord_name} - {self.name}"
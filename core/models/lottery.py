@@ -24,6 +24,15 @@ class Lottery(models.Model):
         verbose_name="Lottery opening date/time",
     )
     draw_done = models.BooleanField(default=False)
+    tickets_sold = models.IntegerField(default=0, help_text="Number of tickets purchased so far")
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(tickets_sold__gte=0, tickets_sold__lte=models.F("max_tickets")),
+                name="lottery_tickets_within_limit",
+            )
+        ]
 
     def __str__(self):
         retval = f"{self.game.name} - [{self.max_tickets}]"
@@ -33,5 +42,10 @@ class Lottery(models.Model):
 
 
 class LotteryTicket(models.Model):
+    """A single entry in a lottery, each ticket held adds to the owner's chance of being drawn"""
+
     lottery = models.ForeignKey(Lottery, null=True, blank=True, related_name="tickets", on_delete=models.SET_NULL)
     user = models.ForeignKey(CustomUser, null=True, help_text="Owner of this lottery ticket", on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [models.Index(fields=["lottery", "user"])]
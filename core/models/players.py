@@ -26,6 +26,32 @@ class BonusCredit(models.Model):
         indexes = [models.Index(fields=["discord_id", "expires"])]
 
 
+class UserCreditBalance(models.Model):
+    """Stored game credit balance for a player, kept up to date as they sign up, drop out and are awarded credits"""
+
+    discord_id = models.CharField(primary_key=True, max_length=32, help_text="Discord ID of player")
+    rank_games = models.IntegerField(default=0, help_text="Games allowed by the player's highest rank")
+    bonus_games = models.IntegerField(default=0, help_text="Bonus games currently valid")
+    pending_games = models.IntegerField(default=0, help_text="Games signed up to which have not yet started")
+    valid_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When a pending game starts or a bonus expires, so the balance must be recalculated",
+    )
+    datetime_calculated = models.DateTimeField(null=True, blank=True, help_text="Last full calculation of the balance")
+
+    @property
+    def max_games(self) -> int:
+        return self.rank_games + self.bonus_games
+
+    @property
+    def available(self) -> int:
+        return self.max_games - self.pending_games
+
+    def __str__(self):
+        return f"{self.discord_id} ({self.available} / {self.max_games})"
+
+
 class Player(models.Model):
     """Specifies a player within a specific game"""
 
@@ -0,0 +1,49 @@
+from django.db import models
+from django.utils import timezone
+
+from .game import Game
+
+
+class GamePosting(models.Model):
+    """Record of a game announcement posted to one of the signup channels"""
+
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="postings")
+    channel_id = models.CharField(max_length=32, help_text="Discord ID of the channel the game was posted to")
+    message_id = models.CharField(max_length=32, help_text="Discord ID of the announcement message")
+    jump_url = models.URLField(null=True, blank=True, help_text="Link to the announcement message on discord")
+    datetime_posted = models.DateTimeField(default=timezone.now, help_text="Date/Time the announcement was made")
+
+    class Meta:
+        indexes = [
+            models.Index("game", name="gameposting_game_idx"),
+            models.Index("channel_id", name="gameposting_channel_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.game.name} [{self.channel_id}/{self.message_id}]"
+
+
+class PostingChannel(models.Model):
+    """Record of a signup channel whose announcements have been adopted from its message history"""
+
+    channel_id = models.CharField(max_length=32, unique=True, help_text="Discord ID of the signup channel")
+    datetime_adopted = models.DateTimeField(
+        default=timezone.now, help_text="Date/Time the channel's message history was scanned"
+    )
+
+    def __str__(self):
+        return f"Posting channel [{self.channel_id}]"
+
+
+class CalendarPosting(models.Model):
+    """Record of the upcoming games calendar message maintained in a channel"""
+
+    channel_id = models.CharField(max_length=32, unique=True, help_text="Discord ID of the calendar channel")
+    message_id = models.CharField(max_length=32, help_text="Discord ID of the calendar message")
+    digest = models.CharField(
+        max_length=64, blank=True, default="", help_text="Digest of the most recently rendered calendar"
+    )
+    datetime_updated = models.DateTimeField(default=timezone.now, help_text="Date/Time the calendar was last edited")
+
+    def __str__(self):
+        return f"Calendar [{self.channel_id}/{self.message_id}]"
@@ -0,0 +1,154 @@
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.db.models import F
+from django.dispatch import receiver
+
+from core.models import Game, Player, DM, GameChannel, GameChannelMember, CustomUser, Rank, BonusCredit
+from core.utils.games import bump_game_version, bump_dm_game_versions
+from core.utils.channel_members import mark_channel_membership_changed
+from core.utils.balances import adjust_pending_games, adjust_bonus_games, invalidate_credit_balances
+from core.utils.ranks import rank_index
+
+
+# ########################################################################## #
+@receiver(pre_save, sender=Game)
+def game_version_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Increment the version of a game in the statement that saves it, so that a stale value is never written back"""
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and "version" not in update_fields:
+        return
+    instance.version = F("version") + 1
+
+
+@receiver(post_save, sender=Game)
+def game_version_post_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Partial saves don't write the version field, so increment it separately"""
+    if raw:
+        return
+    if update_fields is not None and "version" not in update_fields:
+        bump_game_version(instance.pk)
+    elif hasattr(instance.__dict__.get("version"), "resolve_expression"):
+        # The new version is only known to the database, so it is loaded again if it is needed
+        del instance.version
+
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+def player_changed(sender, instance, raw=False, **kwargs):
+    """Any change to a game's players or waitlist changes how it is displayed"""
+    if raw:
+        return
+    bump_game_version(instance.game_id)
+
+
+# ########################################################################## #
+@receiver(post_init, sender=Game)
+def game_time_loaded(sender, instance, **kwargs):
+    """Remember the game time as it was loaded, so that saves can tell if it has been changed"""
+    instance._loaded_datetime = instance.__dict__.get("datetime")
+
+
+@receiver(post_save, sender=Game)
+def game_time_changed(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    """The game time decides whether a game counts against each of its players' credit"""
+    if raw or created:
+        return
+    if update_fields is not None and "datetime" not in update_fields:
+        return
+    if instance.datetime == instance._loaded_datetime:
+        return
+    instance._loaded_datetime = instance.datetime
+    invalidate_credit_balances(*instance.players.values_list("discord_id", flat=True))
+
+
+@receiver(post_save, sender=Player)
+def player_created(sender, instance, raw=False, created=False, **kwargs):
+    """A signup uses one of the player's credits until the game starts"""
+    if raw or not created:
+        return
+    adjust_pending_games(instance.discord_id, 1, instance.game_id)
+
+
+@receiver(post_delete, sender=Player)
+def player_deleted(sender, instance, **kwargs):
+    """Dropping out of a game that hasn't started returns the credit"""
+    adjust_pending_games(instance.discord_id, -1, instance.game_id)
+
+
+@receiver(post_save, sender=BonusCredit)
+def bonus_credit_saved(sender, instance, raw=False, created=False, **kwargs):
+    """Add newly issued bonus credits to the player's balance, edited ones require a recalculation"""
+    if raw:
+        return
+    if created:
+        adjust_bonus_games(instance.discord_id, instance.credits, instance.expires)
+    else:
+        invalidate_credit_balances(instance.discord_id)
+
+
+@receiver(post_delete, sender=BonusCredit)
+def bonus_credit_deleted(sender, instance, **kwargs):
+    invalidate_credit_balances(instance.discord_id)
+
+
+@receiver(post_save, sender=Rank)
+@receiver(pre_delete, sender=Rank)
+def rank_balances_changed(sender, instance, raw=False, **kwargs):
+    """The number of games allowed by a rank applies to everyone holding it"""
+    if raw:
+        return
+    invalidate_credit_balances(*instance.users.values_list("discord_id", flat=True))
+
+
+@receiver(post_save, sender=Rank)
+@receiver(post_delete, sender=Rank)
+def rank_index_changed(sender, instance, **kwargs):
+    """Reload the rank index after any change to the ranks"""
+    rank_index.invalidate()
+
+
+@receiver(m2m_changed, sender=CustomUser.ranks.through)
+def user_ranks_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Recalculate balances when users gain or lose ranks"""
+    if action == "pre_clear" and reverse:
+        # Clearing a rank's users doesn't say who they were, so note them before they are removed
+        instance._cleared_discord_ids = list(instance.users.values_list("discord_id", flat=True))
+    if action not in ["post_add", "post_remove", "post_clear"]:
+        return
+    if not reverse:
+        invalidate_credit_balances(instance.discord_id)
+    elif action == "post_clear":
+        invalidate_credit_balances(*getattr(instance, "_cleared_discord_ids", []))
+    elif pk_set:
+        invalidate_credit_balances(*CustomUser.objects.filter(pk__in=pk_set).values_list("discord_id", flat=True))
+
+
+@receiver(post_save, sender=DM)
+def dm_changed(sender, instance, raw=False, created=False, **kwargs):
+    """DM details are shown on the game and mustering embeds"""
+    if raw or created:
+        return
+    bump_dm_game_versions(instance.pk)
+
+
+# ########################################################################## #
+@receiver(post_save, sender=GameChannelMember)
+@receiver(post_delete, sender=GameChannelMember)
+def channel_member_changed(sender, instance, raw=False, **kwargs):
+    """Flag a channel for a membership sync when one of its members is changed"""
+    if raw:
+        return
+    mark_channel_membership_changed(instance.channel_id)
+
+
+@receiver(m2m_changed, sender=GameChannel.members.through)
+def channel_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Flag channels for a membership sync when members are added or removed in bulk"""
+    if action not in ["post_add", "post_remove", "post_clear"]:
+        return
+    if not reverse:
+        # keep the instance in step, so that saving it afterwards doesn't clear the flag
+        instance.membership_dirty = True
+        mark_channel_membership_changed(instance.pk)
+    elif pk_set:
+        mark_channel_membership_changed(*pk_set)
@@ -0,0 +1,95 @@
+"""
+Credit ledger benchmarks for users holding large numbers of credits, skipped unless CREDIT_BENCHMARK is set
+
+    CREDIT_BENCHMARK=1 python -m pytest -s core/tests/benchmarks
+
+Runs against the configured database, set DJANGO_SECRET and DB_HOST/DB_NAME/DB_USER/DB_PASS to use a local Postgres.
+The number of credits held can be changed with CREDIT_BENCHMARK_CREDITS (default 500).
+"""
+
+from datetime import timedelta
+from os import getenv
+from statistics import quantiles
+from time import perf_counter
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Credit, CustomUser, Game
+from core.utils.credits import spend_user_credit_on_game, refund_user_credit_for_game, get_user_credit_balance
+
+CREDITS_HELD = int(getenv("CREDIT_BENCHMARK_CREDITS", "500"))
+ROUNDS = 50
+
+
+def summarise(name: str, latencies: list[float], queries: list[int]) -> str:
+    """Percentile latencies and queries per call"""
+    centiles = quantiles(latencies, n=100)
+    return (
+        f"{name} [{connection.vendor}, {CREDITS_HELD} credits, {len(latencies)} calls]: "
+        f"p50 {centiles[49] * 1000:.2f}ms, p95 {centiles[94] * 1000:.2f}ms, p99 {centiles[98] * 1000:.2f}ms, "
+        f"{sum(queries) / len(queries):.1f} queries per call"
+    )
+
+
+@skipUnless(getenv("CREDIT_BENCHMARK"), "Set CREDIT_BENCHMARK to run the credit ledger benchmarks")
+class TestCreditSpend(TransactionTestCase):
+    """Spending, refunding and summarising credits for a user with a large ledger"""
+
+    fixtures = ["test_dms", "test_games", "test_users", "test_ranks"]
+
+    def setUp(self) -> None:
+        now = timezone.now()
+        self.user = CustomUser.objects.get(pk=1)
+        self.game = Game.objects.get(pk=1)
+        # a realistic mix of expiring, permanent, expired and locked credits
+        Credit.objects.bulk_create(
+            [
+                Credit(
+                    owner=self.user,
+                    datetime_expiry=now + timedelta(days=i % 90 - 10) if i % 3 else None,
+                    locked=not i % 17,
+                )
+                for i in range(CREDITS_HELD)
+            ]
+        )
+
+    def measure(self, function, *args) -> tuple[float, int]:
+        """Time a call, returning its duration and the number of queries it made"""
+        with CaptureQueriesContext(connection) as captured:
+            started = perf_counter()
+            function(*args)
+            elapsed = perf_counter() - started
+        return elapsed, len(captured)
+
+    def test_spend_and_refund(self) -> None:
+        """Repeatedly spend credits on a game and refund them, as a player signing up and dropping out would"""
+        spends, spend_queries, refunds, refund_queries = [], [], [], []
+        available = get_user_credit_balance(self.user)["available"]
+
+        for _ in range(ROUNDS):
+            elapsed, queries = self.measure(spend_user_credit_on_game, self.user, self.game, 2)
+            spends.append(elapsed)
+            spend_queries.append(queries)
+            elapsed, queries = self.measure(refund_user_credit_for_game, self.user.pk, self.game.pk)
+            refunds.append(elapsed)
+            refund_queries.append(queries)
+
+        print(summarise("spend_user_credit_on_game", spends, spend_queries))
+        print(summarise("refund_user_credit_for_game", refunds, refund_queries))
+        # The number of queries does not depend on the number of credits held or spent
+        self.assertEqual(len(set(spend_queries[1:])), 1)
+        self.assertEqual(get_user_credit_balance(self.user)["available"], available)
+
+    def test_balance(self) -> None:
+        """Summarise the ledger"""
+        latencies, queries = [], []
+        for _ in range(ROUNDS):
+            elapsed, count = self.measure(get_user_credit_balance, self.user)
+            latencies.append(elapsed)
+            queries.append(count)
+        print(summarise("get_user_credit_balance", latencies, queries))
+        self.assertEqual(set(queries), {1})
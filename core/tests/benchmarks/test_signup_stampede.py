@@ -0,0 +1,214 @@
+"""
+Release stampede benchmarks for the signup path, skipped unless SIGNUP_BENCHMARK is set
+
+    SIGNUP_BENCHMARK=1 python -m pytest -s core/tests/benchmarks
+
+Runs against the configured database, set DJANGO_SECRET and DB_HOST/DB_NAME/DB_USER/DB_PASS to use a local Postgres.
+The number of members in each stampede can be changed with SIGNUP_BENCHMARK_MEMBERS (default 200).
+"""
+
+from asyncio import run, gather
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from os import getenv
+from statistics import quantiles
+from time import perf_counter
+from types import SimpleNamespace
+from unittest import skipUnless
+from unittest.mock import patch, AsyncMock
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.test import TransactionTestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import CustomUser, Game, Player, Rank
+from core.utils.games_rework import add_users_to_game, signup_lock_stats
+from discord_bot.utils.games import add_discord_member_to_game, add_discord_members_to_game
+from discord_bot.utils.players import async_do_waitlist_updates
+from discord_bot.utils.admission import SignupQueue
+from discord_bot.components.common import handle_player_dropout_event
+
+STAMPEDE_MEMBERS = int(getenv("SIGNUP_BENCHMARK_MEMBERS", "200"))
+PARTY_SIZE = 6
+# The in-memory SQLite test database cannot serve writers on several threads, so threaded runs need Postgres
+THREADS = 1 if connection.vendor == "sqlite" else 16
+
+
+class LatencyReport:
+    """Collect the latency and query count of each request made during a benchmark"""
+
+    def __init__(self, name: str):
+        """initialisation function"""
+        self.name = name
+        self.latencies = []
+        self.queries = []
+        self.lock_stats = dict(signup_lock_stats)
+
+    def record(self, latency: float, queries: int = None):
+        self.latencies.append(latency)
+        if queries is not None:
+            self.queries.append(queries)
+
+    def summary(self) -> str:
+        """Percentile latencies, queries per request and time spent waiting for signup locks"""
+        centiles = quantiles(self.latencies, n=100) if len(self.latencies) > 1 else self.latencies * 99
+        acquired = signup_lock_stats["acquired"] - self.lock_stats["acquired"]
+        lock_wait = signup_lock_stats["wait_total"] - self.lock_stats["wait_total"]
+        queries = f"{sum(self.queries) / len(self.queries):.1f} queries per request, " if self.queries else ""
+        return (
+            f"{self.name} [{connection.vendor}, {len(self.latencies)} requests]: "
+            f"p50 {centiles[49] * 1000:.1f}ms, p95 {centiles[94] * 1000:.1f}ms, p99 {centiles[98] * 1000:.1f}ms, "
+            f"{queries}{acquired} locks taken with {lock_wait * 1000:.1f}ms total wait "
+            f"(max {signup_lock_stats['wait_max'] * 1000:.1f}ms)"
+        )
+
+
+def get_member(user: CustomUser) -> SimpleNamespace:
+    """Fake discord member for a user"""
+    return SimpleNamespace(id=int(user.discord_id), name=user.username, roles=[], send=AsyncMock())
+
+
+def measure(function, *args):
+    """Call a synchronous function, returning its result, duration and the number of queries it made"""
+    with CaptureQueriesContext(connection) as captured:
+        started = perf_counter()
+        result = function(*args)
+        elapsed = perf_counter() - started
+    return result, elapsed, len(captured)
+
+
+@skipUnless(getenv("SIGNUP_BENCHMARK"), "Set SIGNUP_BENCHMARK to run the signup stampede benchmarks")
+@patch("discord_bot.utils.players.async_send_dm", new_callable=AsyncMock)
+@patch("discord_bot.components.common.async_send_dm", new_callable=AsyncMock)
+class TestSignupStampede(TransactionTestCase):
+    """Concurrent signups and dropouts for a single game at general release"""
+
+    fixtures = ["test_dms", "test_games", "test_users", "test_ranks"]
+
+    def setUp(self) -> None:
+        now = timezone.now()
+        self.game = Game.objects.get(pk=1)
+        self.game.datetime = now + timedelta(days=7)
+        self.game.datetime_open_release = now - timedelta(minutes=1)
+        self.game.max_players = PARTY_SIZE
+        self.game.save()
+
+        rank = Rank.objects.create(name="Benchmark", priority=1, max_games=STAMPEDE_MEMBERS)
+        CustomUser.objects.bulk_create(
+            [
+                CustomUser(username=f"stampede{i}", discord_id=str(900000000 + i), discord_name=f"stampede{i}")
+                for i in range(STAMPEDE_MEMBERS)
+            ]
+        )
+        self.users = list(CustomUser.objects.filter(username__startswith="stampede").order_by("pk"))
+        rank.users.add(*self.users)
+
+    def assert_signup_invariants(self, expected: int, gap_free: bool = True) -> None:
+        """Everyone admitted, no overbooking, no duplicate players, and a waitlist that follows arrival order"""
+        players = list(Player.objects.filter(game=self.game).order_by("pk"))
+        self.assertEqual(len(players), expected, "Signups lost")
+        party = [player for player in players if not player.standby]
+        waitlist = [player for player in players if player.standby]
+
+        self.assertLessEqual(len(party), PARTY_SIZE)
+        if waitlist:
+            self.assertEqual(len(party), PARTY_SIZE, "Waitlisted players left waiting with seats free")
+        self.assertEqual(len(players), len(set(player.user_id for player in players)), "Duplicate players")
+
+        positions = [player.waitlist for player in players if player.waitlist]
+        self.assertEqual(positions, sorted(positions), "Waitlist positions out of arrival order")
+        self.assertEqual(len(positions), len(set(positions)), "Duplicate waitlist positions")
+        if gap_free and positions:
+            self.assertEqual(positions, list(range(positions[0], positions[0] + len(positions))), "Waitlist gaps")
+
+    def test_bot_signup_stampede(self, *mocks) -> None:
+        """Every member presses Signup at once, each signup making its own trip to the database thread"""
+        report = LatencyReport("add_discord_member_to_game")
+
+        async def signup(member):
+            started = perf_counter()
+            _, _, queries = await sync_to_async(measure)(add_discord_member_to_game, member, self.game)
+            report.record(perf_counter() - started, queries)
+
+        async def stampede():
+            await gather(*[signup(get_member(user)) for user in self.users])
+
+        run(stampede())
+        print(report.summary())
+        self.assert_signup_invariants(STAMPEDE_MEMBERS)
+
+    def test_queued_signup_stampede(self, *mocks) -> None:
+        """Every member presses Signup at once, with signups admitted through the per game queue"""
+        report = LatencyReport("signup queue")
+        batch_queries = []
+
+        async def admit(game, members):
+            # as admit_signups, measuring the queries made by the batch on the database thread
+            players, _, queries = await sync_to_async(measure)(add_discord_members_to_game, members, game)
+            batch_queries.append(queries)
+            if any(players):
+                await async_do_waitlist_updates(game)
+            return players
+
+        async def stampede():
+            queue = SignupQueue(admit)
+
+            async def signup(member):
+                started = perf_counter()
+                await queue.submit(self.game, member)
+                report.record(perf_counter() - started)
+
+            await gather(*[signup(get_member(user)) for user in self.users])
+
+        run(stampede())
+        report.queries = [sum(batch_queries) / len(self.users)] * len(self.users)
+        print(report.summary())
+        self.assert_signup_invariants(STAMPEDE_MEMBERS)
+
+    def test_api_join_stampede(self, *mocks) -> None:
+        """Every member joins through the web API at once"""
+        report = LatencyReport("GamesViewSet.join")
+        url = reverse("games-join", kwargs={"pk": self.game.pk})
+
+        def join(user):
+            client = Client()
+            client.force_login(user)
+            try:
+                response, elapsed, queries = measure(client.post, url)
+                report.record(elapsed, queries)
+                return response.status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            statuses = list(executor.map(join, self.users))
+        print(report.summary())
+        self.assertEqual(statuses.count(200), STAMPEDE_MEMBERS)
+        self.assert_signup_invariants(STAMPEDE_MEMBERS)
+
+    def test_dropout_churn(self, *mocks) -> None:
+        """Half of a full party drops out while the rest of the stampede signs up"""
+        report = LatencyReport("handle_player_dropout_event")
+        add_users_to_game(self.users[: PARTY_SIZE * 2], self.game)
+        leaving = [get_member(user) for user in self.users[: PARTY_SIZE // 2]]
+        joining = [get_member(user) for user in self.users[PARTY_SIZE * 2 :]]
+
+        async def dropout(member):
+            started = perf_counter()
+            await handle_player_dropout_event(self.game, member)
+            report.record(perf_counter() - started)
+
+        async def signup(member):
+            await sync_to_async(add_discord_member_to_game)(member, self.game)
+
+        async def churn():
+            await gather(*[dropout(member) for member in leaving], *[signup(member) for member in joining])
+
+        run(churn())
+        print(report.summary())
+        # Dropped players take their waitlist positions with them
+        self.assert_signup_invariants(STAMPEDE_MEMBERS - len(leaving), gap_free=False)
+        self.assertFalse(Player.objects.filter(game=self.game, user__in=self.users[: PARTY_SIZE // 2]).exists())
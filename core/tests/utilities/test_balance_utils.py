@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import BonusCredit, CustomUser, Game, Player, Rank, UserCreditBalance
+from core.utils.balances import (
+    get_credit_balance,
+    get_credit_balances,
+    calculate_credit_balance,
+    verify_credit_balances,
+)
+
+
+class TestUtilitiesCreditBalance(TestCase):
+    """Tests for the stored per-player credit balance"""
+
+    fixtures = ["test_dms", "test_games", "test_users", "test_ranks"]
+
+    def setUp(self) -> None:
+        self.rank = Rank.objects.create(name="Balance", priority=1, max_games=3)
+        self.user = CustomUser.objects.create(username="balance", discord_id="700000000")
+        self.user.ranks.add(self.rank)
+        self.game = Game.objects.get(pk=1)
+
+    def assert_balance_correct(self) -> UserCreditBalance:
+        """Check that the stored balance matches a full calculation"""
+        balance = get_credit_balance(self.user.discord_id)
+        expected = calculate_credit_balance(self.user.discord_id)
+        self.assertEqual(balance.rank_games, expected["rank_games"])
+        self.assertEqual(balance.bonus_games, expected["bonus_games"])
+        self.assertEqual(balance.pending_games, expected["pending_games"])
+        return balance
+
+    def test_balance_read_is_single_query(self) -> None:
+        """Once calculated, reading a balance is a single primary key fetch"""
+        get_credit_balance(self.user.discord_id)
+        with self.assertNumQueries(1):
+            balance = get_credit_balance(self.user.discord_id)
+        self.assertEqual(balance.available, 3)
+
+    def test_balances_read_together(self) -> None:
+        """Stored balances for several players are read in one query, calculating only those missing"""
+        other = CustomUser.objects.create(username="balance2", discord_id="700000001")
+        get_credit_balance(self.user.discord_id)
+        balances = get_credit_balances([self.user.discord_id, other.discord_id])
+        self.assertEqual(balances[self.user.discord_id].available, 3)
+        self.assertEqual(balances[other.discord_id].available, 0)
+
+        with self.assertNumQueries(1):
+            balances = get_credit_balances([self.user.discord_id, other.discord_id])
+        self.assertEqual(len(balances), 2)
+
+    def test_signup_and_drop_update_balance(self) -> None:
+        """Signing up to a game uses a credit, and dropping out returns it"""
+        get_credit_balance(self.user.discord_id)
+        player = Player.objects.create(game=self.game, user=self.user, discord_id=self.user.discord_id)
+        balance = self.assert_balance_correct()
+        self.assertEqual(balance.pending_games, 1)
+        self.assertEqual(balance.valid_until, self.game.datetime)
+
+        player.delete()
+        balance = self.assert_balance_correct()
+        self.assertEqual(balance.available, 3)
+
+    def test_bonus_credits_update_balance(self) -> None:
+        """Issued bonus credits are added to the balance, and removed again if deleted"""
+        get_credit_balance(self.user.discord_id)
+        expires = timezone.now() + timedelta(days=7)
+        bonus = BonusCredit.objects.create(discord_id=self.user.discord_id, credits=2, expires=expires)
+        balance = self.assert_balance_correct()
+        self.assertEqual(balance.max_games, 5)
+        self.assertEqual(balance.valid_until, expires)
+
+        bonus.delete()
+        self.assertEqual(self.assert_balance_correct().max_games, 3)
+
+    def test_expired_balance_recalculated(self) -> None:
+        """Balances are recalculated once a pending game has started"""
+        get_credit_balance(self.user.discord_id)
+        Player.objects.create(game=self.game, user=self.user, discord_id=self.user.discord_id)
+        expired = timezone.now() - timedelta(minutes=1)
+        Game.objects.filter(pk=self.game.pk).update(datetime=expired)
+        UserCreditBalance.objects.filter(pk=self.user.discord_id).update(valid_until=expired)
+
+        self.assertEqual(get_credit_balance(self.user.discord_id).pending_games, 0)
+
+    def test_rank_changes_update_balance(self) -> None:
+        """Changes to a user's ranks, or to the ranks themselves, are reflected in their balance"""
+        get_credit_balance(self.user.discord_id)
+        self.rank.max_games = 4
+        self.rank.save()
+        self.assertEqual(self.assert_balance_correct().rank_games, 4)
+
+        self.user.ranks.clear()
+        self.assertEqual(self.assert_balance_correct().rank_games, 0)
+
+    def test_game_time_change_updates_balance(self) -> None:
+        """Moving a game into the past stops it counting against its players"""
+        Player.objects.create(game=self.game, user=self.user, discord_id=self.user.discord_id)
+        get_credit_balance(self.user.discord_id)
+        self.game.datetime = timezone.now() - timedelta(days=1)
+        self.game.save()
+        self.assertEqual(self.assert_balance_correct().pending_games, 0)
+
+    def test_game_save_keeps_balance(self) -> None:
+        """Saving a game without moving it leaves its players' balances in place"""
+        Player.objects.create(game=self.game, user=self.user, discord_id=self.user.discord_id)
+        get_credit_balance(self.user.discord_id)
+        self.game.name = "Renamed"
+        self.game.save()
+        self.assertTrue(UserCreditBalance.objects.filter(pk=self.user.discord_id).exists())
+
+    def test_verify_corrects_drift(self) -> None:
+        """The verifier finds and corrects balances which no longer match a full calculation"""
+        get_credit_balance(self.user.discord_id)
+        UserCreditBalance.objects.filter(pk=self.user.discord_id).update(pending_games=5)
+
+        self.assertEqual(verify_credit_balances(), 1)
+        self.assertEqual(self.assert_balance_correct().pending_games, 0)
+        self.assertEqual(verify_credit_balances(), 0)
+
+    def test_rank_cleared_updates_balance(self) -> None:
+        """Removing every user from a rank is reflected in their balances"""
+        get_credit_balance(self.user.discord_id)
+        self.rank.users.clear()
+        self.assertEqual(self.assert_balance_correct().rank_games, 0)
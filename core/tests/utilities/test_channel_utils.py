@@ -0,0 +1,126 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Game, GameChannel, Player, CustomUser
+from core.utils.channels import ChannelTransition, get_channel_transition, get_game_channels_for_lifecycle
+from core.utils.channels import apply_channel_transitions, get_game_id_for_channel
+from core.utils.channels import get_game_channels_for_recovery, set_game_channel_message
+from core.utils.channel_members import add_user_to_game_channel, remove_user_from_game_channel
+from core.utils.channel_members import claim_dirty_game_channels, set_default_channel_membership
+
+
+class TestUtilitiesChannels(TestCase):
+    """Tests for game channel lifecycle utilities"""
+
+    fixtures = ["test_dms", "test_games", "test_users", "test_ranks"]
+
+    def setUp(self) -> None:
+        self.now = timezone.now()
+        self.game = Game.objects.get(pk=1)
+        self.game_channel = GameChannel.objects.create(game=self.game, discord_id="1234", name="test-channel")
+
+    def set_game_time(self, offset: timedelta) -> None:
+        self.game.datetime = self.now + offset
+        self.game.save()
+
+    def test_transition_remind(self) -> None:
+        """A channel is reminded within 24 hours of the game"""
+        self.set_game_time(timedelta(hours=12))
+        self.assertEqual(get_channel_transition(self.game_channel, self.now), ChannelTransition.REMIND)
+
+        self.game_channel.status = GameChannel.ChannelStatuses.REMINDED
+        self.assertIsNone(get_channel_transition(self.game_channel, self.now))
+
+    def test_transition_warn_supersedes_remind(self) -> None:
+        """A channel which was never reminded is only warned once the game is within an hour"""
+        self.set_game_time(timedelta(minutes=30))
+        self.assertEqual(get_channel_transition(self.game_channel, self.now), ChannelTransition.WARN)
+
+        self.game_channel.status = GameChannel.ChannelStatuses.WARNED
+        self.assertIsNone(get_channel_transition(self.game_channel, self.now))
+
+    def test_transition_summarise_and_destroy(self) -> None:
+        """Summaries are posted after the game starts, and the channel is destroyed some days later"""
+        self.set_game_time(timedelta(hours=-2))
+        self.assertEqual(get_channel_transition(self.game_channel, self.now), ChannelTransition.SUMMARISE)
+
+        self.set_game_time(timedelta(days=-4))
+        self.assertEqual(get_channel_transition(self.game_channel, self.now), ChannelTransition.DESTROY)
+
+    def test_transition_not_due(self) -> None:
+        """Nothing is due for games further in the future"""
+        self.set_game_time(timedelta(days=3))
+        self.assertIsNone(get_channel_transition(self.game_channel, self.now))
+
+    def test_lifecycle_loader_query_count(self) -> None:
+        """Channels are loaded with their parties in a fixed number of queries"""
+        self.set_game_time(timedelta(hours=12))
+        Player.objects.create(game=self.game, discord_id="1", discord_name="Player", standby=False)
+        Player.objects.create(game=self.game, discord_id="2", discord_name="Waiting", standby=True, waitlist=1)
+        old_game = Game.objects.get(pk=2)
+        GameChannel.objects.create(game=old_game, discord_id="4321", name="old-channel")
+
+        with self.assertNumQueries(3):
+            channels = get_game_channels_for_lifecycle(self.now)
+        self.assertEqual(len(channels), 2)
+        game_channel, data = [row for row in channels if row[0].pk == self.game_channel.pk][0]
+        self.assertEqual([p.discord_name for p in data["players"]], ["Player"])
+        self.assertEqual([p.discord_name for p in data["waitlist"]], ["Waiting"])
+        self.assertEqual(data["dm"], self.game.dm)
+
+    def test_apply_channel_transitions(self) -> None:
+        """Completed actions are recorded against the channels"""
+        old_game = Game.objects.get(pk=2)
+        old_channel = GameChannel.objects.create(game=old_game, discord_id="4321", name="old-channel")
+
+        apply_channel_transitions(
+            {ChannelTransition.REMIND: [self.game_channel.pk], ChannelTransition.DESTROY: [old_channel.pk]}
+        )
+        self.game_channel.refresh_from_db()
+        self.assertEqual(self.game_channel.status, GameChannel.ChannelStatuses.REMINDED)
+        self.assertFalse(GameChannel.objects.filter(pk=old_channel.pk).exists())
+
+    def test_membership_changes_flag_channel(self) -> None:
+        """Adding or removing channel members flags the channel for a sync, until it is claimed"""
+        user = CustomUser.objects.first()
+        add_user_to_game_channel(user, self.game_channel)
+        self.game_channel.refresh_from_db()
+        self.assertTrue(self.game_channel.membership_dirty)
+
+        claimed = claim_dirty_game_channels()
+        self.assertEqual([channel.pk for channel in claimed], [self.game_channel.pk])
+        self.assertEqual(claim_dirty_game_channels(), [])
+
+        add_user_to_game_channel(user, self.game_channel, read_only=True)
+        self.assertEqual(len(claim_dirty_game_channels()), 1)
+        remove_user_from_game_channel(user, self.game_channel)
+        self.assertEqual(len(claim_dirty_game_channels()), 1)
+
+    def test_get_game_id_for_channel(self) -> None:
+        """Channels are looked up by their discord ID"""
+        self.assertEqual(get_game_id_for_channel(1234), self.game.pk)
+        self.assertIsNone(get_game_id_for_channel("9999"))
+
+    def test_recovery_records(self) -> None:
+        """Channels are recovered along with their game, and their banner message can be recorded"""
+        GameChannel.objects.create(game=self.game, name="no-discord-channel")
+        set_game_channel_message(self.game_channel.pk, 5678)
+
+        with self.assertNumQueries(1):
+            game_channels = get_game_channels_for_recovery()
+            recovered = [(game_channel.pk, game_channel.game.dm.pk) for game_channel in game_channels]
+        self.assertEqual(recovered, [(self.game_channel.pk, self.game.dm_id)])
+        self.assertEqual(game_channels[0].message_id, "5678")
+
+    def test_membership_keeps_banner_message(self) -> None:
+        """Setting the channel membership doesn't overwrite the banner message recorded after the channel was created"""
+        Player.objects.create(game=self.game, user=CustomUser.objects.get(pk=1), discord_id="1", standby=False)
+        Player.objects.create(game=self.game, user=CustomUser.objects.get(pk=2), discord_id="2", standby=True)
+        set_game_channel_message(self.game_channel.pk, 999)
+
+        self.assertTrue(set_default_channel_membership(self.game_channel, True))
+        self.game_channel.refresh_from_db()
+        self.assertEqual(self.game_channel.message_id, "999")
+        self.assertEqual(self.game_channel.members.count(), 3)
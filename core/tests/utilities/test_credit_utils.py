@@ -0,0 +1,98 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Credit, CustomUser, Game
+from core.exceptions import GameCreditException
+from core.utils.credits import spend_user_credit_on_game, refund_user_credit_for_game, get_user_credit_balance
+
+
+class TestUtilitiesCredit(TestCase):
+    """Tests for spending and refunding game credits"""
+
+    fixtures = ["test_dms", "test_games", "test_users", "test_ranks"]
+
+    def setUp(self) -> None:
+        now = timezone.now()
+        self.user = CustomUser.objects.get(pk=1)
+        self.game = Game.objects.get(pk=1)
+        self.soon = Credit.objects.create(owner=self.user, datetime_expiry=now + timedelta(days=1))
+        self.later = Credit.objects.create(owner=self.user, datetime_expiry=now + timedelta(days=30))
+        self.never = Credit.objects.create(owner=self.user)
+
+    def test_spend_soonest_expiring_first(self) -> None:
+        """Credits closest to expiry are spent first, with credits that never expire used last"""
+        spent = spend_user_credit_on_game(self.user, self.game, cost=2)
+        self.assertEqual({credit.pk for credit in spent}, {self.soon.pk, self.later.pk})
+        for credit in spent:
+            self.assertEqual(credit.target, self.game)
+            self.assertIsNotNone(credit.datetime_spent)
+
+    def test_spend_single_update(self) -> None:
+        """Spending credits selects and updates them in a fixed number of queries"""
+        Credit.objects.bulk_create([Credit(owner=self.user) for _ in range(50)])
+        spend_user_credit_on_game(self.user, Game.objects.get(pk=2))
+        # savepoint, select for update, update, release and then fetching the spent credits
+        with self.assertNumQueries(5):
+            spend_user_credit_on_game(self.user, self.game, cost=10)
+
+    def test_credits_not_spent_twice(self) -> None:
+        """Credits taken by another spend after they were selected are not spent again"""
+        spend_user_credit_on_game(self.user, self.game, cost=3)
+        # A selection made before the first spend was committed, as can happen without row locking
+        stale = Credit.objects.filter(owner=self.user)
+        with patch("core.utils.credits.get_user_credit_available", return_value=stale):
+            with self.assertRaises(GameCreditException):
+                spend_user_credit_on_game(self.user, Game.objects.get(pk=2), cost=3)
+        self.assertEqual(Credit.objects.filter(target_id=self.game.pk).count(), 3)
+
+    def test_insufficient_credit(self) -> None:
+        """Nothing is spent if the user doesn't have enough available credits"""
+        with self.assertRaises(GameCreditException):
+            spend_user_credit_on_game(self.user, self.game, cost=4)
+        self.assertEqual(get_user_credit_balance(self.user)["available"], 3)
+
+    def test_expired_and_locked_credits_unavailable(self) -> None:
+        """Expired and locked credits cannot be spent"""
+        Credit.objects.filter(pk=self.soon.pk).update(datetime_expiry=timezone.now() - timedelta(days=1))
+        Credit.objects.filter(pk=self.later.pk).update(locked=True)
+        spent = spend_user_credit_on_game(self.user, self.game)
+        self.assertEqual(spent[0].pk, self.never.pk)
+        with self.assertRaises(GameCreditException):
+            spend_user_credit_on_game(self.user, self.game)
+
+    def test_refund(self) -> None:
+        """Refunding a game returns the credits spent on it"""
+        spend_user_credit_on_game(self.user, self.game, cost=2)
+        self.assertEqual(get_user_credit_balance(self.user)["available"], 1)
+
+        self.assertEqual(refund_user_credit_for_game(self.user.pk, self.game.pk), 2)
+        balance = get_user_credit_balance(self.user)
+        self.assertEqual(balance["available"], 3)
+        self.assertEqual(balance["spent"], 0)
+        self.assertFalse(Credit.objects.filter(target_id=self.game.pk).exists())
+
+    def test_locked_credits_not_refunded(self) -> None:
+        """Credits locked when they were spent stay spent"""
+        spend_user_credit_on_game(self.user, self.game, lock=True)
+        self.assertEqual(refund_user_credit_for_game(self.user.pk, self.game.pk), 0)
+
+        balance = get_user_credit_balance(self.user)
+        self.assertEqual(balance["spent"], 1)
+        self.assertEqual(balance["locked"], 1)
+
+    def test_no_refund_after_game_started(self) -> None:
+        """Credits spent on a game that has already started are not returned"""
+        game = Game.objects.get(pk=2)
+        spend_user_credit_on_game(self.user, game)
+        self.assertEqual(refund_user_credit_for_game(self.user.pk, game.pk), 0)
+
+    def test_credit_balance(self) -> None:
+        """The balance counts credits in each state"""
+        Credit.objects.create(owner=self.user, datetime_expiry=timezone.now() - timedelta(days=1))
+        spend_user_credit_on_game(self.user, self.game)
+        with self.assertNumQueries(1):
+            balance = get_user_credit_balance(self.user)
+        self.assertEqual(balance, {"available": 2, "spent": 1, "locked": 0, "expired": 1})
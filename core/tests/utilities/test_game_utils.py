@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Game, Player
+from core.utils.games import get_expired_game_ids, get_game_versions, get_game_embed_data
+
+
+class TestUtilitiesGames(TestCase):
+    """Tests for game specific utility functions"""
+
+    fixtures = ["test_dms", "test_games", "test_users", "test_ranks"]
+
+    def test_get_expired_game_ids(self) -> None:
+        """Expired, withdrawn and deleted games are all identified in a single query"""
+        upcoming = Game.objects.get(pk=1)
+        withdrawn = Game.objects.get(pk=3)
+        withdrawn.datetime = timezone.now() + timedelta(days=1)
+        withdrawn.ready = False
+        withdrawn.save()
+
+        with self.assertNumQueries(1):
+            expired = get_expired_game_ids([upcoming.pk, 2, withdrawn.pk, 9999])
+        self.assertEqual(expired, {2, withdrawn.pk, 9999})
+
+    def test_get_expired_game_ids_recent_game(self) -> None:
+        """Games remain posted for a day after they start"""
+        game = Game.objects.get(pk=1)
+        game.datetime = timezone.now() - timedelta(hours=12)
+        game.save()
+
+        self.assertEqual(get_expired_game_ids([game.pk]), set())
+        self.assertEqual(get_expired_game_ids([]), set())
+
+    def test_game_version_tracks_player_changes(self) -> None:
+        """Adding or removing a player advances the game's version"""
+        game = Game.objects.get(pk=1)
+        initial = get_game_versions([game.pk])[game.pk]
+
+        player = Player.objects.create(game=game, discord_id="1234", discord_name="Version Test", standby=False)
+        after_signup = get_game_versions([game.pk])[game.pk]
+        player.delete()
+        after_dropout = get_game_versions([game.pk])[game.pk]
+
+        self.assertGreater(after_signup, initial)
+        self.assertGreater(after_dropout, after_signup)
+
+    def test_game_save_does_not_restore_stale_version(self) -> None:
+        """Saving an out of date copy of a game still advances the stored version"""
+        stale = Game.objects.get(pk=1)
+        Player.objects.create(game=stale, discord_id="1234", discord_name="Version Test", standby=False)
+        current = get_game_versions([stale.pk])[stale.pk]
+
+        # The version is incremented in the same statement that saves the game
+        with self.assertNumQueries(1):
+            stale.save()
+        self.assertEqual(get_game_versions([stale.pk])[stale.pk], current + 1)
+        self.assertEqual(stale.version, current + 1)
+        stale.save(update_fields=["name"])
+        self.assertEqual(get_game_versions([stale.pk])[stale.pk], current + 2)
+
+    def test_get_game_embed_data(self) -> None:
+        """Players, waitlist and DM details for several games are loaded in a fixed number of queries"""
+        games = list(Game.objects.all())
+        first = games[0]
+        Player.objects.create(game=first, discord_id="1", discord_name="Player", standby=False)
+        Player.objects.create(game=first, discord_id="2", discord_name="Second", standby=True, waitlist=2)
+        Player.objects.create(game=first, discord_id="3", discord_name="First", standby=True, waitlist=1)
+
+        with self.assertNumQueries(2):
+            data = get_game_embed_data(games)
+            dm_names = [game_data["dm_user"].discord_name for game_data in data.values()]
+
+        self.assertEqual(len(data), len(games))
+        self.assertEqual(len(dm_names), len(games))
+        self.assertEqual([p.discord_name for p in data[first.pk]["players"]], ["Player"])
+        self.assertEqual([p.discord_name for p in data[first.pk]["waitlist"]], ["First", "Second"])
+        self.assertEqual(data[first.pk]["dm"], first.dm)
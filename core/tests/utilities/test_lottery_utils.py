@@ -0,0 +1,203 @@
+from datetime import timedelta
+from random import Random
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from sequences import get_next_value
+
+from core.models import Ban, CustomUser, Game, Lottery, LotteryTicket, Player, Rank
+from core.exceptions import LotteryException
+from core.utils.lottery import buy_lottery_tickets, draw_lottery, draw_order, get_due_lotteries
+from core.utils.signups import Eligibility, get_signup_eligibility
+
+
+class TestUtilitiesLotteryDraw(TestCase):
+    """Tests for the weighted lottery draw order"""
+
+    def test_draw_order_includes_every_entrant_once(self) -> None:
+        """Every entrant appears exactly once in the draw, regardless of the number of tickets held"""
+        entrants = {1: 1, 2: 3, 3: 2, 4: 1}
+        order = draw_order(entrants, Random(42))
+        self.assertEqual(sorted(order), [1, 2, 3, 4])
+
+    def test_draw_order_is_weighted(self) -> None:
+        """Entrants holding more tickets are drawn first more often"""
+        rng = Random(42)
+        wins = {1: 0, 2: 0}
+        for _ in range(2000):
+            wins[draw_order({1: 1, 2: 3}, rng)[0]] += 1
+        # An entrant with three tickets against one should win about three quarters of draws
+        self.assertAlmostEqual(wins[2] / 2000, 0.75, delta=0.05)
+
+
+class TestUtilitiesLottery(TestCase):
+    """Tests for buying lottery tickets and drawing lotteries"""
+
+    fixtures = ["test_dms", "test_games", "test_users", "test_ranks"]
+
+    def setUp(self) -> None:
+        now = timezone.now()
+        self.game = Game.objects.get(pk=1)
+        self.game.signup_type = Game.SignUpTypes.LOTTERY
+        self.game.max_players = 2
+        self.game.save()
+        self.lottery = Lottery.objects.create(
+            game=self.game,
+            ticket_limit=2,
+            max_tickets=8,
+            datetime_open=now - timedelta(hours=1),
+            datetime_draw=now + timedelta(hours=1),
+        )
+
+        rank = Rank.objects.create(name="Lottery", priority=1, max_games=5)
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f"entrant{i}", discord_id=str(800000000 + i)) for i in range(6)]
+        )
+        self.users = list(CustomUser.objects.filter(username__startswith="entrant").order_by("pk"))
+        rank.users.add(*self.users)
+
+    def close_lottery(self) -> None:
+        """Move the lottery draw time into the past"""
+        Lottery.objects.filter(pk=self.lottery.pk).update(datetime_draw=timezone.now() - timedelta(minutes=1))
+        self.lottery.refresh_from_db()
+
+    def test_buy_tickets(self) -> None:
+        """Buying tickets records each ticket against the lottery"""
+        self.assertEqual(buy_lottery_tickets(self.users[0], self.game), 1)
+        self.assertEqual(buy_lottery_tickets(self.users[0], self.game), 2)
+
+        self.lottery.refresh_from_db()
+        self.assertEqual(self.lottery.tickets_sold, 2)
+        self.assertEqual(LotteryTicket.objects.filter(lottery=self.lottery, user=self.users[0]).count(), 2)
+
+    def test_ticket_limit_per_user(self) -> None:
+        """Users cannot hold more tickets than the lottery's limit, and refused purchases are not counted"""
+        buy_lottery_tickets(self.users[0], self.game, 2)
+        with self.assertRaises(LotteryException):
+            buy_lottery_tickets(self.users[0], self.game)
+
+        self.lottery.refresh_from_db()
+        self.assertEqual(self.lottery.tickets_sold, 2)
+
+    def test_max_tickets(self) -> None:
+        """No more tickets can be sold once the lottery has sold out"""
+        for user in self.users[:4]:
+            buy_lottery_tickets(user, self.game, 2)
+        with self.assertRaises(LotteryException):
+            buy_lottery_tickets(self.users[4], self.game)
+        self.assertEqual(LotteryTicket.objects.filter(lottery=self.lottery).count(), 8)
+
+    def test_closed_lottery(self) -> None:
+        """Tickets cannot be bought once the draw time has passed"""
+        self.close_lottery()
+        with self.assertRaises(LotteryException):
+            buy_lottery_tickets(self.users[0], self.game)
+
+    def test_ineligible_user_cannot_buy(self) -> None:
+        """Users who could not sign up to the game cannot enter its lottery"""
+        dm_user = CustomUser.objects.get(pk=3)
+        with self.assertRaises(LotteryException):
+            buy_lottery_tickets(dm_user, self.game)
+
+    def test_direct_signup_refused_until_drawn(self) -> None:
+        """Lottery games do not accept direct signups until the lottery has been drawn"""
+        verdict = get_signup_eligibility(self.users[0], self.game, check_release=False)
+        self.assertEqual(verdict.reason, Eligibility.LOTTERY_PENDING)
+
+        self.close_lottery()
+        draw_lottery(self.lottery)
+        verdict = get_signup_eligibility(self.users[0], self.game, check_release=False)
+        self.assertEqual(verdict.reason, Eligibility.ELIGIBLE)
+
+    def test_unscheduled_lottery_not_pending(self) -> None:
+        """A lottery without an opening or draw time is never run, so it does not hold up direct signups"""
+        Lottery.objects.filter(pk=self.lottery.pk).update(datetime_open=None)
+        verdict = get_signup_eligibility(self.users[0], self.game, check_release=False)
+        self.assertEqual(verdict.reason, Eligibility.ELIGIBLE)
+
+        Lottery.objects.filter(pk=self.lottery.pk).update(datetime_open=timezone.now(), datetime_draw=None)
+        verdict = get_signup_eligibility(self.users[0], self.game, check_release=False)
+        self.assertEqual(verdict.reason, Eligibility.ELIGIBLE)
+
+    def test_draw_fills_party_then_waitlist(self) -> None:
+        """Drawn entrants fill the free seats first, with the rest waitlisted in the order they were drawn"""
+        for user in self.users[:5]:
+            buy_lottery_tickets(user, self.game)
+        self.close_lottery()
+        self.assertEqual(get_due_lotteries(), [self.lottery])
+
+        players = draw_lottery(self.lottery, Random(42))
+        self.assertEqual(len(players), 5)
+        self.assertEqual([player.standby for player in players], [False] * 2 + [True] * 3)
+        waitlist = [player.waitlist for player in players if player.standby]
+        self.assertEqual(waitlist, sorted(waitlist))
+        self.assertEqual(Player.objects.filter(game=self.game, standby=False).count(), 2)
+
+        self.lottery.refresh_from_db()
+        self.assertTrue(self.lottery.draw_done)
+        self.assertEqual(get_due_lotteries(), [])
+
+    def test_draw_only_once(self) -> None:
+        """A lottery which has already been drawn cannot be drawn again"""
+        buy_lottery_tickets(self.users[0], self.game)
+        self.close_lottery()
+        self.assertEqual(len(draw_lottery(self.lottery)), 1)
+        self.assertEqual(draw_lottery(self.lottery), [])
+        self.assertEqual(Player.objects.filter(game=self.game).count(), 1)
+
+    def test_draw_skips_existing_players(self) -> None:
+        """Entrants who are already playing in the game are not drawn again"""
+        buy_lottery_tickets(self.users[0], self.game)
+        buy_lottery_tickets(self.users[1], self.game)
+        Player.objects.create(game=self.game, user=self.users[0], discord_id=self.users[0].discord_id)
+        self.close_lottery()
+
+        players = draw_lottery(self.lottery)
+        self.assertEqual([player.user for player in players], [self.users[1]])
+        self.assertFalse(players[0].standby)
+
+    def test_draw_skips_ineligible_entrants(self) -> None:
+        """Entrants banned or out of credit by the time of the draw are not given a place"""
+        for user in self.users[:4]:
+            buy_lottery_tickets(user, self.game)
+        banned_until = timezone.now() + timedelta(days=7)
+        Ban.objects.create(discord_id=self.users[0].discord_id, datetime_end=banned_until, reason="Testing")
+        self.users[1].ranks.clear()
+        self.close_lottery()
+
+        players = draw_lottery(self.lottery, Random(42))
+        self.assertEqual({player.user for player in players}, {self.users[2], self.users[3]})
+        self.assertEqual([player.standby for player in players], [False, False])
+
+    def test_draw_checks_entrants_together(self) -> None:
+        """The eligibility of entrants is checked in the same number of queries however many there are"""
+        # Create the waitlist sequence up front, so that both draws only advance it
+        get_next_value(f"game-{self.game.pk}")
+        for user in self.users[:3]:
+            buy_lottery_tickets(user, self.game)
+        self.close_lottery()
+        with CaptureQueriesContext(connection) as few:
+            draw_lottery(self.lottery, Random(42))
+
+        now = timezone.now()
+        self.lottery = Lottery.objects.create(
+            game=self.game,
+            ticket_limit=2,
+            max_tickets=8,
+            datetime_open=now - timedelta(hours=1),
+            datetime_draw=now + timedelta(hours=1),
+        )
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f"latecomer{i}", discord_id=str(900000000 + i)) for i in range(3)]
+        )
+        latecomers = list(CustomUser.objects.filter(username__startswith="latecomer"))
+        Rank.objects.get(name="Lottery").users.add(*latecomers)
+        for user in self.users[3:] + latecomers:
+            buy_lottery_tickets(user, self.game)
+        self.close_lottery()
+        with CaptureQueriesContext(connection) as many:
+            players = draw_lottery(self.lottery, Random(42))
+        self.assertEqual(len(players), 6)
+        self.assertEqual(len(many), len(few))
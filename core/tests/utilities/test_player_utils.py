@@ -1,10 +1,12 @@
 from datetime import timedelta
 
+from django.db import connection
 from django.utils import timezone
 from django.test import TestCase
 
-from core.models import Rank, BonusCredit
+from core.models import Rank, BonusCredit, Game, Player, CustomUser
 from core.utils.players import get_player_max_games, get_user_highest_rank, get_bonus_credits
+from core.utils.players import populate_game_from_waitlist
 
 
 class MockUser:
@@ -57,3 +59,39 @@ class TestUtilitiesPlayer(TestCase):
         games = get_player_max_games(self.mock_user)
         self.assertIsInstance(games, int)
         self.assertEqual(games, 10)
+
+
+class TestUtilitiesWaitlist(TestCase):
+    """Tests for promoting players from a game's waitlist"""
+
+    fixtures = ["test_dms", "test_games", "test_users", "test_ranks"]
+
+    def setUp(self) -> None:
+        self.game = Game.objects.get(pk=2)
+        for position, user in enumerate(CustomUser.objects.order_by("pk")[:6]):
+            Player.objects.create(game=self.game, user=user, standby=True, waitlist=position)
+
+    def test_promotion_fills_party_in_waitlist_order(self) -> None:
+        """Free seats are filled from the front of the waitlist in a fixed number of queries"""
+        version = Game.objects.get(pk=self.game.pk).version
+        # lock, party count, waitlist, promotion and version bump, plus the transaction savepoint and release
+        # without row locking the lock is a write to the game followed by reading its capacity
+        with self.assertNumQueries(7 if connection.features.has_select_for_update else 8):
+            promoted = populate_game_from_waitlist(self.game)
+
+        self.assertEqual([player.waitlist for player in promoted], [0, 1, 2, 3])
+        self.assertTrue(all(not player.standby for player in promoted))
+        self.assertEqual(Player.objects.filter(game=self.game, standby=False).count(), self.game.max_players)
+        self.assertEqual(Game.objects.get(pk=self.game.pk).version, version + 1)
+
+    def test_promotion_with_full_party(self) -> None:
+        """Nothing is promoted once the party is full"""
+        populate_game_from_waitlist(self.game)
+        self.assertEqual(populate_game_from_waitlist(self.game), [])
+
+    def test_promotion_with_short_waitlist(self) -> None:
+        """All waitlisted players are promoted when there are more seats than players waiting"""
+        Player.objects.filter(game=self.game, waitlist__gte=2).delete()
+        promoted = populate_game_from_waitlist(self.game)
+        self.assertEqual(len(promoted), 2)
+        self.assertFalse(Player.objects.filter(game=self.game, standby=True).exists())
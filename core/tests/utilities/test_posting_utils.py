@@ -0,0 +1,58 @@
+from django.test import TestCase
+
+from core.models import Game, GamePosting, CalendarPosting
+from core.utils.postings import create_game_posting, get_game_postings, remove_game_postings
+from core.utils.postings import set_calendar_posting, get_calendar_posting
+from core.utils.postings import get_adopted_channel_ids, set_channel_adopted
+
+
+class TestUtilitiesPostings(TestCase):
+    """Tests for game announcement posting records"""
+
+    fixtures = ["test_dms", "test_games", "test_users", "test_ranks"]
+
+    def test_create_game_posting(self) -> None:
+        """A posting can be recorded and retrieved by channel"""
+        game = Game.objects.get(pk=1)
+        create_game_posting(game, 1234, 5678, "https://discord.com/channels/1/1234/5678")
+
+        postings = get_game_postings(channel_id=1234)
+        self.assertEqual(len(postings), 1)
+        self.assertEqual(postings[0].game, game)
+        self.assertEqual(postings[0].message_id, "5678")
+        self.assertEqual(get_game_postings(channel_id=9999), [])
+
+    def test_reposting_replaces_record(self) -> None:
+        """A game can only have a single posting record"""
+        game = Game.objects.get(pk=1)
+        create_game_posting(game, 1234, 5678)
+        create_game_posting(game, 4321, 8765)
+
+        self.assertEqual(GamePosting.objects.filter(game=game).count(), 1)
+        self.assertEqual(GamePosting.objects.get(game=game).channel_id, "4321")
+
+    def test_remove_postings(self) -> None:
+        """Posting records can be removed in bulk"""
+        create_game_posting(Game.objects.get(pk=1), 1234, 1)
+        create_game_posting(Game.objects.get(pk=2), 1234, 2)
+
+        self.assertEqual(remove_game_postings([1, 2]), 2)
+        self.assertFalse(GamePosting.objects.exists())
+
+    def test_channel_adopted(self) -> None:
+        """Scanned channels are recorded once, however many times they are marked"""
+        self.assertEqual(get_adopted_channel_ids(), set())
+        set_channel_adopted(1234)
+        set_channel_adopted(1234)
+        self.assertEqual(get_adopted_channel_ids(), {"1234"})
+
+    def test_set_calendar_posting(self) -> None:
+        """Each channel has a single calendar record, updated in place"""
+        set_calendar_posting(1234, 5678, "abc")
+        set_calendar_posting(1234, 8765, "def")
+
+        posting = get_calendar_posting(1234)
+        self.assertEqual(CalendarPosting.objects.count(), 1)
+        self.assertEqual(posting.message_id, "8765")
+        self.assertEqual(posting.digest, "def")
+        self.assertIsNone(get_calendar_posting(9999))
@@ -0,0 +1,38 @@
+from django.test import TestCase
+
+from core.models import Rank
+from core.utils.ranks import RankIndex, get_ranks_for_discord_roles
+
+
+class TestUtilitiesRankIndex(TestCase):
+    """Tests for resolving discord roles to ranks"""
+
+    fixtures = ["test_ranks"]
+
+    def test_lookup_by_id_and_name(self) -> None:
+        """Ranks are found by discord role ID or by case insensitive name"""
+        ranks = get_ranks_for_discord_roles(["11111111", "patreon user", "Not a rank"])
+        self.assertEqual([rank.name for rank in ranks], ["Admin", "Patreon User"])
+
+    def test_roles_resolved_in_one_query(self) -> None:
+        """Any number of roles are resolved with a single query"""
+        roles = [str(role_id) for role_id in range(30)] + ["22222222", "44444444"]
+        with self.assertNumQueries(1):
+            ranks = get_ranks_for_discord_roles(roles)
+        self.assertEqual(len(ranks), 2)
+
+    def test_index_cached(self) -> None:
+        """Once loaded, the index is used without querying the database"""
+        index = RankIndex()
+        index.get_ranks(["Admin"])
+        with self.assertNumQueries(0):
+            self.assertEqual(index.get_ranks(["55555555"])[0].name, "ResDM123")
+
+    def test_index_invalidated_by_rank_changes(self) -> None:
+        """Changes to the ranks are visible straight away"""
+        get_ranks_for_discord_roles(["Admin"])
+        Rank.objects.create(name="Epic Player", discord_id="66666666", priority=3, max_games=2)
+        self.assertEqual(get_ranks_for_discord_roles(["66666666"])[0].name, "Epic Player")
+
+        Rank.objects.get(name="Admin").delete()
+        self.assertEqual(get_ranks_for_discord_roles(["Admin"]), [])
@@ -0,0 +1,161 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Game, Player, CustomUser, Rank, UserCreditBalance
+from core.utils.games_rework import add_user_to_game, add_users_to_game, game_signup_lock, place_user_in_game
+from core.utils.games_rework import _signup_locks
+from core.utils.signups import Eligibility, get_signup_eligibility
+from core.utils.balances import get_credit_balance
+
+
+class TestUtilitiesSignup(TestCase):
+    """Tests for adding users to games"""
+
+    fixtures = ["test_dms", "test_games", "test_users", "test_ranks"]
+
+    def setUp(self) -> None:
+        self.game = Game.objects.get(pk=2)
+        rank = Rank.objects.create(name="Signup", priority=1, max_games=2)
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f"signup{i}", discord_id=str(900000000 + i)) for i in range(6)]
+        )
+        self.users = list(CustomUser.objects.filter(username__startswith="signup").order_by("pk"))
+        rank.users.add(*self.users)
+
+    def test_signup_fills_party_then_waitlist(self) -> None:
+        """Players join the party until it is full, after which they join the end of the waitlist"""
+        players = [add_user_to_game(user, self.game) for user in self.users[:6]]
+
+        self.assertEqual([player.standby for player in players], [False] * 4 + [True] * 2)
+        self.assertEqual(Player.objects.filter(game=self.game, standby=False).count(), self.game.max_players)
+        self.assertLess(players[4].waitlist, players[5].waitlist)
+
+    def test_signup_stores_discord_details(self) -> None:
+        """Players are created with their discord details already populated"""
+        user = self.users[0]
+        player = add_user_to_game(user, self.game)
+        player.refresh_from_db()
+        self.assertEqual(player.discord_id, user.discord_id)
+        self.assertEqual(player.discord_name, user.discord_name or "Masked stranger")
+
+    def test_forced_signup_promotes_waitlisted_player(self) -> None:
+        """A DM can force a waitlisted player into a full party without creating a second player"""
+        for user in self.users[:5]:
+            add_user_to_game(user, self.game)
+        waitlisted = self.users[4]
+
+        player = add_user_to_game(waitlisted, self.game, force=True)
+        self.assertFalse(player.standby)
+        self.assertEqual(Player.objects.filter(game=self.game, user=waitlisted).count(), 1)
+        self.assertEqual(Player.objects.filter(game=self.game, standby=False).count(), 5)
+
+    def test_batch_signup_in_order(self) -> None:
+        """A batch of signups fills the party and then the waitlist in the order given"""
+        players = add_users_to_game(self.users[:6], self.game)
+
+        self.assertEqual([player.user for player in players], self.users[:6])
+        self.assertEqual([player.standby for player in players], [False] * 4 + [True] * 2)
+        self.assertEqual(add_users_to_game([], self.game), [])
+
+    def test_ineligible_users_not_added(self) -> None:
+        """Eligibility is checked as each user is added, unless the signup is forced by the DM"""
+        self.users[1].ranks.clear()
+        players = add_users_to_game(self.users[:3] + self.users[:1], self.game)
+
+        added = [player.user if player else None for player in players]
+        self.assertEqual(added, [self.users[0], None, self.users[2], None])
+        self.assertEqual(Player.objects.filter(game=self.game).count(), 2)
+        self.assertIsNotNone(add_user_to_game(self.users[1], self.game, force=True))
+
+    def test_failed_signup_isolated(self) -> None:
+        """An error adding one user to a batch doesn't prevent the others from being added"""
+
+        def place(user, game, join_party):
+            if user == self.users[1]:
+                raise ValueError("Simulated failure")
+            return place_user_in_game(user, game, join_party)
+
+        with patch("core.utils.games_rework.place_user_in_game", side_effect=place):
+            players = add_users_to_game(self.users[:3], self.game)
+        self.assertEqual([bool(player) for player in players], [True, False, True])
+        self.assertEqual(Player.objects.filter(game=self.game).count(), 2)
+
+    def test_signup_locks_discarded(self) -> None:
+        """Per game locks are only kept while they are in use"""
+        add_users_to_game(self.users[:2], self.game)
+        with game_signup_lock(self.game.pk):
+            self.assertIn(self.game.pk, _signup_locks)
+        self.assertEqual(_signup_locks, {})
+
+    def test_lock_uses_current_capacity(self) -> None:
+        """The party size is read from the database when the lock is taken"""
+        Game.objects.filter(pk=self.game.pk).update(max_players=1)
+        with game_signup_lock(self.game.pk) as max_players:
+            self.assertEqual(max_players, 1)
+
+    def test_lock_takes_database_write_lock(self) -> None:
+        """Without row locking the game is written to first, so signups from other processes wait on the database"""
+        with CaptureQueriesContext(connection) as queries:
+            with game_signup_lock(self.game.pk):
+                pass
+        statements = [query["sql"] for query in queries if "core_game" in query["sql"]]
+        if connection.features.has_select_for_update:
+            self.assertIn("FOR UPDATE", statements[0])
+        else:
+            self.assertTrue(statements[0].startswith("UPDATE"))
+
+
+class TestUtilitiesSignupEligibility(TestCase):
+    """Tests for deciding whether a user may sign up to a game"""
+
+    fixtures = ["test_dms", "test_games", "test_users", "test_ranks", "test_players", "test_bans"]
+
+    def setUp(self) -> None:
+        self.game = Game.objects.get(pk=1)
+
+    def get_reason(self, user_id: int, check_release: bool = True) -> Eligibility:
+        user = CustomUser.objects.get(pk=user_id)
+        get_credit_balance(user.discord_id)
+        # the signup facts, and the user's stored credit balance
+        with self.assertNumQueries(2):
+            return get_signup_eligibility(user, self.game, check_release).reason
+
+    def test_eligible(self) -> None:
+        """A user with credit and no restrictions can sign up, with their remaining credit reported"""
+        verdict = get_signup_eligibility(CustomUser.objects.get(pk=1), self.game)
+        self.assertTrue(verdict)
+        self.assertEqual(verdict.available_credit, 10)
+
+    def test_credit_matches_stored_balance(self) -> None:
+        """Eligibility uses the same stored balance that is shown to the user"""
+        user = CustomUser.objects.get(pk=1)
+        balance = {"rank_games": 1, "pending_games": 1}
+        UserCreditBalance.objects.update_or_create(discord_id=user.discord_id, defaults=balance)
+        self.assertEqual(get_signup_eligibility(user, self.game).reason, Eligibility.NO_CREDIT)
+
+    def test_refusal_reasons(self) -> None:
+        """Each restriction is reported as the reason for refusal"""
+        self.assertEqual(self.get_reason(3), Eligibility.IS_DM)
+        self.assertEqual(self.get_reason(7), Eligibility.ALREADY_JOINED)
+        self.assertEqual(self.get_reason(4), Eligibility.BANNED)
+        self.assertEqual(self.get_reason(5), Eligibility.NO_CREDIT)
+
+        user = CustomUser.objects.get(pk=2)
+        self.game.dm.banlist.add(user)
+        self.assertEqual(self.get_reason(user.pk), Eligibility.DM_BANLISTED)
+
+    def test_release_restricted_to_patreons(self) -> None:
+        """Before general release only patreon and resident DM ranks can sign up"""
+        now = timezone.now()
+        self.game.datetime_release = now - timedelta(hours=1)
+        self.game.datetime_open_release = now + timedelta(hours=1)
+
+        self.assertEqual(self.get_reason(1), Eligibility.NOT_RELEASED)
+        self.assertEqual(self.get_reason(1, False), Eligibility.ELIGIBLE)
+        self.assertEqual(self.get_reason(10), Eligibility.ELIGIBLE)
+        self.assertEqual(self.get_reason(11), Eligibility.ELIGIBLE)
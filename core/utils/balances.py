@@ -0,0 +1,132 @@
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Q, F, Case, When, Value, Sum, Min, Count, Exists, Subquery
+from django.utils import timezone
+
+from core.models import Game, Rank
+from core.models.players import BonusCredit, Player, UserCreditBalance
+from discord_bot.logs import logger as log
+
+
+# ########################################################################## #
+def calculate_credit_balance(discord_id: str, now=None) -> dict:
+    """Work out a player's credit balance from their ranks, bonus credits and signups"""
+    now = now or timezone.now()
+    ranks = Rank.objects.filter(users__discord_id=discord_id).order_by("-priority")
+    bonuses = BonusCredit.objects.filter(discord_id=discord_id).filter(Q(expires__gte=now) | Q(expires=None))
+    bonuses = bonuses.aggregate(total=Sum("credits"), expiry=Min("expires"))
+    pending = Player.objects.filter(discord_id=discord_id, game__datetime__gte=now)
+    pending = pending.aggregate(total=Count("pk"), start=Min("game__datetime"))
+
+    return {
+        "rank_games": ranks.values_list("max_games", flat=True).first() or 0,
+        "bonus_games": bonuses["total"] or 0,
+        "pending_games": pending["total"],
+        # The balance changes by itself when the next pending game starts or the next bonus credit expires
+        "valid_until": min([t for t in (bonuses["expiry"], pending["start"]) if t], default=None),
+    }
+
+
+def rebuild_credit_balance(discord_id: str, now=None) -> UserCreditBalance:
+    """Recalculate and store a player's balance"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        # Lock any existing balance so that signups and drops wait for the recalculation
+        list(UserCreditBalance.objects.select_for_update().filter(pk=discord_id))
+        values = calculate_credit_balance(discord_id, now)
+        balance, _ = UserCreditBalance.objects.update_or_create(
+            discord_id=discord_id, defaults={**values, "datetime_calculated": now}
+        )
+    return balance
+
+
+def get_credit_balance(discord_id: str) -> UserCreditBalance:
+    """Get a player's credit balance, recalculating it only if it is missing or has expired"""
+    if not discord_id:
+        return UserCreditBalance()
+    discord_id = str(discord_id)
+    now = timezone.now()
+    balance = UserCreditBalance.objects.filter(pk=discord_id).first()
+    if balance and (not balance.valid_until or balance.valid_until >= now):
+        return balance
+    return rebuild_credit_balance(discord_id, now)
+
+
+def get_credit_balances(discord_ids) -> dict[str, UserCreditBalance]:
+    """Get the credit balances of several players at once, recalculating only those missing or expired"""
+    discord_ids = {str(discord_id) for discord_id in discord_ids if discord_id}
+    now = timezone.now()
+    balances = UserCreditBalance.objects.in_bulk(discord_ids)
+    for discord_id in discord_ids:
+        balance = balances.get(discord_id)
+        if not balance or (balance.valid_until and balance.valid_until < now):
+            balances[discord_id] = rebuild_credit_balance(discord_id, now)
+    return balances
+
+
+@sync_to_async
+def async_get_credit_balance(discord_id: str) -> UserCreditBalance:
+    """Async wrapper to get a player's credit balance"""
+    return get_credit_balance(discord_id)
+
+
+# ########################################################################## #
+def expire_balance_at(moment):
+    """Bring forward the time a stored balance is valid until, if the moment (an expression) given is sooner"""
+    return Case(When(Q(valid_until=None) | Q(valid_until__gt=moment), then=moment), default=F("valid_until"))
+
+
+def adjust_pending_games(discord_id: str, change: int, game_id: int) -> int:
+    """Record a signup to (or drop from) a game against a player's stored balance"""
+    if not discord_id:
+        return 0
+    # games that have already started do not count against the balance
+    game = Game.objects.filter(pk=game_id, datetime__gte=timezone.now())
+    queryset = UserCreditBalance.objects.filter(pk=discord_id).filter(Exists(game))
+    if change > 0:
+        game_time = Subquery(game.values("datetime")[:1])
+        return queryset.update(pending_games=F("pending_games") + change, valid_until=expire_balance_at(game_time))
+    return queryset.update(pending_games=F("pending_games") + change)
+
+
+def adjust_bonus_games(discord_id: str, credits: int, expires=None) -> int:
+    """Record newly issued bonus credits against a player's stored balance"""
+    if not discord_id or (expires and expires < timezone.now()):
+        return 0
+    queryset = UserCreditBalance.objects.filter(pk=discord_id)
+    if expires:
+        return queryset.update(bonus_games=F("bonus_games") + credits, valid_until=expire_balance_at(Value(expires)))
+    return queryset.update(bonus_games=F("bonus_games") + credits)
+
+
+def invalidate_credit_balances(*discord_ids) -> int:
+    """Discard stored balances which can't be adjusted in place, they are recalculated when next needed"""
+    discord_ids = [str(discord_id) for discord_id in discord_ids if discord_id]
+    if not discord_ids:
+        return 0
+    deleted, _ = UserCreditBalance.objects.filter(pk__in=discord_ids).delete()
+    return deleted
+
+
+# ########################################################################## #
+def verify_credit_balances(now=None) -> int:
+    """Check stored balances against a full calculation, correcting (and returning the number of) any that differ"""
+    now = now or timezone.now()
+    corrected = 0
+    for balance in list(UserCreditBalance.objects.all()):
+        if balance.valid_until and balance.valid_until < now:
+            rebuild_credit_balance(balance.discord_id, now)
+            continue  # expired balances are expected to be out of date
+        expected = calculate_credit_balance(balance.discord_id, now)
+        counts = ["rank_games", "bonus_games", "pending_games"]
+        if any(getattr(balance, field) != expected[field] for field in counts):
+            log.warning(f"[!] Credit balance for {balance.discord_id} was incorrect, recalculating")
+            rebuild_credit_balance(balance.discord_id, now)
+            corrected += 1
+    return corrected
+
+
+@sync_to_async
+def async_verify_credit_balances() -> int:
+    """Async wrapper to verify all stored credit balances"""
+    return verify_credit_balances()
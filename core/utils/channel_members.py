@@ -1,8 +1,13 @@
 from typing import List
 from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.dispatch import Signal
 
 from core.models.channel import GameChannel, GameChannelMember, CustomUser
 
+# Sent with the channel_id of a game channel whenever its expected membership changes
+channel_membership_changed = Signal()
+
 
 # ################################################################################ #
 def get_game_channel_members(channel: GameChannel) -> List[GameChannelMember]:
@@ -18,6 +23,30 @@ def async_get_game_channel_members(channel: GameChannel) -> List[GameChannelMemb
     return get_game_channel_members(channel)
 
 
+def mark_channel_membership_changed(*channel_ids) -> int:
+    """Flag channels as needing their membership applied to discord, and notify any listeners in this process"""
+    updated = GameChannel.objects.filter(pk__in=channel_ids).update(membership_dirty=True)
+    for channel_id in channel_ids:
+        channel_membership_changed.send(sender=GameChannel, channel_id=channel_id)
+    return updated
+
+
+def claim_dirty_game_channels(channel_ids=None) -> List[GameChannel]:
+    """Get the channels flagged as changed (or specified), clearing the flag so that later changes are seen"""
+    queryset = GameChannel.objects.filter(membership_dirty=True)
+    if channel_ids:
+        queryset = GameChannel.objects.filter(Q(membership_dirty=True) | Q(pk__in=channel_ids))
+    channels = list(queryset)
+    GameChannel.objects.filter(pk__in=[channel.pk for channel in channels]).update(membership_dirty=False)
+    return channels
+
+
+@sync_to_async
+def async_claim_dirty_game_channels(channel_ids=None) -> List[GameChannel]:
+    """Async wrapper to get the game channels pending a membership sync"""
+    return claim_dirty_game_channels(channel_ids)
+
+
 # ################################################################################### #
 ###                          Channel user add / remove logic                        ###
 # ################################################################################### #
@@ -89,7 +118,6 @@ def add_user_to_game_channel(user: CustomUser, channel: GameChannel, read_only=F
             "manage_messages": admin,
         },
     )
-    channel.save()
     return True
 
 
@@ -101,7 +129,7 @@ def async_add_user_to_game_channel(user: CustomUser, channel: GameChannel) -> bo
 def remove_user_from_game_channel(user: CustomUser, channel: GameChannel) -> bool:
     """Remove a user from a game channel"""
     channel.members.remove(user)
-    channel.save()
+    return True
 
 
 @sync_to_async
@@ -1,6 +1,6 @@
-from typing import List
-
+from enum import Enum
 from datetime import timedelta
+from django.db.models import Q, Prefetch
 from django.utils import timezone
 from asgiref.sync import sync_to_async
 
@@ -8,6 +8,21 @@ from core.errors import ChannelError
 from config.settings import CHANNEL_CREATION_DAYS, CHANNEL_REMIND_HOURS, CHANNEL_WARN_MINUTES, CHANNEL_DESTROY_HOURS
 from core.models.channel import GameChannel
 from core.models.game import Game
+from core.models.players import Player
+from core.utils.ranks import has_res_dm_ranks
+
+# Session summaries are posted once a game has been running for an hour, up until 4 hours after it started
+SUMMARY_AFTER_HOURS = 1
+SUMMARY_BEFORE_HOURS = 4
+
+
+class ChannelTransition(Enum):
+    """Lifecycle actions which can be due for a game channel, in order of precedence"""
+
+    DESTROY = 1
+    SUMMARISE = 2
+    WARN = 3
+    REMIND = 4
 
 
 def get_games_pending(hours=0, days=0, minutes=0):
@@ -20,33 +35,6 @@ def get_games_pending(hours=0, days=0, minutes=0):
     return queryset.order_by("datetime")
 
 
-def get_games_recent(hours=0, days=0, minutes=0):
-    """get games that have started within a specified timeframe"""
-    now = timezone.now()
-    start_time = now - timedelta(hours=hours, days=days, minutes=minutes)
-    queryset = Game.objects.filter(ready=True)
-    queryset = queryset.filter(datetime__lte=now).filter(datetime__gte=start_time)
-    return queryset.order_by("datetime")
-
-
-def get_games_in_progress(hours_start=2, hours_elapsed=1):
-    """get games that have started within a number of hours, but which have been going for an elapsed period"""
-    now = timezone.now()
-    # List of all the games that have started within the last X hours
-    recently_started = get_games_recent(hours=hours_start)
-    # filter those to those that started at least Y hours ago
-    started_before = now - timedelta(hours=hours_elapsed)
-    queryset = recently_started.filter(datetime__lte=started_before)
-    return queryset.order_by("datetime")
-
-
-@sync_to_async
-def async_destroy_game_channel(game_channel):
-    """Destroy a given game channel object"""
-    game_channel.delete()
-    return True
-
-
 # ################################################################## #
 @sync_to_async
 def async_set_game_channel_created(game, channel_id, link="", name=""):
@@ -57,113 +45,64 @@ def async_set_game_channel_created(game, channel_id, link="", name=""):
     return None
 
 
-@sync_to_async
-def async_set_game_channel_warned(game_channel):
-    """Update a game channel object to show the 1 hour warning"""
-    game_channel.status = GameChannel.ChannelStatuses.WARNED
-    game_channel.save()
-    return True
-
-
-@sync_to_async
-def async_set_game_channel_reminded(game_channel):
-    """Update a game channel object to show the 1 day reminder"""
-    game_channel.status = GameChannel.ChannelStatuses.REMINDED
-    game_channel.save()
-    return True
-
-
-@sync_to_async
-def async_set_game_channel_summarised(game_channel):
-    """Update a game channel object to show the session log summary"""
-    game_channel.status = GameChannel.ChannelStatuses.SUMMARISED
-    game_channel.save()
-    return True
-
-
 # ################################################################## #
 @sync_to_async
-def async_get_game_channels_pending_destruction():
-    """Retrieve all game channel objects which are defunct"""
-    now = timezone.now()
-    expiry_time = now - timedelta(hours=CHANNEL_DESTROY_HOURS)
-
-    queryset = GameChannel.objects.filter(game__datetime__lte=expiry_time)
-    queryset = queryset.order_by("game__datetime")
-    return list(queryset)  # force evaluation before dropping back to async
+def async_get_games_pending_channel_creation():
+    """Retrieve all game objects that need a channel posting"""
+    queryset = get_games_pending(days=CHANNEL_CREATION_DAYS)
+    queryset = queryset.filter(text_channel=None)  # Only interested in games which don't yet have a channel
+    return list(queryset)  # force evaluation before leaving this sync context
 
 
 # ################################################################## #
-def get_games_pending_channel_reminder():
-    """Identify games in need of a 24 hour warning sending"""
-    queryset = get_games_pending(hours=CHANNEL_REMIND_HOURS)
-    queryset = queryset.exclude(text_channel=None)  # not interested in anything without a channel
-    queryset = queryset.exclude(text_channel__status=GameChannel.ChannelStatuses.REMINDED)
-    queryset = queryset.exclude(text_channel__status=GameChannel.ChannelStatuses.WARNED)
-    # force evaluation before leaving this sync context
-    return list(queryset)
+def get_game_channel_for_game(game: Game) -> GameChannel | None:
+    """Get the channel for the specified game if it exists"""
+    game_channel = game.text_channel.all().first()
+    if game_channel is None:
+        raise ChannelError(f"GameChannel does not exist for game: {game.name}")
+    return game_channel
 
 
 @sync_to_async
-def async_get_games_pending_channel_reminder():
-    game_channels = get_games_pending_channel_reminder()
-    return game_channels
+def async_get_game_channel_for_game(game: Game) -> GameChannel | None:
+    """Get the game channel object related to a game"""
+    return get_game_channel_for_game(game)
 
 
-# ################################################################## #
-def get_games_pending_channel_warning() -> List[Game]:
-    """Get those games which need a 1 hour warning sending"""
-    queryset = get_games_pending(minutes=CHANNEL_WARN_MINUTES)
-    queryset = queryset.exclude(text_channel=None)  # not interested in anything without a channel
-    queryset = queryset.exclude(text_channel__status=GameChannel.ChannelStatuses.WARNED)
-    # force evaluation before leaving this sync context
-    return list(queryset)
+def get_game_id_for_channel(channel_id) -> int | None:
+    """Get the ID of the game represented by a discord channel, if any"""
+    queryset = GameChannel.objects.filter(discord_id=str(channel_id))
+    return queryset.values_list("game_id", flat=True).first()
 
 
 @sync_to_async
-def async_get_games_pending_channel_warning():
-    game_channels = get_games_pending_channel_warning()
-    return game_channels
+def async_get_game_id_for_channel(channel_id) -> int | None:
+    """Async wrapper to get the game ID for a discord channel"""
+    return get_game_id_for_channel(channel_id)
 
 
-# ################################################################## #
-@sync_to_async
-def async_get_games_pending_channel_creation():
-    """Retrieve all game objects that need a channel posting"""
-    queryset = get_games_pending(days=CHANNEL_CREATION_DAYS)
-    queryset = queryset.filter(text_channel=None)  # Only interested in games which don't yet have a channel
+def get_game_channels_for_recovery() -> list[GameChannel]:
+    """Get every game channel with a discord channel, along with its game and DM"""
+    queryset = GameChannel.objects.exclude(discord_id=None).select_related("game", "game__dm")
     return list(queryset)  # force evaluation before leaving this sync context
 
 
-# ################################################################## #
-def get_games_pending_summary_post() -> list[Game]:
-    """Retrieve all games that have started but which have not yet had a summary posted"""
-
-    queryset = get_games_in_progress(hours_start=4, hours_elapsed=1)  # get games which are at least an hour old
-    queryset = queryset.exclude(text_channel=None)  # not interested in anything without a channel
-    queryset = queryset.exclude(text_channel__status=GameChannel.ChannelStatuses.SUMMARISED)
-    return list(queryset)
-
-
 @sync_to_async
-def async_get_games_pending_summary_post() -> list[Game]:
-    game_channels = get_games_pending_summary_post()
-    return game_channels
+def async_get_game_channels_for_recovery() -> list[GameChannel]:
+    """Async wrapper to get the game channels to reconnect to"""
+    return get_game_channels_for_recovery()
 
 
-# ################################################################## #
-def get_game_channel_for_game(game: Game) -> GameChannel | None:
-    """Get the channel for the specified game if it exists"""
-    game_channel = game.text_channel.all().first()
-    if game_channel is None:
-        raise ChannelError(f"GameChannel does not exist for game: {game.name}")
-    return game_channel
+def set_game_channel_message(game_channel_id: int, message_id) -> bool:
+    """Record the mustering banner message for a game channel"""
+    updated = GameChannel.objects.filter(pk=game_channel_id).update(message_id=str(message_id))
+    return bool(updated)
 
 
 @sync_to_async
-def async_get_game_channel_for_game(game: Game) -> GameChannel | None:
-    """Get the game channel object related to a game"""
-    return get_game_channel_for_game(game)
+def async_set_game_channel_message(game_channel_id: int, message_id) -> bool:
+    """Async wrapper to record the mustering banner message"""
+    return set_game_channel_message(game_channel_id, message_id)
 
 
 # ################################################################################ #
@@ -176,3 +115,89 @@ def get_all_current_game_channels():
 @sync_to_async
 def async_get_all_current_game_channels():
     return get_all_current_game_channels()
+
+
+# ################################################################################ #
+def get_channel_transition(game_channel: GameChannel, now=None) -> ChannelTransition | None:
+    """Determine which lifecycle action (if any) is due for a game channel, based on its status and game time"""
+    now = now or timezone.now()
+    game = game_channel.game
+    statuses = GameChannel.ChannelStatuses
+
+    if game.datetime <= now - timedelta(hours=int(CHANNEL_DESTROY_HOURS)):
+        return ChannelTransition.DESTROY
+    if not game.ready:
+        return None
+
+    summary_start = now - timedelta(hours=SUMMARY_BEFORE_HOURS)
+    summary_end = now - timedelta(hours=SUMMARY_AFTER_HOURS)
+    if summary_start <= game.datetime <= summary_end and game_channel.status != statuses.SUMMARISED:
+        return ChannelTransition.SUMMARISE
+    if now <= game.datetime <= now + timedelta(minutes=int(CHANNEL_WARN_MINUTES)):
+        if game_channel.status != statuses.WARNED:
+            return ChannelTransition.WARN
+    if now <= game.datetime <= now + timedelta(hours=int(CHANNEL_REMIND_HOURS)):
+        if game_channel.status not in [statuses.REMINDED, statuses.WARNED]:
+            return ChannelTransition.REMIND
+    return None
+
+
+def get_game_channel_data(game_channel: GameChannel) -> dict:
+    """Get the party details for a game channel from its prefetched game"""
+    game = game_channel.game
+    dm = game.dm
+    dm_user = dm.user if dm else None
+    data = {"players": [], "waitlist": [], "dm": dm, "dm_user": dm_user}
+    for player in game.players.all():
+        data["waitlist" if player.standby else "players"].append(player)
+    data["players"].sort(key=lambda player: player.pk)
+    data["dm_is_res_dm"] = has_res_dm_ranks(dm_user.ranks.all()) if dm_user else False
+    return data
+
+
+def get_game_channels_for_lifecycle(now=None) -> list[tuple[GameChannel, dict]]:
+    """Get every game channel which could have a lifecycle action due, along with its game, DM and party"""
+    now = now or timezone.now()
+    expiry_time = now - timedelta(hours=int(CHANNEL_DESTROY_HOURS))
+    window_start = now - timedelta(hours=SUMMARY_BEFORE_HOURS)
+    window_end = now + timedelta(hours=int(CHANNEL_REMIND_HOURS))
+
+    queryset = GameChannel.objects.filter(
+        Q(game__datetime__lte=expiry_time) | Q(game__datetime__gte=window_start, game__datetime__lte=window_end)
+    )
+    queryset = queryset.select_related("game", "game__dm", "game__dm__user")
+    queryset = queryset.prefetch_related(
+        Prefetch("game__players", queryset=Player.objects.order_by("waitlist", "pk")),
+        "game__dm__user__ranks",
+    )
+    queryset = queryset.order_by("game__datetime")
+    return [(game_channel, get_game_channel_data(game_channel)) for game_channel in queryset]
+
+
+@sync_to_async
+def async_get_game_channels_for_lifecycle(now=None) -> list[tuple[GameChannel, dict]]:
+    """Async wrapper to load game channels and their parties for the lifecycle pass"""
+    return get_game_channels_for_lifecycle(now)
+
+
+def apply_channel_transitions(completed: dict[ChannelTransition, list[int]]) -> None:
+    """Record the outcome of the lifecycle actions carried out, with a single update per action"""
+    statuses = {
+        ChannelTransition.SUMMARISE: GameChannel.ChannelStatuses.SUMMARISED,
+        ChannelTransition.WARN: GameChannel.ChannelStatuses.WARNED,
+        ChannelTransition.REMIND: GameChannel.ChannelStatuses.REMINDED,
+    }
+    for transition, channel_ids in completed.items():
+        if not channel_ids:
+            continue
+        queryset = GameChannel.objects.filter(pk__in=channel_ids)
+        if transition is ChannelTransition.DESTROY:
+            queryset.delete()
+        else:
+            queryset.update(status=statuses[transition])
+
+
+@sync_to_async
+def async_apply_channel_transitions(completed: dict[ChannelTransition, list[int]]) -> None:
+    """Async wrapper to record completed lifecycle actions"""
+    return apply_channel_transitions(completed)
@@ -1,4 +1,6 @@
-from django.db.models import QuerySet
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Q, F, Count, Exists, QuerySet
 from django.utils import timezone
 from asgiref.sync import sync_to_async
 
@@ -48,7 +50,7 @@ def get_user_credit_locked(user: CustomUser) -> QuerySet:
 
 
 @sync_to_async
-def get_user_credit_locked(user: CustomUser) -> QuerySet:
+def async_get_user_credit_locked(user: CustomUser) -> list[Credit]:
     """Asyncronous wrapper to retrieve all currently used credits"""
     queryset = get_user_credit_locked(user)
     # Forcing to list collapses the lazy queryset down to a solved query before we leave syncronous context
@@ -57,19 +59,21 @@ def get_user_credit_locked(user: CustomUser) -> QuerySet:
 
 # ########################################################################## #
 def spend_user_credit_on_game(user: CustomUser, game: Game, cost: int = 1, lock: bool = False) -> list[Credit]:
-    """spend a user's available credit on a game"""
+    """spend a user's available credit on a game, using the credits closest to expiry first"""
     now = timezone.now()
-    credits = get_user_credit_available(user)
-    credits.order_by("datetime_expiry")
-
-    selected_credits = credits[:cost]
-    if len(selected_credits) != cost:
-        raise GameCreditException("Insufficient credit")
-
-    for credit in selected_credits:
-        credit.update(game=game, datetime_spent=now, locked=lock, purpose="game_credit")
-        credit = credit.save()
-    return selected_credits
+    game_type = ContentType.objects.get_for_model(Game)
+    with transaction.atomic():
+        credits = get_user_credit_available(user).select_for_update()
+        credits = credits.order_by(F("datetime_expiry").asc(nulls_last=True), "pk")
+        selected = list(credits.values_list("pk", flat=True)[:cost])
+        if len(selected) != cost:
+            raise GameCreditException("Insufficient credit")
+        # Without row locking (SQLite) another spend may have taken some of these since they were selected
+        spendable = Credit.objects.filter(pk__in=selected, datetime_spent=None, locked=False)
+        spent = spendable.update(target_type=game_type, target_id=game.pk, datetime_spent=now, locked=lock)
+        if spent != cost:
+            raise GameCreditException("Insufficient credit")
+    return list(Credit.objects.filter(pk__in=selected))
 
 
 @sync_to_async
@@ -77,3 +81,37 @@ def async_spend_user_credit_on_game(user: CustomUser, game: Game, cost: int = 1,
     """Async wrapper to spend credits on a game"""
     updated_credits = spend_user_credit_on_game(user, game, cost, lock)
     return updated_credits
+
+
+# ########################################################################## #
+def refund_user_credit_for_game(user_id: int, game_id: int) -> int:
+    """Return the credits a user spent on a game that hasn't started yet, unless they have been locked"""
+    game_type = ContentType.objects.get_for_model(Game)
+    queryset = Credit.objects.filter(owner_id=user_id, target_type=game_type, target_id=game_id, locked=False)
+    queryset = queryset.filter(Exists(Game.objects.filter(pk=game_id, datetime__gte=timezone.now())))
+    return queryset.update(target_type=None, target_id=None, datetime_spent=None)
+
+
+@sync_to_async
+def async_refund_user_credit_for_game(user_id: int, game_id: int) -> int:
+    """Async wrapper to refund the credits spent on a game"""
+    return refund_user_credit_for_game(user_id, game_id)
+
+
+def get_user_credit_balance(user: CustomUser) -> dict:
+    """Summarise a user's credits by state, in a single query"""
+    now = timezone.now()
+    expired = Q(datetime_spent=None, datetime_expiry__lte=now)
+    unspent = Q(datetime_spent=None) & ~expired
+    return user.credits.aggregate(
+        available=Count("pk", filter=unspent & Q(locked=False)),
+        spent=Count("pk", filter=~Q(datetime_spent=None)),
+        locked=Count("pk", filter=Q(locked=True) & ~expired),
+        expired=Count("pk", filter=expired),
+    )
+
+
+@sync_to_async
+def async_get_user_credit_balance(user: CustomUser) -> dict:
+    """Async wrapper to summarise a user's credits"""
+    return get_user_credit_balance(user)
@@ -1,6 +1,6 @@
 from datetime import timedelta, datetime
 from django.utils import timezone
-from django.db.models import Q, QuerySet
+from django.db.models import Q, F, QuerySet
 from asgiref.sync import sync_to_async
 
 from discord import User as DiscordUser
@@ -9,8 +9,7 @@ from core.models import Game, Player, CustomUser
 from discord_bot.logs import logger as log
 from core.utils.players import get_player_max_games, get_player_game_count
 from core.utils.players import get_user_highest_rank
-from core.utils.user import get_user_available_credit, user_on_dm_banlist
-from core.utils.sanctions import get_current_user_bans
+from core.utils.signups import get_signup_eligibility
 
 
 # ########################################################################## #
@@ -90,6 +89,33 @@ def async_get_wait_list(game: Game) -> list[Player]:
     return list(queryset)
 
 
+# ########################################################################## #
+def get_game_embed_data(games: list[Game]) -> dict[int, dict]:
+    """Load the players, waitlist, DM and DM user for a set of games in two queries, keyed by game ID"""
+    game_ids = [game.pk for game in games]
+    data = {}
+    queryset = Game.objects.filter(pk__in=game_ids).select_related("dm", "dm__user")
+    for game in queryset:
+        dm = game.dm
+        data[game.pk] = {"players": [], "waitlist": [], "dm": dm, "dm_user": dm.user if dm else None}
+
+    queryset = Player.objects.filter(game_id__in=data.keys()).order_by("waitlist", "pk")
+    for player in queryset:
+        if player.standby:
+            data[player.game_id]["waitlist"].append(player)
+        else:
+            data[player.game_id]["players"].append(player)
+    for game_data in data.values():
+        game_data["players"].sort(key=lambda player: player.pk)
+    return data
+
+
+@sync_to_async
+def async_get_game_embed_data(games: list[Game]) -> dict[int, dict]:
+    """Async wrapper to load the data needed to render a set of game embeds"""
+    return get_game_embed_data(games)
+
+
 # ########################################################################## #
 def player_dropout_permitted(game: Game) -> bool:
     """Check if game can be dropped or if players are locked in"""
@@ -213,7 +239,49 @@ def get_outstanding_games(priority=False):
 def async_get_outstanding_games(priority=False):
     """async wrapper for getting outstanding games"""
     return get_outstanding_games(priority)
-    
+
+
+# ########################################################################## #
+def get_release_schedule() -> list[tuple]:
+    """Get the release times of all upcoming games as (game id, patreon release, general release)"""
+    now = timezone.now()
+    queryset = Game.objects.filter(ready=True).filter(datetime__gte=now)
+    queryset = queryset.filter(Q(datetime_release__isnull=False) | Q(datetime_open_release__isnull=False))
+    queryset = queryset.values_list("pk", "datetime_release", "datetime_open_release")
+    # force evaluation before leaving this sync context
+    return list(queryset)
+
+
+@sync_to_async
+def async_get_release_schedule() -> list[tuple]:
+    """async wrapper for getting game release times"""
+    return get_release_schedule()
+
+
+# ########################################################################## #
+def bump_game_version(*game_ids) -> int:
+    """Mark the specified games as changed so that their discord embeds are re-rendered"""
+    return Game.objects.filter(pk__in=game_ids).update(version=F("version") + 1)
+
+
+def bump_dm_game_versions(dm_id: int) -> int:
+    """Mark all upcoming games run by a DM as changed"""
+    expiry = timezone.now() - timedelta(days=1)
+    queryset = Game.objects.filter(dm_id=dm_id).filter(datetime__gte=expiry)
+    return queryset.update(version=F("version") + 1)
+
+
+def get_game_versions(game_ids) -> dict[int, int]:
+    """Get the current change version of each of the specified games"""
+    queryset = Game.objects.filter(pk__in=game_ids).values_list("pk", "version")
+    return dict(queryset)
+
+
+@sync_to_async
+def async_get_game_versions(game_ids) -> dict[int, int]:
+    """Async wrapper to get game change versions"""
+    return get_game_versions(game_ids)
+
 
 # ########################################################################## #
 def get_game_by_id(game_id):
@@ -256,20 +324,11 @@ def async_db_force_add_player_to_game(game: Game, user: CustomUser):
 
 def user_can_join_game(user: CustomUser, game: Game) -> bool:
     """perform a go / no go check for adding a given player to a game (by discord ID)"""
-    # If use is DM, already playing or waitlisted they can't join
-    if user == game.dm.user:
-        return False
-    if Player.objects.filter(game=game).filter(user=user).exists():
-        return False
-    if get_user_available_credit(user) <= 0:
-        return False
-
-    # If user is banned they can't join
-    if get_current_user_bans(user.discord_id):
-        return False
-    if user_on_dm_banlist(user, game.dm):
-        return False
-    return True
+    # Release timing is enforced by which channel the game is posted to, so only the user's own status is checked
+    verdict = get_signup_eligibility(user, game, check_release=False)
+    if not verdict:
+        log.debug(f"[>] {user.discord_name} cannot join {game.name}: {verdict.reason.name}")
+    return bool(verdict)
 
 
 def check_discord_user_available_credit(user: DiscordUser) -> int:
@@ -283,23 +342,20 @@ def check_discord_user_available_credit(user: DiscordUser) -> int:
 
 
 # ########################################################################## #
-def check_game_expired(game: Game) -> bool:
-    """See if a game object has reached expiry"""
-    game = get_game_by_id(game.id)
-    if not game:
-        return True
+def get_expired_game_ids(game_ids: list[int]) -> set[int]:
+    """From a list of game IDs, identify those which have expired, been withdrawn or no longer exist"""
+    if not game_ids:
+        return set()
     expiry = timezone.now() - timedelta(days=1)
-    if game.datetime < expiry:
-        return True
-    if not game.ready:
-        return True
-    return False
+    queryset = Game.objects.filter(pk__in=game_ids).filter(ready=True).filter(datetime__gte=expiry)
+    live_game_ids = set(queryset.values_list("pk", flat=True))
+    return set(game_ids) - live_game_ids
 
 
 @sync_to_async
-def async_check_game_expired(game: Game) -> bool:
-    """Async wrapper for checking if a game has expired"""
-    return check_game_expired(game)
+def async_get_expired_game_ids(game_ids: list[int]) -> set[int]:
+    """Async wrapper for identifying expired games"""
+    return get_expired_game_ids(game_ids)
 
 
 # ########################################################################## #
@@ -1,51 +1,147 @@
-from django.db import transaction
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+
+from django.db import transaction, connection
+from django.db.models import F
 from sequences import get_next_value
 
 from core.models import CustomUser, Game, Player
 from core.errors import ChannelError
 from core.utils.channel_members import add_user_to_game_channel, remove_user_from_game_channel
 from core.utils.channels import get_game_channel_for_game
+from core.utils.signups import get_signup_eligibility
 
 from discord_bot.logs import logger as log
 
+# Databases without row locking (SQLite) take their write lock for each signup, which other processes (web API and bot)
+# wait on. Threads in this process queue on a per-game lock first, rather than contending for the database write lock.
+# Each game maps to its lock and the number of threads holding or waiting on it, and is removed once that reaches zero
+_signup_locks = {}
+_signup_locks_lock = Lock()
+# Time spent waiting for signup locks, reported by the signup benchmarks
+signup_lock_stats = {"acquired": 0, "wait_total": 0.0, "wait_max": 0.0}
+
+
+def record_signup_lock_wait(waited: float):
+    """Update the signup lock statistics once a lock has been acquired"""
+    with _signup_locks_lock:
+        signup_lock_stats["acquired"] += 1
+        signup_lock_stats["wait_total"] += waited
+        signup_lock_stats["wait_max"] = max(signup_lock_stats["wait_max"], waited)
+
+
+@contextmanager
+def process_signup_lock(game_id: int):
+    """Hold this process's lock for a game, discarding it once no other thread is waiting on it"""
+    with _signup_locks_lock:
+        entry = _signup_locks.setdefault(game_id, [Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _signup_locks_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _signup_locks[game_id]
+
+
+@contextmanager
+def game_signup_lock(game_id: int):
+    """Hold an exclusive lock on a game row for the duration of a transaction"""
+    started = perf_counter()
+    if connection.features.has_select_for_update:
+        with transaction.atomic():
+            max_players = Game.objects.select_for_update().values_list("max_players", flat=True).get(pk=game_id)
+            record_signup_lock_wait(perf_counter() - started)
+            yield max_players
+        return
+
+    with process_signup_lock(game_id), transaction.atomic():
+        # Writing to the game takes the database write lock now, rather than at the first insert after the checks
+        Game.objects.filter(pk=game_id).update(version=F("version"))
+        record_signup_lock_wait(perf_counter() - started)
+        yield Game.objects.values_list("max_players", flat=True).get(pk=game_id)
+
 
 # ########################################################################## #
-def add_user_to_game(user: CustomUser, game: Game, force: bool = False) -> bool:
-    """2024 Rework - Attempt to add a user to a game"""
+def place_user_in_game(user: CustomUser, game: Game, join_party: bool) -> tuple[Player, bool]:
+    """Create (or promote) the player for a user, returning the player and whether it is a new player"""
+    # Discord data currently still stored on player object for transition
+    # TODO convert this to a through model
+    discord_data = {"discord_id": user.discord_id, "discord_name": user.discord_name or "Masked stranger"}
+
+    if not join_party:
+        # Add player to end of waitlist
+        waitlist = get_next_value(f"game-{game.pk}")
+        return Player.objects.create(game=game, user=user, waitlist=waitlist, standby=True, **discord_data), True
+
+    # check to see if player is in the waitlist, and being force-added by the DM
+    player = Player.objects.filter(game_id=game.pk, user=user).first()
+    if player:
+        player.standby = False
+        player.discord_id = discord_data["discord_id"]
+        player.discord_name = discord_data["discord_name"]
+        player.save(update_fields=["standby", "discord_id", "discord_name"])
+        return player, False
+    # User not already in waitlist, add a new player object to party
+    return Player.objects.create(game=game, user=user, waitlist=0, standby=False, **discord_data), True
+
+
+def place_eligible_user(
+    user: CustomUser, game: Game, join_party: bool, force: bool = False, check_release: bool = False
+) -> tuple[Player | None, bool]:
+    """Place a user in a game if they may sign up to it (or are forced in), called with the game's signup lock held"""
+    if not force:
+        verdict = get_signup_eligibility(user, game, check_release)
+        if not verdict:
+            log.debug(f"[>] {user.discord_name} cannot join {game.name}: {verdict.reason.name}")
+            return None, False
+    return place_user_in_game(user, game, join_party)
+
+
+def add_users_to_game(
+    users: list[CustomUser], game: Game, force: bool = False, check_release: bool = False
+) -> list[Player | None]:
+    """Add eligible users to a game in the order given, placing each in the party or waitlist under a single lock"""
+    if not users:
+        return []
+    players = []
     try:
-        current_players = game.players.all()
-        if current_players.count() >= game.max_players and not force:  # party is full
-            # Add player to end of waitlist
-            with transaction.atomic():
-                player = Player.objects.create(
-                    game=game, user=user, waitlist=get_next_value(f"game-{game.pk}"), standby=True
-                )
-        else:
-            try:
-                # check to see if player is in the waitlist, and being force-added by the DM
-                player = Player.objects.get(game=game, user=user)
-                player.standby = False
-            except Player.DoesNotExist:
-                # User not already in waitlist, add a new player object to party
-                player = Player.objects.create(game=game, user=user, waitlist=0, standby=False)
+        with game_signup_lock(game.pk) as max_players:
+            player_count = Player.objects.filter(game_id=game.pk).count()
+            for user in users:
+                join_party = force or player_count < max_players
+                try:
+                    # Each user gets a savepoint, so that one failed signup doesn't undo the rest of the batch
+                    with transaction.atomic():
+                        player, created = place_eligible_user(user, game, join_party, force, check_release)
+                except Exception as e:
+                    log.error(f"[!] Exception occured when adding user {user.username} to game {game.name}: {e}")
+                    player, created = None, False
+                player_count += created
+                players.append(player)
+    except Exception as e:
+        usernames = ", ".join(user.username for user in users)
+        log.error(f"[!] Exception occured when adding users {usernames} to game {game.name}: {e}")
+        return [None] * len(users)
 
-        try:
-            channel = get_game_channel_for_game(game)
-            add_user_to_game_channel(user, channel, read_only=player.standby)
-        except ChannelError:
-            pass  # channel doesn't exist yet
-        except Exception as e:
-            log.error(f"[!] Exception in add_user_to_game: {e}")
-
-        # Discord data currently still stored on player object for transition
-        # TODO convert this to a through model
-        player.discord_id = user.discord_id
-        player.discord_name = user.discord_name or "Masked stranger"
-        player.save()
-        # Remove above lines when no longer required
-        return player
+    try:
+        channel = get_game_channel_for_game(game)
+        for user, player in zip(users, players):
+            if player:
+                add_user_to_game_channel(user, channel, read_only=player.standby)
+    except ChannelError:
+        pass  # channel doesn't exist yet
     except Exception as e:
-        log.error(f"[!] Exception occured when adding user {user.username} to game {game.name}")
+        log.error(f"[!] Exception in add_users_to_game: {e}")
+    return players
+
+
+def add_user_to_game(user: CustomUser, game: Game, force: bool = False, check_release: bool = False) -> Player | None:
+    """2024 Rework - Attempt to add a user to a game"""
+    return add_users_to_game([user], game, force, check_release)[0]
 
 
 def remove_user_from_game(user: CustomUser, game: Game) -> bool:
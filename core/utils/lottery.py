@@ -0,0 +1,146 @@
+from random import SystemRandom
+
+from asgiref.sync import sync_to_async
+from django.db.models import F, Count, Exists, OuterRef
+from django.utils import timezone
+from sequences import get_next_values
+
+from core.models import CustomUser, Game, Lottery, LotteryTicket, Player
+from core.errors import ChannelError
+from core.exceptions import LotteryException
+from core.utils.channel_members import add_user_to_game_channel
+from core.utils.channels import get_game_channel_for_game
+from core.utils.games import bump_game_version
+from core.utils.games_rework import game_signup_lock
+from core.utils.balances import invalidate_credit_balances
+from core.utils.signups import Eligibility, SignupVerdict, get_signup_eligibility, get_signup_eligibilities
+
+from discord_bot.logs import logger as log
+
+
+# ########################################################################## #
+def get_open_lottery(game: Game) -> Lottery | None:
+    """Get the lottery currently selling tickets for a game, if there is one"""
+    now = timezone.now()
+    queryset = Lottery.objects.filter(game_id=game.pk, draw_done=False)
+    queryset = queryset.filter(datetime_open__lte=now, datetime_draw__gt=now)
+    return queryset.order_by("datetime_draw").first()
+
+
+@sync_to_async
+def async_get_open_lottery(game: Game) -> Lottery | None:
+    """Async wrapper to get the open lottery for a game"""
+    return get_open_lottery(game)
+
+
+def buy_lottery_tickets(user: CustomUser, game: Game, count: int = 1) -> int:
+    """Buy tickets in the open lottery for a game, returning the number of tickets now held by the user"""
+    lottery = get_open_lottery(game)
+    if not lottery:
+        raise LotteryException("There is no lottery open for this game")
+
+    # Serialised with signups and the draw, so that nothing checked here changes before the tickets are issued
+    with game_signup_lock(game.pk):
+        verdict = get_signup_eligibility(user, game, check_release=False)
+        if verdict.reason not in [Eligibility.ELIGIBLE, Eligibility.LOTTERY_PENDING]:
+            raise LotteryException(str(verdict))
+        held = LotteryTicket.objects.filter(lottery=lottery, user=user).count()
+        if held + count > lottery.ticket_limit:
+            raise LotteryException(f"You cannot hold more than {lottery.ticket_limit} tickets in this lottery")
+        # The check constraint on the lottery row prevents overselling, even if tickets are issued some other way
+        queryset = Lottery.objects.filter(pk=lottery.pk, draw_done=False, datetime_draw__gt=timezone.now())
+        queryset = queryset.filter(tickets_sold__lte=F("max_tickets") - count)
+        if not queryset.update(tickets_sold=F("tickets_sold") + count):
+            raise LotteryException("There are no tickets left in this lottery")
+        LotteryTicket.objects.bulk_create([LotteryTicket(lottery=lottery, user=user) for _ in range(count)])
+    return held + count
+
+
+@sync_to_async
+def async_buy_lottery_tickets(user: CustomUser, game: Game, count: int = 1) -> int:
+    """Async wrapper to buy lottery tickets for a game"""
+    return buy_lottery_tickets(user, game, count)
+
+
+# ########################################################################## #
+def draw_order(entrants: dict, rng=None) -> list:
+    """Weighted random ordering of entrants without replacement, where the weight is the number of tickets held"""
+    rng = rng or SystemRandom()
+    # Sorting on u^(1/w) matches repeatedly drawing a single weighted winner without replacement (Efraimidis-Spirakis)
+    keys = {entrant: rng.random() ** (1 / tickets) for entrant, tickets in entrants.items()}
+    return sorted(keys, key=keys.get, reverse=True)
+
+
+def get_due_lotteries(now=None) -> list[Lottery]:
+    """Get all lotteries which have reached their draw time without being drawn"""
+    now = now or timezone.now()
+    queryset = Lottery.objects.filter(draw_done=False, datetime_draw__lte=now).select_related("game")
+    return list(queryset.order_by("datetime_draw"))
+
+
+@sync_to_async
+def async_get_due_lotteries() -> list[Lottery]:
+    """Async wrapper to get all lotteries waiting to be drawn"""
+    return get_due_lotteries()
+
+
+def entrant_eligible(user: CustomUser, game: Game, verdict: SignupVerdict) -> bool:
+    """Check that a drawn entrant could still sign up to the game"""
+    if verdict.reason in [Eligibility.ELIGIBLE, Eligibility.LOTTERY_PENDING]:
+        return True
+    log.info(f"[-] Lottery entrant {user.discord_name} skipped for {game.name}: {verdict}")
+    return False
+
+
+def draw_lottery(lottery: Lottery, rng=None) -> list[Player]:
+    """Draw a lottery, filling the free seats in the party and then the waitlist in the order the entrants are drawn"""
+    game = lottery.game
+    players = []
+    with game_signup_lock(game.pk) as max_players:
+        # Claiming the draw inside the transaction ensures that each lottery is only ever drawn once
+        if not Lottery.objects.filter(pk=lottery.pk, draw_done=False).update(draw_done=True):
+            return []
+        joined = Player.objects.filter(game_id=game.pk)
+        tickets = LotteryTicket.objects.filter(lottery_id=lottery.pk).exclude(user=None)
+        tickets = tickets.exclude(Exists(joined.filter(user=OuterRef("user"))))
+        entrants = dict(tickets.values("user").annotate(count=Count("pk")).values_list("user", "count"))
+        users = CustomUser.objects.in_bulk(entrants.keys())
+        # Entrants may have been banned or used up their credit since buying their tickets
+        verdicts = get_signup_eligibilities(users.values(), game, check_release=False)
+        order = [
+            user_id
+            for user_id in draw_order(entrants, rng)
+            if entrant_eligible(users[user_id], game, verdicts[user_id])
+        ]
+
+        seats = max(max_players - joined.count(), 0)
+        waitlisted = max(len(order) - seats, 0)
+        positions = iter(get_next_values(waitlisted, f"game-{game.pk}") if waitlisted else [])
+        for drawn, user_id in enumerate(order):
+            user = users[user_id]
+            standby = drawn >= seats
+            player = Player(game=game, user=user, standby=standby, waitlist=next(positions) if standby else 0)
+            player.discord_id = user.discord_id
+            player.discord_name = user.discord_name or "Masked stranger"
+            players.append(player)
+        Player.objects.bulk_create(players)
+        # Bulk creation bypasses the player signals
+        bump_game_version(game.pk)
+        invalidate_credit_balances(*[player.discord_id for player in players])
+    log.info(f"[+] Lottery drawn for {game.name}: {min(seats, len(order))} seats filled, {waitlisted} waitlisted")
+
+    try:
+        channel = get_game_channel_for_game(game)
+        for player in players:
+            add_user_to_game_channel(player.user, channel, read_only=player.standby)
+    except ChannelError:
+        pass  # channel doesn't exist yet
+    except Exception as e:
+        log.error(f"[!] Exception in draw_lottery: {e}")
+    return players
+
+
+@sync_to_async
+def async_draw_lottery(lottery: Lottery) -> list[Player]:
+    """Async wrapper to draw a lottery"""
+    return draw_lottery(lottery)
@@ -1,13 +1,16 @@
 from datetime import timedelta, datetime
 
 from asgiref.sync import sync_to_async
-from django.db.models import Q, Sum, QuerySet
+from django.db.models import Q, F, Sum, QuerySet
 from django.utils import timezone
 
 from core.models.auth import CustomUser
+from core.models.game import Game
 from core.models.players import BonusCredit, Player
 from discord_bot.logs import logger as log
 from core.utils.ranks import get_user_highest_rank
+from core.utils.balances import get_credit_balance
+from core.utils.games_rework import game_signup_lock
 
 
 @sync_to_async
@@ -49,14 +52,16 @@ def get_bonus_credits(discord_id: str) -> int:
     return total["credits__sum"] or 0
 
 
+def get_rank_max_games(discord_user) -> int:
+    """get the number of games allowed by a user's highest ranked discord role"""
+    rank = get_user_highest_rank(discord_user.roles)
+    return rank.max_games if rank else 0
+
+
 def get_player_max_games(discord_user) -> int:
     """get the total number of games a user can sign up for"""
-    max_games = 0
-    rank = get_user_highest_rank(discord_user.roles)
-    if rank:
-        max_games = max_games + rank.max_games
-    bonuses = get_bonus_credits(str(discord_user.id))
-    return max_games + bonuses
+    balance = get_credit_balance(discord_user.id)
+    return get_rank_max_games(discord_user) + balance.bonus_games
 
 
 def get_user_pending_games_count(discord_id: str) -> int:
@@ -70,9 +75,8 @@ def get_user_pending_games_count(discord_id: str) -> int:
 
 def get_user_signups_remaining(user) -> int:
     """Get the total number of signups the user has availble to them"""
-    max_games = get_player_max_games(user)
-    game_count = get_user_pending_games_count(str(user.id))
-    return max_games - game_count
+    balance = get_credit_balance(user.id)
+    return get_rank_max_games(user) + balance.bonus_games - balance.pending_games
 
 
 @sync_to_async
@@ -84,8 +88,9 @@ def async_get_user_signups_remaining(user) -> int:
 @sync_to_async
 def async_get_player_credit_text(user):
     """Get a text string explaining to the user how many game credits they have"""
-    credits = get_user_signups_remaining(user)
-    max_games = get_player_max_games(user)
+    balance = get_credit_balance(user.id)
+    max_games = get_rank_max_games(user) + balance.bonus_games
+    credits = max_games - balance.pending_games
     if credits:
         return f"{credits} / {max_games} game credits available"
     else:
@@ -95,19 +100,22 @@ def async_get_player_credit_text(user):
 # ############################################################################### #
 def populate_game_from_waitlist(game):
     """fill a game up using the waitlist, return a list of the promoted players"""
-    promoted = []
-    players = Player.objects.filter(game=game).filter(standby=False)
-
-    while len(players) < game.max_players:
-        next = Player.objects.filter(game=game).filter(standby=True).order_by("waitlist").first()
-        if next:
-            next.standby = False
-            next.save()
-            promoted.append(next)
-            players = Player.objects.filter(game=game).filter(standby=False)
-        else:
-            log.info("[.] Not enough waitlisted players to fill game")
-            break
+    with game_signup_lock(game.pk) as max_players:
+        free_seats = max_players - Player.objects.filter(game_id=game.pk, standby=False).count()
+        if free_seats <= 0:
+            return []
+
+        waitlist = Player.objects.filter(game_id=game.pk, standby=True).select_related("user")
+        promoted = list(waitlist.order_by("waitlist", "pk")[:free_seats])
+        if promoted:
+            Player.objects.filter(pk__in=[player.pk for player in promoted]).update(standby=False)
+            # Bulk updates bypass the player signals, so the game is marked as changed here instead
+            Game.objects.filter(pk=game.pk).update(version=F("version") + 1)
+
+    for player in promoted:
+        player.standby = False
+    if len(promoted) < free_seats:
+        log.info("[.] Not enough waitlisted players to fill game")
     return promoted
 
 
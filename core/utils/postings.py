@@ -0,0 +1,104 @@
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from core.models import Game, GamePosting, PostingChannel, CalendarPosting
+
+
+# ########################################################################## #
+def create_game_posting(game: Game, channel_id, message_id, jump_url: str = "") -> GamePosting:
+    """Record that a game has been announced, replacing any previous record for that game"""
+    GamePosting.objects.filter(game=game).delete()
+    posting = GamePosting.objects.create(
+        game=game,
+        channel_id=str(channel_id),
+        message_id=str(message_id),
+        jump_url=jump_url,
+    )
+    return posting
+
+
+@sync_to_async
+def async_create_game_posting(game: Game, channel_id, message_id, jump_url: str = "") -> GamePosting:
+    """Async wrapper to record a game announcement"""
+    return create_game_posting(game, channel_id, message_id, jump_url)
+
+
+# ########################################################################## #
+def get_game_postings(channel_id=None) -> list[GamePosting]:
+    """Get all recorded game announcements, optionally limited to a single channel"""
+    queryset = GamePosting.objects.select_related("game", "game__dm")
+    if channel_id:
+        queryset = queryset.filter(channel_id=str(channel_id))
+    queryset = queryset.order_by("datetime_posted")
+    # force evaluation before leaving this sync context
+    return list(queryset)
+
+
+@sync_to_async
+def async_get_game_postings(channel_id=None) -> list[GamePosting]:
+    """Async wrapper to retrieve recorded game announcements"""
+    return get_game_postings(channel_id)
+
+
+# ########################################################################## #
+def remove_game_postings(game_ids: list[int]) -> int:
+    """Remove the posting records for the specified games"""
+    deleted, _ = GamePosting.objects.filter(game_id__in=game_ids).delete()
+    return deleted
+
+
+@sync_to_async
+def async_remove_game_postings(game_ids: list[int]) -> int:
+    """Async wrapper to remove posting records"""
+    return remove_game_postings(game_ids)
+
+
+# ########################################################################## #
+def get_adopted_channel_ids() -> set[str]:
+    """Get the IDs of the signup channels whose message history has already been scanned for announcements"""
+    return set(PostingChannel.objects.values_list("channel_id", flat=True))
+
+
+@sync_to_async
+def async_get_adopted_channel_ids() -> set[str]:
+    """Async wrapper to get the channels already scanned for announcements"""
+    return get_adopted_channel_ids()
+
+
+def set_channel_adopted(channel_id) -> PostingChannel:
+    """Record that a signup channel's message history has been scanned, so that it is never scanned again"""
+    channel, _ = PostingChannel.objects.get_or_create(channel_id=str(channel_id))
+    return channel
+
+
+@sync_to_async
+def async_set_channel_adopted(channel_id) -> PostingChannel:
+    """Async wrapper to record a scanned channel"""
+    return set_channel_adopted(channel_id)
+
+
+# ########################################################################## #
+def get_calendar_posting(channel_id) -> CalendarPosting | None:
+    """Get the record of the calendar message for a channel"""
+    return CalendarPosting.objects.filter(channel_id=str(channel_id)).first()
+
+
+@sync_to_async
+def async_get_calendar_posting(channel_id) -> CalendarPosting | None:
+    """Async wrapper to get the calendar message record"""
+    return get_calendar_posting(channel_id)
+
+
+def set_calendar_posting(channel_id, message_id, digest: str = "") -> CalendarPosting:
+    """Record the calendar message for a channel along with the digest of its content"""
+    posting, _ = CalendarPosting.objects.update_or_create(
+        channel_id=str(channel_id),
+        defaults={"message_id": str(message_id), "digest": digest, "datetime_updated": timezone.now()},
+    )
+    return posting
+
+
+@sync_to_async
+def async_set_calendar_posting(channel_id, message_id, digest: str = "") -> CalendarPosting:
+    """Async wrapper to record the calendar message"""
+    return set_calendar_posting(channel_id, message_id, digest)
@@ -1,25 +1,74 @@
 from typing import List
+from threading import Lock
+from time import monotonic
 
-from django.db.models import Q
+from django.db import connection, transaction
 from discord.role import Role as DiscordRole
 
 from core.models import Rank
 
+# Rank changes made by other processes (web interface, admin panel) are picked up after this many seconds
+RANK_INDEX_TTL = 300
+
+
+class RankIndex:
+    """Process wide lookup table of ranks by discord role ID and lower case name, reloaded when ranks change"""
+
+    def __init__(self, ttl: float = RANK_INDEX_TTL):
+        """initialisation function"""
+        self.ttl = ttl
+        self.by_id = None
+        self.by_name = None
+        self.loaded = 0
+        self.uncommitted = False
+        self.lock = Lock()
+
+    def load(self) -> tuple[dict, dict]:
+        """Read all ranks from the database into lookup tables"""
+        ranks = list(Rank.objects.all())
+        by_id = {rank.discord_id: rank for rank in ranks if rank.discord_id}
+        by_name = {rank.name.lower(): rank for rank in ranks}
+        return by_id, by_name
+
+    def get_tables(self) -> tuple[dict, dict]:
+        """Get the lookup tables, loading them if they are missing or out of date"""
+        with self.lock:
+            if self.uncommitted and connection.in_atomic_block:
+                # Rank changes which could still be rolled back are read without being cached
+                return self.load()
+            if self.by_id is None or monotonic() - self.loaded > self.ttl:
+                self.by_id, self.by_name = self.load()
+                self.loaded = monotonic()
+                self.uncommitted = False
+            return self.by_id, self.by_name
+
+    def invalidate(self):
+        """Discard the lookup tables so that they are reloaded when next used"""
+        with self.lock:
+            self.by_id = None
+            self.by_name = None
+            if connection.in_atomic_block:
+                self.uncommitted = True
+                transaction.on_commit(self.invalidate)
+
+    def get_ranks(self, roles: list) -> list[Rank]:
+        """Find the ranks matching a list of discord roles, role IDs or names"""
+        by_id, by_name = self.get_tables()
+        ranks = []
+        for role in roles:
+            if type(role) is DiscordRole:
+                ranks.append(by_name.get(role.name.lower()))
+            elif type(role) is str:
+                ranks.append(by_id.get(role) or by_name.get(role.lower()))
+        return [rank for rank in ranks if rank]
+
+
+rank_index = RankIndex()
+
 
 def get_ranks_for_discord_roles(discord_user_roles: list) -> list[Rank]:
     """Gather a list of rank objects for a given list of rank names, identifiers or discord roles"""
-    user_ranks = []
-
-    for role in discord_user_roles:
-        try:
-            if type(role) is DiscordRole:
-                rank = Rank.objects.get(name__iexact=role.name)
-            elif type(role) is str:
-                rank = Rank.objects.get(Q(discord_id=role) | Q(name__iexact=role))
-            user_ranks.append(rank)
-        except Exception as e:
-            pass
-    return user_ranks
+    return rank_index.get_ranks(discord_user_roles)
 
 
 def get_highest_rank(ranks: List[Rank]) -> Rank:
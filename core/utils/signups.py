@@ -0,0 +1,135 @@
+from enum import Enum
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q, Exists, OuterRef, Value
+from django.utils import timezone
+
+from core.models import CustomUser, DM, DMBanList, Game, Player, Rank, Ban, Lottery
+from core.models.players import UserCreditBalance
+from core.utils.balances import get_credit_balance, get_credit_balances
+
+
+class Eligibility(Enum):
+    """Outcome of a signup eligibility check, in the order the checks are applied"""
+
+    ELIGIBLE = "You can sign up to this game"
+    IS_DM = "You cannot play in your own game"
+    ALREADY_JOINED = "You are already in this game"
+    BANNED = "You are currently banned from using this system"
+    NOT_RELEASED = "You lack the roles needed to sign up to this game"
+    DM_BANLISTED = "You may not sign up to games run by this DM"
+    NO_CREDIT = "You do not have any available credits"
+    LOTTERY_PENDING = "Places in this game will be decided by lottery"
+
+
+class SignupVerdict:
+    """Result of evaluating whether a user may sign up to a game, along with the facts used to decide"""
+
+    def __init__(self, reason: Eligibility, available_credit: int = 0):
+        """initialisation function"""
+        self.reason = reason
+        self.available_credit = available_credit
+
+    def __bool__(self):
+        return self.reason is Eligibility.ELIGIBLE
+
+    def __str__(self):
+        return self.reason.value
+
+
+def get_signup_facts_queryset(user_ids: list[int], game: Game, now=None):
+    """Users annotated with everything needed to decide if they can join a game, apart from their credit"""
+    now = now or timezone.now()
+    user_ranks = Rank.objects.filter(users=OuterRef("pk"))
+    bans = Ban.objects.filter(discord_id=OuterRef("discord_id"), datetime_start__lte=now)
+    bans = bans.filter(Q(datetime_end__gte=now) | Q(datetime_end=None))
+    joined = Player.objects.filter(game_id=game.pk)
+    joined = joined.filter(Q(user=OuterRef("pk")) | Q(discord_id=OuterRef("discord_id")))
+
+    lottery_pending = Value(False)
+    if game.signup_type == Game.SignUpTypes.LOTTERY:
+        # A lottery without both an opening and a draw time is never run, so it can't hold up signups
+        lotteries = Lottery.objects.filter(game_id=game.pk, draw_done=False)
+        lottery_pending = Exists(lotteries.exclude(datetime_open=None).exclude(datetime_draw=None))
+
+    return CustomUser.objects.filter(pk__in=user_ids).annotate(
+        is_dm=Exists(DM.objects.filter(pk=game.dm_id, user=OuterRef("pk"))),
+        already_joined=Exists(joined),
+        banned=Exists(bans),
+        dm_banlisted=Exists(DMBanList.objects.filter(dm_id=game.dm_id, user=OuterRef("pk"))),
+        is_patreon=Exists(user_ranks.filter(patreon=True)),
+        is_res_dm=Exists(user_ranks.filter(name__startswith="ResDM")),
+        lottery_pending=lottery_pending,
+    )
+
+
+def get_signup_facts(user: CustomUser, game: Game, now=None) -> CustomUser:
+    """Fetch everything needed to decide if a user can join a game, apart from their credit, in a single query"""
+    return get_signup_facts_queryset([user.pk], game, now).get()
+
+
+def game_released_to_user(facts: CustomUser, game: Game, now=None) -> bool:
+    """Check if a game has been released to a user, based on their ranks"""
+    now = now or timezone.now()
+    # users cannot join a game which is not marked as ready
+    if not game.ready:
+        return False
+    # if game is in general release, everyone can sign up
+    if game.datetime_open_release and game.datetime_open_release < now:
+        return True
+    # game not pre-released to patreons (at all, or yet)
+    if not game.datetime_release or game.datetime_release > now:
+        return False
+    # game is currently available to patreon users only
+    return facts.is_patreon or facts.is_res_dm
+
+
+def decide_signup_eligibility(
+    facts: CustomUser, available_credit: int, game: Game, check_release: bool = True, now=None
+) -> SignupVerdict:
+    """Apply the signup checks in order to a user's signup facts and available credit"""
+    if facts.is_dm:
+        return SignupVerdict(Eligibility.IS_DM, available_credit)
+    if facts.already_joined:
+        return SignupVerdict(Eligibility.ALREADY_JOINED, available_credit)
+    if facts.banned:
+        return SignupVerdict(Eligibility.BANNED, available_credit)
+    if check_release and not game_released_to_user(facts, game, now):
+        return SignupVerdict(Eligibility.NOT_RELEASED, available_credit)
+    if facts.dm_banlisted:
+        return SignupVerdict(Eligibility.DM_BANLISTED, available_credit)
+    if available_credit <= 0:
+        return SignupVerdict(Eligibility.NO_CREDIT, available_credit)
+    # Games in lottery mode are only open to direct signups once the draw has been made
+    if facts.lottery_pending:
+        return SignupVerdict(Eligibility.LOTTERY_PENDING, available_credit)
+    return SignupVerdict(Eligibility.ELIGIBLE, available_credit)
+
+
+def get_signup_eligibility(user: CustomUser, game: Game, check_release: bool = True) -> SignupVerdict:
+    """Decide whether a user may sign up to a game, with the reason if they may not"""
+    now = timezone.now()
+    facts = get_signup_facts(user, game, now)
+    # The same stored balance shown to the user by /credit, reconciled against a full calculation by the verifier
+    available_credit = get_credit_balance(user.discord_id).available
+    return decide_signup_eligibility(facts, available_credit, game, check_release, now)
+
+
+def get_signup_eligibilities(
+    users: list[CustomUser], game: Game, check_release: bool = True
+) -> dict[int, SignupVerdict]:
+    """Decide whether each of a number of users may sign up to a game, in a fixed number of queries"""
+    now = timezone.now()
+    facts = get_signup_facts_queryset([user.pk for user in users], game, now).in_bulk()
+    balances = get_credit_balances([user.discord_id for user in facts.values()])
+    verdicts = {}
+    for user_id, user_facts in facts.items():
+        available_credit = balances.get(str(user_facts.discord_id), UserCreditBalance()).available
+        verdicts[user_id] = decide_signup_eligibility(user_facts, available_credit, game, check_release, now)
+    return verdicts
+
+
+@sync_to_async
+def async_get_signup_eligibility(user: CustomUser, game: Game, check_release: bool = True) -> SignupVerdict:
+    """Async wrapper to decide whether a user may sign up to a game"""
+    return get_signup_eligibility(user, game, check_release)
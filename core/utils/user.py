@@ -2,30 +2,19 @@ from asgiref.sync import sync_to_async
 
 from django.utils import timezone
 
-from core.utils.players import get_bonus_credits, get_user_pending_games_count
-from core.utils.ranks import get_highest_rank, has_res_dm_ranks, has_patreon_ranks
+from core.utils.balances import get_credit_balance
+from core.utils.ranks import has_res_dm_ranks, has_patreon_ranks
 from core.models import CustomUser, DM, Player, Game
 
 
 def get_user_max_credit(user: CustomUser) -> int:
     """Get the maximum credit balance for a given user"""
-    max_games = 0
-    try:
-        ranks = list(user.ranks.all())
-        rank = get_highest_rank(ranks)
-    except Exception as e:
-        print(e)
-    if rank:
-        max_games = rank.max_games
-    bonuses = get_bonus_credits(user.discord_id)
-    return max_games + bonuses
+    return get_credit_balance(user.discord_id).max_games
 
 
 def get_user_available_credit(user: CustomUser) -> int:
     """Attempt to get the available credits for a logged in user"""
-    total_credits = get_user_max_credit(user)
-    used_credits = get_user_pending_games_count(user.discord_id)
-    return total_credits - used_credits
+    return get_credit_balance(user.discord_id).available
 
 
 # ###################################################################### #
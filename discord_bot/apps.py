@@ -10,4 +10,4 @@ class DiscordbotConfig(AppConfig):
 
     def ready(self):
         """when app starts"""
-        pass
+        from discord_bot import signals  # noqa: F401 - registers signal receivers
@@ -1,6 +1,11 @@
 from discord.ext.commands import has_any_role
 
 from discord_bot.bot import bot
+from discord_bot.utils.outbound import outbound_queue
+from discord_bot.utils.views import view_registry
+from discord_bot.utils.users import member_resolver
+from discord_bot.utils.timing import startup_timer
+from discord_bot.utils.admission import signup_queue
 from config.settings import DISCORD_GUILDS, DISCORD_ADMIN_ROLES
 
 
@@ -16,3 +21,25 @@ async def resummon(ctx):
         delete_after=10,
     )
     exit()
+
+
+@bot.slash_command(guild_ids=DISCORD_GUILDS, description="Show the status of the bot's discord request handling")
+@has_any_role(*DISCORD_ADMIN_ROLES)
+async def bot_status(ctx):
+    """Report outbound queue depth and wait times, registered views, lookup cache, signup batching and startup time"""
+    lookups = member_resolver.get_stats()
+    signups = signup_queue.stats
+    lines = [
+        f"Outbound requests queued: {len(outbound_queue)}",
+        f"Persistent views registered: {len(view_registry)}",
+        f"User lookups: {lookups['hits']} cached, {lookups['misses']} fetched (hit rate {lookups['hit_rate']})",
+        f"Signups: {len(signup_queue)} queued, {signups['submitted']} handled in {signups['batches']} batches "
+        f"(largest {signups['largest_batch']})",
+    ]
+    for name, metrics in outbound_queue.get_metrics().items():
+        lines.append(
+            f"{name}: depth {metrics['depth']}, sent {metrics['completed']}, failed {metrics['failed']}, "
+            f"coalesced {metrics['coalesced']}, wait avg {metrics['wait_avg']}s / max {metrics['wait_max']}s"
+        )
+    lines.extend(f"Startup - {line}" for line in startup_timer.get_report())
+    await ctx.respond("\n".join(lines), ephemeral=True)
@@ -11,6 +11,7 @@ from core.utils.players import async_get_user_from_player
 from core.errors import ChannelError
 from discord_bot.utils.time import discord_countdown
 from discord_bot.utils.messaging import async_send_dm
+from discord_bot.utils.users import async_get_discord_user
 from discord_bot.utils.embed import async_update_game_embeds
 from discord_bot.utils.channel import async_remove_discord_member_from_game_channel
 
@@ -144,7 +145,7 @@ async def tag_players(ctx):
     for party_member in party:
         user = await async_get_user_from_player(party_member)
         try:
-            discord_user = await bot.fetch_user(user.discord_id)
+            discord_user = await async_get_discord_user(user.discord_id)
             message += f"{discord_user.mention} "
         except Exception as e:
             pass
@@ -174,7 +175,7 @@ async def warn_waitlist(ctx):
     waitlist = await async_get_wait_list(game)
     try:
         player = waitlist[0]
-        discord_user = await bot.fetch_user(player.discord_id)
+        discord_user = await async_get_discord_user(player.discord_id)
 
         message = f"You are at the top of the waitlist for **{game.name}**"
         message += f" which starts {discord_countdown(game.datetime)}"
@@ -9,6 +9,7 @@ from core.utils.games import (
     async_get_upcoming_games,
     async_get_upcoming_games_for_dm_discord_id,
     async_get_upcoming_games_for_discord_id,
+    async_get_game_embed_data,
 )
 from core.utils.players import async_get_player_credit_text
 
@@ -16,6 +17,17 @@ from discord_bot.components.games import GameSummaryEmbed
 from discord_bot.utils.time import discord_time
 
 
+async def build_summary_embeds(games: list, colour: Colour = None) -> list[GameSummaryEmbed]:
+    """Build summary embeds for a list of games, loading the data for all of them at once"""
+    game_data = await async_get_game_embed_data(games)
+    embeds = []
+    for game in games:
+        summary_embed = GameSummaryEmbed(game, colour=colour, data=game_data.get(game.pk))
+        await summary_embed.build()
+        embeds.append(summary_embed)
+    return embeds
+
+
 @bot.slash_command(guild_ids=DISCORD_GUILDS, description="Summary of your upcoming games (both playing and DMing)")
 async def games(ctx):
     """Retrieve a list of the users upcoming games and provide a summary"""
@@ -33,29 +45,17 @@ async def games(ctx):
     await ctx.respond(f"As of: {discord_time(now)}\n{game_credit_text}", ephemeral=True)
 
     if dming:
-        embeds = []
-        for game in dming[:10]:
-            summary_embed = GameSummaryEmbed(game, colour=Colour.blue())
-            await summary_embed.build()
-            embeds.append(summary_embed)
+        embeds = await build_summary_embeds(dming[:10], colour=Colour.blue())
         message = f"You are DMing {len(dming)} games"
         await ctx.respond(message, embeds=embeds, ephemeral=True)
 
     if games:
-        embeds = []
-        for game in games[:10]:
-            summary_embed = GameSummaryEmbed(game, colour=Colour.dark_purple())
-            await summary_embed.build()
-            embeds.append(summary_embed)
+        embeds = await build_summary_embeds(games[:10], colour=Colour.dark_purple())
         message = f"You are registered for {len(games)} games"
         await ctx.respond(message, embeds=embeds, ephemeral=True)
 
     if waitlist:
-        embeds = []
-        for game in waitlist[:10]:
-            summary_embed = GameSummaryEmbed(game, colour=Colour.dark_green())
-            await summary_embed.build()
-            embeds.append(summary_embed)
+        embeds = await build_summary_embeds(waitlist[:10], colour=Colour.dark_green())
         message = f"You are waitlisted for {len(waitlist)} games"
         await ctx.respond(message, embeds=embeds, ephemeral=True)
 
@@ -69,32 +69,20 @@ async def check_games(ctx, user: Option(Member, "Member to check", required=True
 
     games = await async_get_upcoming_games_for_discord_id(user, waitlisted=False)
     if games:
-        embeds = []
-        for game in games[:10]:
-            summary_embed = GameSummaryEmbed(game, colour=Colour.dark_purple())
-            await summary_embed.build()
-            embeds.append(summary_embed)
+        embeds = await build_summary_embeds(games[:10], colour=Colour.dark_purple())
         message = f"Playing in {len(games)} games"
         await ctx.respond(message, embeds=embeds, ephemeral=True)
 
     
     waitlist = await async_get_upcoming_games_for_discord_id(user, waitlisted=True)
     if waitlist:
-        embeds = []
-        for game in waitlist[:10]:
-            summary_embed = GameSummaryEmbed(game, colour=Colour.dark_green())
-            await summary_embed.build()
-            embeds.append(summary_embed)
+        embeds = await build_summary_embeds(waitlist[:10], colour=Colour.dark_green())
         message = f"Waitlisted for {len(waitlist)} games"
         await ctx.respond(message, embeds=embeds, ephemeral=True)
 
     dming = await async_get_upcoming_games_for_dm_discord_id(user.id)
     if dming:
-        embeds = []
-        for game in dming[:10]:
-            summary_embed = GameSummaryEmbed(game, colour=Colour.blue())
-            await summary_embed.build()
-            embeds.append(summary_embed)
+        embeds = await build_summary_embeds(dming[:10], colour=Colour.blue())
         message = f"DMing {len(dming)} games"
         await ctx.respond(message, embeds=embeds, ephemeral=True)
     if not games and not waitlist and not dming:
@@ -110,8 +98,5 @@ async def games_summary(ctx, days: Option(int, "Number of days", required=False)
     upcoming_games = await async_get_upcoming_games(days)
     embeds.append(Embed(title=f"Games in the next {days} days: [{len(upcoming_games)}]", colour=Colour.dark_purple()))
 
-    for game in upcoming_games[0:9]:
-        summary_embed = GameSummaryEmbed(game)
-        await summary_embed.build()
-        embeds.append(summary_embed)
+    embeds.extend(await build_summary_embeds(upcoming_games[0:9]))
     await ctx.respond(embeds=embeds, ephemeral=True)
@@ -8,6 +8,7 @@ from core.utils.user import async_user_is_player_in_game, async_get_user_by_disc
 from discord_bot.components.games import BaseGameEmbed
 from discord_bot.utils.embed import async_update_game_embeds
 from discord_bot.utils.players import async_do_waitlist_updates
+from discord_bot.utils.outbound import Priority, async_queue_call, async_queue_edit
 
 
 from discord_bot.components.common import handle_player_dropout_event
@@ -17,13 +18,13 @@ from discord_bot.logs import logger as log
 class MusteringBanner(BaseGameEmbed):
     """Banner announcing the game for the channel"""
 
-    def __init__(self, game):
+    def __init__(self, game, data=None):
         tier = calc_game_tier(game)
         if tier:
             title = f"Mustering for {game.name} (T{tier})"
         else:
             title = f"Mustering for {game.name}"
-        super().__init__(game, title)
+        super().__init__(game, title, data=data)
         self.game = game
 
     def __eq__(self, other):
@@ -73,7 +74,8 @@ class MusteringBanner(BaseGameEmbed):
     async def build(self):
         """Get data from database and populate the embed"""
         await self.get_data()
-        self.dm_user = await async_get_dm_user(self.dm)
+        if not self.data:
+            self.dm_user = await async_get_dm_user(self.dm)
 
         self.add_field(
             name=f"{self.game.module}",
@@ -108,6 +110,7 @@ class MusteringView(View):
     """View for mustering embed"""
 
     message = None
+    rendered_version = None
 
     def __init__(self, game):
         self.game = game
@@ -156,17 +159,23 @@ class MusteringView(View):
         """Update the message this view is attached to"""
         updated_banner = MusteringBanner(self.game)
         await updated_banner.refresh_game_data()
+        version = self.game.version
         await updated_banner.build()
+        self.rendered_version = version
         existing_banner = self.get_existing_banner_by_title(updated_banner.title)
         if existing_banner != updated_banner:
             embeds = self.update_message_embeds(existing_banner, updated_banner)
 
             if followup_hook:
-                await followup_hook.edit_message(message_id=self.message.id, embeds=embeds)
+                await async_queue_call(
+                    lambda: followup_hook.edit_message(message_id=self.message.id, embeds=embeds),
+                    Priority.INTERACTION,
+                    coalesce_key=f"edit-{self.message.id}",
+                )
             elif response_hook:
                 await response_hook.edit_message(embeds=embeds)
             else:
-                await self.message.edit(embeds=embeds)
+                await async_queue_edit(self.message, embeds=embeds)
         else:
             return
 
@@ -9,17 +9,21 @@ from discord_bot.utils.players import async_do_waitlist_updates
 from discord_bot.utils.time import discord_time, discord_countdown
 from discord_bot.utils.embed import async_update_game_embeds
 from discord_bot.utils.format import generate_calendar_message
-from discord_bot.utils.games import async_add_discord_member_to_game
+from discord_bot.utils.admission import signup_queue
+from discord_bot.utils.games import async_buy_discord_member_lottery_ticket
 from discord_bot.utils.messaging import async_send_dm
+from discord_bot.utils.outbound import Priority, async_queue_call, async_queue_edit
 from core.models.game import Game
 from core.utils.games import (
     async_get_player_list,
     async_get_wait_list,
     async_get_dm,
+    async_get_game_embed_data,
     is_patreon_exclusive,
     async_refetch_game_data,
     calc_game_tier,
 )
+from core.utils.lottery import async_get_open_lottery
 from core.utils.players import async_get_player_credit_text, async_get_user_signups_remaining
 from discord_bot.components.common import handle_player_dropout_event
 
@@ -27,9 +31,10 @@ from discord_bot.components.common import handle_player_dropout_event
 class BaseGameEmbed(Embed):
     """Baseclass for game embed objects"""
 
-    def __init__(self, game, title=None, colour=None):
-        """Create an empty embed from a Game objected"""
+    def __init__(self, game, title=None, colour=None, data=None):
+        """Create an empty embed from a Game objected, optionally with preloaded data from get_game_embed_data"""
         self.game = game
+        self.data = data
         if not colour:
             colour = self.game_type_colours[game.variant]
         if not title:
@@ -50,9 +55,18 @@ class BaseGameEmbed(Embed):
 
     async def get_data(self):
         """Asyncronous wrapper to retrieve data from Django elements"""
-        self.players = await async_get_player_list(self.game)
-        self.waitlist = await async_get_wait_list(self.game)
-        self.dm = await async_get_dm(self.game)
+        if not self.data:
+            game_data = await async_get_game_embed_data([self.game])
+            self.data = game_data.get(self.game.pk)
+        if self.data:
+            self.players = self.data["players"]
+            self.waitlist = self.data["waitlist"]
+            self.dm = self.data["dm"]
+            self.dm_user = self.data["dm_user"]
+        else:
+            self.players = await async_get_player_list(self.game)
+            self.waitlist = await async_get_wait_list(self.game)
+            self.dm = await async_get_dm(self.game)
 
     def get_game_time(self):
         """Helper function to get the game time string"""
@@ -73,13 +87,13 @@ class BaseGameEmbed(Embed):
 class GameSummaryEmbed(BaseGameEmbed):
     """Custom embed for summary view of game"""
 
-    def __init__(self, game, colour=None):
+    def __init__(self, game, colour=None, data=None):
         tier = calc_game_tier(game)
         if tier:
             title = f"{game.name} (T{tier})"
         else:
             title = f"{game.name}"
-        super().__init__(game, title=title, colour=colour)
+        super().__init__(game, title=title, colour=colour, data=data)
 
     def get_player_info(self):
         """get a string that shows current player status"""
@@ -121,13 +135,13 @@ class GameSummaryEmbed(BaseGameEmbed):
 class GameDetailEmbed(BaseGameEmbed):
     """Embed for game detail view"""
 
-    def __init__(self, game: Game):
+    def __init__(self, game: Game, data=None):
         tier = calc_game_tier(game)
         if tier:
             title = f"{game.datetime.strftime('%Y/%m/%d')} {game.name} (T{tier})"
         else:
             title = f"{game.datetime.strftime('%Y/%m/%d')} {game.name}"
-        super().__init__(game, title)
+        super().__init__(game, title, data=data)
         self.game = game
 
     def __eq__(self, other):
@@ -213,6 +227,7 @@ class GameControlView(View):
     """View for game signup controls"""
 
     message = None
+    rendered_version = None
 
     def __init__(self, game):
         self.game = game
@@ -272,17 +287,24 @@ class GameControlView(View):
         """Update the message this view is attached to"""
         detail_embed = GameDetailEmbed(self.game)
         await detail_embed.refresh_game_data()
+        # version is read before the players so that any change made during the render triggers another
+        version = self.game.version
         await detail_embed.build()
+        self.rendered_version = version
 
         existing_embed = self.get_existing_embed_by_title(detail_embed.title)
         if existing_embed != detail_embed:
             embeds = self.update_message_embeds(existing_embed, detail_embed)
             if followup_hook:
-                return await followup_hook.edit_message(message_id=self.message.id, embeds=embeds)
+                return await async_queue_call(
+                    lambda: followup_hook.edit_message(message_id=self.message.id, embeds=embeds),
+                    Priority.INTERACTION,
+                    coalesce_key=f"edit-{self.message.id}",
+                )
             elif response_hook:
                 return await response_hook.edit_message(embeds=embeds)
             else:
-                return await self.message.edit(embeds=embeds)
+                return await async_queue_edit(self.message, embeds=embeds)
         else:
             return
 
@@ -290,11 +312,18 @@ class GameControlView(View):
         """Callback for signup button pressed"""
         await interaction.response.defer(ephemeral=True)
         log.info(f"[>] User {interaction.user.name} signed up for game {self.game.name}")
-        player = await async_add_discord_member_to_game(interaction.user, self.game)
+        # Until the draw is made, signing up to a lottery game buys a ticket instead of a place
+        if self.game.signup_type == Game.SignUpTypes.LOTTERY and await async_get_open_lottery(self.game):
+            message = await async_buy_discord_member_lottery_ticket(interaction.user, self.game)
+            await async_queue_call(lambda: interaction.followup.send(message, ephemeral=True), Priority.INTERACTION)
+            return True
+        # Signups are admitted in arrival order alongside any others for this game, waitlist updates included
+        player = await signup_queue.submit(self.game, interaction.user)
         if not player:
             credits = await async_get_user_signups_remaining(interaction.user)
-            await interaction.followup.send(
-                f"Unable to add you to this game - {credits} signup credits available", ephemeral=True, delete_after=10
+            message = f"Unable to add you to this game - {credits} signup credits available"
+            await async_queue_call(
+                lambda: interaction.followup.send(message, ephemeral=True, delete_after=10), Priority.INTERACTION
             )
             return False
         games_remaining_text = await async_get_player_credit_text(interaction.user)
@@ -302,7 +331,6 @@ class GameControlView(View):
             message = f"You're playing in {self.game.name} `({games_remaining_text})`"
         else:
             message = f"Added you to the waitlist for {self.game.name} `({games_remaining_text})`"
-        await async_do_waitlist_updates(self.game)
         pending = []
         pending.append(create_task(async_update_game_embeds(self.game)))
         pending.append(create_task(async_send_dm(interaction.user, message)))
@@ -313,7 +341,9 @@ class GameControlView(View):
         """Calendar button callback"""
         await interaction.response.defer(ephemeral=True, invisible=False)
         message = generate_calendar_message(self.game)
-        await interaction.followup.send(message, ephemeral=True, embeds=[])
+        await async_queue_call(
+            lambda: interaction.followup.send(message, ephemeral=True, embeds=[]), Priority.INTERACTION
+        )
 
     async def game_listing_view_dropout(self, interaction):
         """Callback for dropout button pressed"""
@@ -1,20 +1,28 @@
 from datetime import timedelta
+from hashlib import sha256
 from discord.ext import tasks
+from discord.errors import NotFound
 from django.utils import timezone
 
+from discord_bot.bot import bot
 from discord_bot.logs import logger as log
 from config.settings import CALENDAR_CHANNEL_NAME
 from discord_bot.utils.messaging import get_channel_by_name, async_get_bot_game_postings
 from discord_bot.utils.time import discord_date
+from discord_bot.utils.embed import get_embed_digest
+from discord_bot.utils.outbound import async_queue_send, async_queue_edit
 from discord_bot.components.games import GameSummaryEmbed
 from discord_bot.components.banners import CalendarSummaryBanner
-from core.utils.games import async_get_upcoming_games
+from core.utils.games import async_get_upcoming_games, async_get_game_embed_data, is_patreon_exclusive
+from core.utils.postings import async_get_calendar_posting, async_set_calendar_posting
 
 
 class GamesCalendarManager:
     initialised = False
     channel_calendar = None
-    messages = []
+    message = None
+    digest = ""
+    state = None
 
     def __init__(self):
         """initialisation function"""
@@ -26,36 +34,83 @@ class GamesCalendarManager:
         log.info("GamesCalendarManager initialising in background")
         self.channel_calendar = get_channel_by_name(CALENDAR_CHANNEL_NAME)
         if self.channel_calendar:
+            await self.recover_calendar_message()
             self.initialised = True
 
+    async def recover_calendar_message(self):
+        """Reconnect to the calendar message recorded in the database"""
+        posting = await async_get_calendar_posting(self.channel_calendar.id)
+        if posting:
+            try:
+                self.message = await self.channel_calendar.fetch_message(int(posting.message_id))
+                self.digest = posting.digest
+                return
+            except NotFound:
+                log.info("[-] Recorded calendar message no longer exists, a new one will be posted")
+                return
+
+        # No record of the calendar message, check for one posted before messages were recorded
+        messages = await async_get_bot_game_postings(self.channel_calendar)
+        if messages:
+            self.message = messages[0]
+
+    def get_calendar_state(self, games: list, start) -> str:
+        """Get a digest of everything shown in the calendar, changing when games are added, removed or updated"""
+        game_controller = bot.get_cog("GamesPoster")
+        state = [discord_date(start)]
+        for game in games:
+            jump_url = game_controller.get_jump_url(game) if game_controller else None
+            state.append(f"{game.pk}:{game.version}:{is_patreon_exclusive(game)}:{jump_url}")
+        return sha256("|".join(state).encode("utf8")).hexdigest()
+
     async def post_upcoming_games(self, days=30, games=[]):
         """Post a summary for each game occuring in the next N days"""
-        log.info("Updating upcoming games calendar post")
-        start = timezone.now()
+        # Only the dates are shown, so the state and digest stay the same until the day changes
+        start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
         end = start + timedelta(days=days)
         games = await async_get_upcoming_games(days=days, released=True)
 
+        state = self.get_calendar_state(games, start)
+        if self.message and state == self.state:
+            return False
+
         description = ""
         title = f"[{len(games)}] Upcoming games in the next [{days}] days;"
         title = title + f"\n\t{discord_date(start)} to {discord_date(end)}"
         if len(games) > 9:
             description = f"Display limited to the first nine events"
         embeds = [CalendarSummaryBanner(title=title, description=description)]
+        game_data = await async_get_game_embed_data(games[0:9])
         for game in games[0:9]:
-            summary = GameSummaryEmbed(game)
+            summary = GameSummaryEmbed(game, data=game_data.get(game.pk))
             await summary.build()
             embeds.append(summary)
 
-        if self.messages:
-            await self.messages[0].edit("", embeds=embeds)
+        digest = get_embed_digest(embeds)
+        if self.message and digest == self.digest:
+            self.state = state
+            return False
+
+        log.info("Updating upcoming games calendar post")
+        if self.message:
+            await async_queue_edit(self.message, content="", embeds=embeds)
         else:
-            await self.channel_calendar.send("", embeds=embeds)
+            self.message = await async_queue_send(self.channel_calendar, "", embeds=embeds)
+        await async_set_calendar_posting(self.channel_calendar.id, self.message.id, digest)
+        self.digest = digest
+        self.state = state
+        return True
 
     @tasks.loop(seconds=30)
     async def check_and_update_calendar(self):
         """post a summary of the next N days of games"""
         if not self.initialised:
             await self.startup()
+            if not self.initialised:
+                return
 
-        self.messages = await async_get_bot_game_postings(self.channel_calendar)
-        await self.post_upcoming_games()
+        try:
+            await self.post_upcoming_games()
+        except NotFound:
+            log.info("[-] Calendar message has been deleted, a new one will be posted")
+            self.message = None
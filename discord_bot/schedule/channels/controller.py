@@ -1,23 +1,28 @@
+from asyncio import gather, Semaphore
+
 from discord.ext import tasks, commands
+from discord.errors import NotFound
 from discord.utils import get
+from django.utils import timezone
 
 from config.settings import CHANNEL_SEND_PINGS
 from discord_bot.logs import logger as log
 from discord_bot.utils.time import get_hammertime, discord_countdown, discord_time
-from discord_bot.utils.views import add_persistent_view
-from discord_bot.utils.games import async_get_game_from_message, get_game_id_from_message
+from discord_bot.utils.views import ViewType, add_persistent_view, remove_persistent_views
 from discord_bot.utils.channel import async_create_channel_hidden
+from discord_bot.utils.outbound import Priority, async_queue_send, async_queue_call
+from discord_bot.utils.timing import startup_timer, MUSTERING_VIEWS_REGISTERED
 from discord_bot.utils.channel import async_get_all_game_channels_for_guild, async_get_channel_first_message
 from discord_bot.components.channels import MusteringBanner, MusteringView
-from core.utils.games import async_get_dm, async_get_player_list, async_get_wait_list
+from core.utils.games import async_get_game_embed_data
 from core.utils.channels import async_get_games_pending_channel_creation, async_set_game_channel_created
-from core.utils.channels import async_get_game_channels_pending_destruction, async_destroy_game_channel
-from core.utils.channels import async_get_games_pending_channel_reminder, async_set_game_channel_reminded
-from core.utils.channels import async_get_games_pending_channel_warning, async_set_game_channel_warned
-from core.utils.channels import async_set_game_channel_summarised, async_get_games_pending_summary_post
-from core.utils.channels import async_get_game_channel_for_game
+from core.utils.channels import async_get_game_channels_for_lifecycle, async_apply_channel_transitions
+from core.utils.channels import ChannelTransition, get_channel_transition
+from core.utils.channels import async_get_game_channels_for_recovery, async_set_game_channel_message
 from core.utils.channel_members import async_set_default_channel_membership
-from core.utils.user import async_dm_is_res_dm, async_get_dm_user
+
+# Upper limit on the number of mustering messages fetched from discord at the same time during startup
+MAX_CONCURRENT_RECOVERIES = 8
 
 
 class ChannelController(commands.Cog):
@@ -37,45 +42,34 @@ class ChannelController(commands.Cog):
         """cleanup function"""
         self.worker.cancel()
 
-    async def get_topic_text(self, game):
+    def get_topic_text(self, game, data):
         """build the game channel topic header"""
-        dm = await async_get_dm(game)
         topic_text = "This thread is for mustering for the following game: "
-        topic_text += f"{game.module} ({game.name}) | DMed by {dm.name} | "
+        topic_text += f"{game.module} ({game.name}) | DMed by {data['dm'].name} | "
         topic_text += f"Game is scheduled for {get_hammertime(game.datetime)}"
         return topic_text
 
-    async def get_ping_text(self, game, include_waitlist=False):
+    def get_ping_text(self, data, include_waitlist=False):
         """Get text that will ping each of the users mentioned"""
-        players = await async_get_player_list(game)
-        dm = await async_get_dm(game)
-        dm_user = await async_get_dm_user(dm)
-
-        ping_text = f"- DM: <@{dm_user.discord_id}>"
+        ping_text = f"- DM: <@{data['dm_user'].discord_id}>"
         ping_text += "\n- Players: "
-        ping_text += ",".join(f"<@{p.discord_id}>" for p in players)
+        ping_text += ",".join(f"<@{p.discord_id}>" for p in data["players"])
         if include_waitlist:
-            waitlist = await async_get_wait_list(game)
             ping_text += "\n- Waitlist: "
-            ping_text += ",".join(f"<@{p.discord_id}>" for p in waitlist)
+            ping_text += ",".join(f"<@{p.discord_id}>" for p in data["waitlist"])
         return ping_text
 
-    async def get_summary_text(self, game):
+    def get_summary_text(self, game, data):
         """Build a summary text post"""
-        players = await async_get_player_list(game)
-        dm = await async_get_dm(game)
-        dm_user = await async_get_dm_user(dm)
-        is_res_dm = await async_dm_is_res_dm(dm)
-
-        player_list = ",".join(f"<@{p.discord_id}>" for p in players)
+        player_list = ",".join(f"<@{p.discord_id}>" for p in data["players"])
 
         summary = "### Game details\n"
         summary += f"**Date:** {discord_time(game.datetime)}\n"
         summary += f"**Adventure:** {game.name}\n"
         summary += f"**Module Code:** {game.module}\n"
         summary += f"### Participants\n"
-        summary += f"- **DM:** <@{dm_user.discord_id}>\n"
-        if is_res_dm:
+        summary += f"- **DM:** <@{data['dm_user'].discord_id}>\n"
+        if data["dm_is_res_dm"]:
             summary += "- **Bonus Credit:** No\n"
         else:
             summary += "- **Bonus Credit:** Yes\n"
@@ -88,35 +82,57 @@ class ChannelController(commands.Cog):
         summary += f"-# You also receive 10 days of downtime and may take a level up"
         return f"```{summary}```"
 
-    async def get_flat_message_list(self, game, include_waitlist=False):
-        """Get a list of involved users, but in such a way as to not ping them"""
-        players = await async_get_player_list(game)
-        dm = await async_get_dm(game)
-        dm_user = await async_get_dm_user(dm)
+    def get_reminder_text(self, game, data):
+        """Build the 24 hour reminder message"""
+        message = f"# Reminder: {game.name}\n"
+        message += f"### This game is {discord_countdown(game.datetime)}\n"
+        message += f"{self.get_ping_text(data, include_waitlist=True)}\n"
+        message += (
+            "-# Please ensure that you have submitted all of the requested information if you are listed as a player"
+            " or you could be removed from the game.\n"
+            "-# If you are on the waitlist you do not need to do anything, **do not message the DM**. \n"
+            "-# Double check your availability for this game, no-showing the game may result in moderator action.\n"
+        )
+        return message
+
+    def get_warning_text(self, game, data):
+        """Build the 1 hour start warning message"""
+        message = f"# {game.name} is starting {discord_countdown(game.datetime)}\n"
+        message += f"{self.get_ping_text(data)}\n"
+        if game.tabletop:
+            # Putting links between < > prevents discord from creating an embed preview
+            message += f"### VTT info: <{game.tabletop}>\n"
+        message += f"-# This is your last chance to submit your character information before you are removed from play, "
+        message += f"please be ready in voice and VTT at least 5 minutes before the scheduled start."
+        return message
 
-        text = f"- DM: {dm_user.discord_name}"
+    def get_flat_message_list(self, data, include_waitlist=False):
+        """Get a list of involved users, but in such a way as to not ping them"""
+        text = f"- DM: {data['dm_user'].discord_name}"
         text += "\n- Players: "
-        text += ",".join(f"{p.discord_name}" for p in players if not p.standby)
+        text += ",".join(f"{p.discord_name}" for p in data["players"])
         if include_waitlist:
             text += "\n- Waitlist: "
-            text += ",".join(f"{p.discord_name}" for p in players if p.standby)
+            text += ",".join(f"{p.discord_name}" for p in data["waitlist"])
         return text
 
-    async def send_banner_message(self, channel, game):
+    async def send_banner_message(self, channel, game_channel, data):
         """send the welcome banner"""
+        game = game_channel.game
         try:
             control_view = MusteringView(game)
-            banner = MusteringBanner(game)
+            banner = MusteringBanner(game, data=data)
             await banner.build()
 
             if CHANNEL_SEND_PINGS:
-                ping_text = await self.get_ping_text(game)
-                message = await channel.send(ping_text, embed=banner, view=control_view)
+                ping_text = self.get_ping_text(data)
+                message = await async_queue_send(channel, ping_text, embed=banner, view=control_view)
             else:
-                flat_text = await self.get_flat_message_list(game)
-                message = await channel.send(flat_text, embed=banner, view=control_view)
+                flat_text = self.get_flat_message_list(data)
+                message = await async_queue_send(channel, flat_text, embed=banner, view=control_view)
             control_view.message = message
-            add_persistent_view(control_view)
+            add_persistent_view(control_view, ViewType.MUSTERING)
+            await async_set_game_channel_message(game_channel.pk, message.id)
             return True
         except Exception as e:
             log.error(f"Failed to send banner message to channel {channel.name}")
@@ -125,16 +141,20 @@ class ChannelController(commands.Cog):
     async def check_and_create_channels(self):
         """Get outstanding channels needed and create them where missing"""
         pending_games = await async_get_games_pending_channel_creation()
+        if not pending_games:
+            return
+        game_data = await async_get_game_embed_data(pending_games)
         for upcoming_game in pending_games:
+            data = game_data.get(upcoming_game.pk)
             log.info(f"[-] Creating channel for game: {upcoming_game.name}")
             channel_name = upcoming_game.datetime.strftime("%Y%m%d-") + upcoming_game.module
-            channel_topic = await self.get_topic_text(upcoming_game)
+            channel_topic = self.get_topic_text(upcoming_game, data)
             channel = await async_create_channel_hidden(self.guild, self.parent_category, channel_name, channel_topic)
             if channel:
                 game_channel = await async_set_game_channel_created(
                     upcoming_game, channel.id, channel.jump_url, channel.name
                 )
-                await self.send_banner_message(channel, upcoming_game)
+                await self.send_banner_message(channel, game_channel, data)
                 log.debug(f"[-] GameChannel created OK")
 
                 # now the channel has been created we can populate its membership list with the party
@@ -142,112 +162,106 @@ class ChannelController(commands.Cog):
                 if set_members:
                     log.debug(f"[-] Set channel membership list to default")
 
-    async def check_and_delete_channels(self):
-        """Go through any outstanding channels and delete anything older than 3 days"""
-        try:
-            expired_game_channels = await async_get_game_channels_pending_destruction()
-            for game_channel in expired_game_channels:
-                log.info(f"Removing game channel: {game_channel.name}")
-                channel = self.guild.get_channel(int(game_channel.discord_id))
-                if channel:
-                    await channel.delete()
-                else:
-                    log.info("Cannot retrieve the expected discord channel, assuming its been deleted manually...")
-                await async_destroy_game_channel(game_channel)
-        except Exception as e:
-            log.error(e)
+    async def do_channel_transition(self, game_channel, data, transition: ChannelTransition) -> bool:
+        """Carry out a lifecycle action for a game channel, returning True if it has been completed"""
+        game = game_channel.game
+        channel = self.guild.get_channel(int(game_channel.discord_id)) if game_channel.discord_id else None
 
-    async def check_and_remind_channels(self):
-        """Remind players 24 hours before their game"""
-        try:
-            upcoming_games = await async_get_games_pending_channel_reminder()
-            for game in upcoming_games:
-                game_channel = await async_get_game_channel_for_game(game)
-                log.info(f"[-] Sending 24 hour reminder to channel: {game_channel.name}")
-                channel = self.guild.get_channel(int(game_channel.discord_id))
+        if transition is ChannelTransition.DESTROY:
+            log.info(f"Removing game channel: {game_channel.name}")
+            if channel:
+                await async_queue_call(lambda: channel.delete(), Priority.HOUSEKEEPING, f"guild-{self.guild.id}")
+            else:
+                log.info("Cannot retrieve the expected discord channel, assuming its been deleted manually...")
+            remove_persistent_views(game.pk, ViewType.MUSTERING)
+            return True
 
-                ping_text = await self.get_ping_text(game, include_waitlist=True)
-                message = f"# Reminder: {game.name}\n"
-                message += f"### This game is {discord_countdown(game.datetime)}\n"
-                message += f"{ping_text}\n"
+        if not channel:
+            log.error(f"[!] Cannot retrieve discord channel for {game_channel.name}, skipping {transition.name}")
+            return False
+        if transition is ChannelTransition.SUMMARISE:
+            log.info(f"[-] Sending session log summary to channel: {game_channel.name}")
+            message = self.get_summary_text(game, data)
+        elif transition is ChannelTransition.WARN:
+            log.info(f"[-] Sending 1 hour start warning to channel: {game_channel.name}")
+            message = self.get_warning_text(game, data)
+        else:
+            log.info(f"[-] Sending 24 hour reminder to channel: {game_channel.name}")
+            message = self.get_reminder_text(game, data)
+        await async_queue_send(channel, message)
+        return True
 
-                message += (
-                    "-# Please ensure that you have submitted all of the requested information if you are listed as a player"
-                    " or you could be removed from the game.\n"
-                    "-# If you are on the waitlist you do not need to do anything, **do not message the DM**. \n"
-                    "-# Double check your availability for this game, no-showing the game may result in moderator action.\n"
-                )
-                await channel.send(message)
-                await async_set_game_channel_reminded(game_channel)
-        except Exception as e:
-            log.error(f"[!] Exception in check_and_remind_channels: {e}")
+    async def check_channel_lifecycles(self):
+        """Work out which lifecycle action is due for each game channel, carry them out and record the results"""
+        now = timezone.now()
+        completed = {transition: [] for transition in ChannelTransition}
+        for game_channel, data in await async_get_game_channels_for_lifecycle(now):
+            transition = get_channel_transition(game_channel, now)
+            if not transition:
+                continue
+            try:
+                if await self.do_channel_transition(game_channel, data, transition):
+                    completed[transition].append(game_channel.pk)
+            except Exception as e:
+                log.error(f"[!] Exception processing {transition.name} for channel {game_channel.name}: {e}")
+        await async_apply_channel_transitions(completed)
 
-    async def check_and_warn_channels(self):
-        """Remind players 1 hour before their game"""
-        try:
-            upcoming_games = await async_get_games_pending_channel_warning()
-            for game in upcoming_games:
-                game_channel = await async_get_game_channel_for_game(game)
-                log.info(f"[-] Sending 1 hour start warning to channel: {game_channel.name}")
-                channel = self.guild.get_channel(int(game_channel.discord_id))
+    async def recover_channel_state(self):
+        """Reattach the mustering views for every game channel recorded in the database"""
+        log.info("Reconnecting to existing mustering views")
+        game_channels = await async_get_game_channels_for_recovery()
 
-                ping_text = await self.get_ping_text(game)
-                message = f"# {game.name} is starting {discord_countdown(game.datetime)}\n"
-                message += f"{ping_text}\n"
-                if game.tabletop:
-                    # Putting links between < > prevents discord from creating an embed preview
-                    message += f"### VTT info: <{game.tabletop}>\n"
-                message += f"-# This is your last chance to submit your character information before you are removed from play, "
-                message += f"please be ready in voice and VTT at least 5 minutes before the scheduled start."
+        # Views are registered straight away, interactions supply their own message so buttons work immediately
+        views = []
+        for game_channel in game_channels:
+            control_view = MusteringView(game_channel.game)
+            add_persistent_view(control_view, ViewType.MUSTERING)
+            views.append((game_channel, control_view))
+        startup_timer.mark(MUSTERING_VIEWS_REGISTERED)
 
-                await channel.send(message)
-                await async_set_game_channel_warned(game_channel)
-        except Exception as e:
-            log.error(f"[!] Exception in check_and_warn_channels: {e}")
+        semaphore = Semaphore(MAX_CONCURRENT_RECOVERIES)
+        await gather(*[self.recover_mustering_message(*entry, semaphore) for entry in views])
+        startup_timer.mark("Mustering messages recovered")
+        await self.log_orphaned_channels(game_channels)
 
-    async def check_and_summarise_channels(self):
-        """Print a summary of the game details suitable for session logs for the DM at game start"""
-        try:
-            games = await async_get_games_pending_summary_post()
-            for game in games:
-                game_channel = await async_get_game_channel_for_game(game)
-                log.info(f"[-] Sending session log summary to channel: {game_channel.name}")
-                channel = self.guild.get_channel(int(game_channel.discord_id))
+    async def recover_mustering_message(self, game_channel, control_view, semaphore):
+        """Fetch the mustering banner for a game channel, so that its view can update it"""
+        channel = self.guild.get_channel(int(game_channel.discord_id))
+        if not channel:
+            log.warning(f"[!] Unable to find discord channel for {game_channel.name}, mustering view not connected")
+            return
 
-                summary_text = await self.get_summary_text(game)
-                await channel.send(summary_text)
-                await async_set_game_channel_summarised(game_channel)
-        except Exception as e:
-            log.error(f"[!] Exception in check_and_summarise_channels: {e}")
+        async with semaphore:
+            message = None
+            if game_channel.message_id:
+                try:
+                    message = await channel.fetch_message(int(game_channel.message_id))
+                except NotFound:
+                    log.warning(f"[!] Mustering banner for {game_channel.name} no longer exists")
+                    return
+            else:
+                # Channels created before banner messages were recorded need a one-off history read
+                message = await async_get_channel_first_message(channel)
+                if message:
+                    await async_set_game_channel_message(game_channel.pk, message.id)
 
-    async def recover_channel_state(self):
-        """Pull game postings from posting history and reconstruct a game/message status from it"""
-        log.info("Reconnecting to existing mustering views")
+        # An interaction may already have supplied the message while this one was being fetched
+        if message and not control_view.message:
+            control_view.message = message
+            log.info(f"[+] Reconnected mustering view for {game_channel.game.name}")
+
+    async def log_orphaned_channels(self, game_channels):
+        """Report any channels in the game category which no longer belong to a game"""
+        known_ids = set(game_channel.discord_id for game_channel in game_channels)
         for channel in await async_get_all_game_channels_for_guild(self.guild):
-            message = await async_get_channel_first_message(channel)
-            game = await async_get_game_from_message(message)
-            # Rebuild view handlers
-            if game:
-                control_view = MusteringView(game)
-                control_view.message = message
-                add_persistent_view(control_view)
-                log.info(f"[+] Reconnected mustering view for {game.name}")
-            elif message:
-                game_id = get_game_id_from_message(message)
-                log.error(
-                    f"[!] Identified potentially ophaned mustering channel (no game to match) for game ID: {game_id}"
-                )
-            else:
-                continue
+            if str(channel.id) not in known_ids:
+                log.error(f"[!] Identified potentially orphaned mustering channel (no game to match): {channel.name}")
 
     @tasks.loop(seconds=120)
     async def worker(self):
         try:            
             await self.check_and_create_channels()
-            await self.check_and_delete_channels()
-            await self.check_and_summarise_channels()
-            await self.check_and_warn_channels()
-            await self.check_and_remind_channels()
+            await self.check_channel_lifecycles()
         except Exception as e:
             log.error(f"[!] An unhandled exception has occured in the Channel Manager Loop: " + str(e))
 
@@ -1,18 +1,23 @@
 from typing import List
+from asyncio import Event, Lock, get_running_loop, wait_for, TimeoutError
+from threading import get_ident
 import traceback
 
 from discord import Member as DiscordMember
 from discord.ext import tasks, commands
 from discord.errors import NotFound
+from django.dispatch import receiver
 
 from discord_bot.logs import logger as log
 from core.models.channel import GameChannel, GameChannelMember
 from discord_bot.utils.channelmember import ChannelMember as ActualChannelMember
 
 from core.utils.channels import async_get_all_current_game_channels
-from core.utils.channel_members import async_get_game_channel_members
+from core.utils.channel_members import async_get_game_channel_members, async_claim_dirty_game_channels
+from core.utils.channel_members import channel_membership_changed
 from discord_bot.utils.channel import async_get_actual_channel_members, refresh_discord_channel
-from discord_bot.utils.channel import async_remove_discord_id_from_channel, async_add_member_to_channel
+from discord_bot.utils.channel import get_channel_overwrite_map, get_member_overwrite, async_apply_channel_overwrites
+from discord_bot.utils.users import member_resolver
 from discord_bot.utils.channel import (
     async_game_channel_tag_added_user,
     async_game_channel_tag_removed_user,
@@ -20,6 +25,97 @@ from discord_bot.utils.channel import (
     async_game_channel_tag_promoted_waitlist_user,
 )
 
+# Changes made outside of the bot process are picked up from the database at this interval
+DIRTY_POLL_SECONDS = 10
+# All channels are periodically resynced in case discord has drifted from the expected state
+FULL_SYNC_MINUTES = 15
+
+
+class DirtyChannelQueue:
+    """Game channel IDs with membership changes waiting to be applied, which can be added to from any thread"""
+
+    def __init__(self):
+        """initialisation function"""
+        self.channel_ids = set()
+        self.loop = None
+        self.loop_thread = None
+        self.wakeup = Event()
+
+    def attach(self):
+        """Bind the queue to the running event loop so that other threads can add to it"""
+        self.loop = get_running_loop()
+        self.loop_thread = get_ident()
+
+    def add(self, channel_id: int):
+        """Add a channel to the queue, must be called from the event loop thread"""
+        self.channel_ids.add(channel_id)
+        self.wakeup.set()
+
+    def mark(self, channel_id: int):
+        """Queue a channel for a membership sync, regardless of the calling thread"""
+        if self.loop is None or self.loop.is_closed():
+            return
+        if get_ident() == self.loop_thread:
+            return self.add(channel_id)
+        self.loop.call_soon_threadsafe(self.add, channel_id)
+
+    async def wait(self, timeout: float) -> set[int]:
+        """Wait until a channel has been queued or the timeout has passed, then take the queued channel IDs"""
+        if not self.channel_ids:
+            self.wakeup.clear()
+            try:
+                await wait_for(self.wakeup.wait(), timeout)
+            except TimeoutError:
+                pass  # time to check the database for changes made elsewhere
+        channel_ids, self.channel_ids = self.channel_ids, set()
+        return channel_ids
+
+
+dirty_channels = DirtyChannelQueue()
+
+
+@receiver(channel_membership_changed)
+def membership_changed(sender, channel_id, **kwargs):
+    """Queue a channel for syncing when its membership is changed by the bot process"""
+    dirty_channels.mark(channel_id)
+
+
+# ######################################################################## #
+def permission_update_needed(actual_member: ActualChannelMember, expected_member: GameChannelMember) -> bool:
+    """Compare a discord members permissions to their expected game channel member representation"""
+    if actual_member.read_messages != expected_member.read_messages:
+        return True
+    if actual_member.read_message_history != expected_member.read_message_history:
+        return True
+    if actual_member.send_messages != expected_member.send_messages:
+        return True
+    if actual_member.use_slash_commands != expected_member.use_slash_commands:
+        return True
+    if actual_member.manage_messages != expected_member.manage_messages:
+        return True
+    return False
+
+
+def get_membership_diff(
+    actual_channel_members: List[ActualChannelMember], expected: List[GameChannelMember]
+) -> tuple[List[GameChannelMember], List[ActualChannelMember], List[GameChannelMember]]:
+    """Compare the actual and expected channel members by discord ID, returning those to add, remove and update"""
+    actual_by_id = {str(member.discord_id): member for member in actual_channel_members}
+    expected_ids = set()
+
+    to_add, to_update = [], []
+    for expected_member in expected:
+        discord_id = str(expected_member.user.discord_id)
+        expected_ids.add(discord_id)
+        actual_member = actual_by_id.get(discord_id)
+        if not actual_member:
+            to_add.append(expected_member)
+        elif permission_update_needed(actual_member, expected_member):
+            to_update.append(expected_member)
+
+    to_remove = [member for discord_id, member in actual_by_id.items() if discord_id not in expected_ids]
+    return to_add, to_remove, to_update
+
 
 class ChannelMembershipController(commands.Cog):
     """Manager class for syncing channel membership to database state"""
@@ -28,135 +124,14 @@ class ChannelMembershipController(commands.Cog):
     def __init__(self, bot):
         """initialisation function"""
         self.bot = bot
+        self.sync_lock = Lock()
         self.worker.start()
+        self.dirty_worker.start()
 
     def cog_unload(self):
         """cleanup function"""
         self.worker.cancel()
-
-    def get_actual_channel_members_discord_id_list(self, members: List[ActualChannelMember]) -> List[str]:
-        member_ids = set(map(lambda x: str(x.discord_id), members))
-        return member_ids
-
-    def get_game_channel_member_id_list(self, gcm: List[GameChannelMember]) -> List[str]:
-        """get a list of all game channel member ids"""
-        gcm_ids = set(map(lambda x: x.user.discord_id, gcm))
-        return gcm_ids
-
-    ###### Member adding logic ######
-    def get_missing_users(
-        self, actual_channel_members: List[ActualChannelMember], gcm: List[GameChannelMember]
-    ) -> List[GameChannelMember]:
-        """Get all users which should be added to the channel"""
-        missing = []
-        member_ids = self.get_actual_channel_members_discord_id_list(actual_channel_members)
-
-        for game_channel_member in gcm:
-            if game_channel_member.user.discord_id in member_ids:
-                continue
-            missing.append(game_channel_member)
-        return missing
-
-    async def async_add_missing_members_to_channel(self, actual, expected, discord_channel):
-        """Identify players missing from the channel and add them"""
-        to_add = self.get_missing_users(actual, expected)
-
-        if to_add:
-            log.debug(f"[.] Adding {len(to_add)} users to channel {discord_channel.name}")
-        for missing_user in to_add:
-            if await async_add_member_to_channel(missing_user, discord_channel):
-                log.debug(f"[.] added user {missing_user.user.discord_name} to channel {discord_channel.name}")
-                if missing_user.send_messages:
-                    await async_game_channel_tag_added_user(discord_channel, missing_user)
-            else:
-                log.warning(
-                    f"[!] Failed to add user {missing_user.user.discord_name} to channel {discord_channel.name}"
-                )
-
-    ###### Member removal logic ######
-    def get_excess_users(
-        self, actual_channel_members: List[ActualChannelMember], gcm: List[GameChannelMember]
-    ) -> List[ActualChannelMember]:
-        """Get all users which should be removed from the channel"""
-        excess: List[ActualChannelMember] = []
-        gcm_ids = self.get_game_channel_member_id_list(gcm)
-        for member in actual_channel_members:
-            if str(member.discord_id) in gcm_ids:
-                continue
-            excess.append(member)
-        return excess
-
-    async def async_remove_excess_members_from_channel(
-        self, actual_channel_members: List[ActualChannelMember], expected, discord_channel
-    ):
-        """Identify any members who need to be removed and remove them"""
-        to_remove = self.get_excess_users(actual_channel_members, expected)
-
-        if to_remove:
-            log.debug(f"[.] Removing {len(to_remove)} users from channel {discord_channel.name}")
-        for excess_user in to_remove:
-            if await async_remove_discord_id_from_channel(excess_user.discord_id, discord_channel):
-                log.info(f"[-] Removed user {excess_user.display_name} from channel {discord_channel.name}")
-                # Only send "player left channel" messages for users who had send messages permissions - ie players, not waitlisters
-                if excess_user.send_messages:
-                    await async_game_channel_tag_removed_user(discord_channel, excess_user.display_name)
-            else:
-                log.warning(f"[!] Failed to remove {excess_user.display_name} from channel {discord_channel.name}")
-
-    ###### Member update logic ######
-    def permission_update_needed(self, actual_member: ActualChannelMember, expected_member: GameChannelMember) -> bool:
-        """Compare a discord members permissions to their expected game channel member representation"""
-        if actual_member.read_messages != expected_member.read_messages:
-            return True
-        if actual_member.read_message_history != expected_member.read_message_history:
-            return True
-        if actual_member.send_messages != expected_member.send_messages:
-            return True
-        if actual_member.use_slash_commands != expected_member.use_slash_commands:
-            return True
-        if actual_member.manage_messages != expected_member.manage_messages:
-            return True
-        return False
-
-    def get_expected_member(self, discord_id, expected: List[GameChannelMember]) -> GameChannelMember | None:
-        """find a game channel member with a specific ID"""
-        for gcm in expected:
-            if gcm.user.discord_id == str(discord_id):
-                return gcm
-        return None
-
-    def get_updated_users(
-        self, actual_channel_members: List[ActualChannelMember], expected: List[GameChannelMember]
-    ) -> List[GameChannelMember]:
-        """Get all users who have outdated channel permissions"""
-        users_pending_update = []
-        try:
-            for actual_member in actual_channel_members:
-                expected_member = self.get_expected_member(actual_member.discord_id, expected)
-                if expected_member and self.permission_update_needed(actual_member, expected_member):
-                    users_pending_update.append(expected_member)
-        except IndexError:
-            pass  # user is not expected to be in channel
-        except Exception as e:
-            log.error(f"[!] Exception occured in get_updated_users: {e}")
-        # Could simplify logic here and just remove them. Rendering the remove users call moot
-        return users_pending_update
-
-    async def async_apply_permission_updates(self, actual, expected, discord_channel):
-        to_update = self.get_updated_users(actual, expected)
-
-        for member in to_update:
-            discord_name = member.user.discord_name
-
-            if await async_add_member_to_channel(member, discord_channel):
-                log.debug(f"[.] updated user permissions for {discord_name} in channel {discord_channel.name}")
-                if member.manage_messages:
-                    # Tag permissions updates when users are promoted to channel admin
-                    await async_game_channel_tag_modified_user_permissions(discord_channel, member)
-                else:
-                    await async_game_channel_tag_promoted_waitlist_user(discord_channel, member)
-            else:
-                log.warning(f"[!] Failed to update permissions for {discord_name} in channel {discord_channel.name}")
+        self.dirty_worker.cancel()
 
     # ######################################################################## #
     async def sync_channel_membership(self, game_channel: GameChannel):
@@ -170,23 +145,100 @@ class ChannelMembershipController(commands.Cog):
         expected_members = await async_get_game_channel_members(game_channel)
         actual_channel_members = await async_get_actual_channel_members(discord_channel)
 
-        await self.async_remove_excess_members_from_channel(actual_channel_members, expected_members, discord_channel)
-        await self.async_add_missing_members_to_channel(actual_channel_members, expected_members, discord_channel)
-        await self.async_apply_permission_updates(actual_channel_members, expected_members, discord_channel)
+        to_add, to_remove, to_update = get_membership_diff(actual_channel_members, expected_members)
+        if not to_remove and not to_add and not to_update:
+            return
+
+        overwrites = await self.get_desired_overwrites(discord_channel, to_remove, to_add + to_update)
+        log.debug(
+            f"[.] Updating channel {discord_channel.name}: "
+            f"{len(to_add)} added, {len(to_remove)} removed, {len(to_update)} changed"
+        )
+        if not await async_apply_channel_overwrites(discord_channel, overwrites):
+            log.warning(f"[!] Failed to update membership of channel {discord_channel.name}")
+            return
+        await self.announce_membership_changes(discord_channel, to_remove, to_add, to_update)
+
+    async def get_desired_overwrites(
+        self, discord_channel, to_remove: List[ActualChannelMember], to_set: List[GameChannelMember]
+    ) -> dict:
+        """Build the complete overwrite map for a channel with the membership changes applied"""
+        overwrites = get_channel_overwrite_map(discord_channel)
+        targets = {target.id: target for target in overwrites}
+
+        for excess_user in to_remove:
+            target = targets.get(int(excess_user.discord_id))
+            if target:
+                overwrites[target] = get_member_overwrite(None)
+
+        for member in to_set:
+            discord_id = int(member.user.discord_id)
+            target = targets.get(discord_id) or await member_resolver.resolve(discord_id)
+            if not target:
+                log.error(f"[!] Unable to find discord user id for: {member.user.username}")
+                continue
+            overwrites[target] = get_member_overwrite(member)
+        return overwrites
+
+    async def announce_membership_changes(self, discord_channel, to_remove, to_add, to_update):
+        """Post the join, leave and promotion messages once the channel permissions have been applied"""
+        for excess_user in to_remove:
+            log.info(f"[-] Removed user {excess_user.display_name} from channel {discord_channel.name}")
+            # Only send "player left channel" messages for users who had send messages permissions - ie players, not waitlisters
+            if excess_user.send_messages:
+                await async_game_channel_tag_removed_user(discord_channel, excess_user.display_name)
+
+        for missing_user in to_add:
+            log.debug(f"[.] added user {missing_user.user.discord_name} to channel {discord_channel.name}")
+            if missing_user.send_messages:
+                await async_game_channel_tag_added_user(discord_channel, missing_user)
+
+        for member in to_update:
+            log.debug(f"[.] updated user permissions for {member.user.discord_name} in channel {discord_channel.name}")
+            if member.manage_messages:
+                # Tag permissions updates when users are promoted to channel admin
+                await async_game_channel_tag_modified_user_permissions(discord_channel, member)
+            else:
+                await async_game_channel_tag_promoted_waitlist_user(discord_channel, member)
+
+    async def sync_channels(self, game_channels: List[GameChannel]):
+        """Sync a list of channels, one at a time"""
+        async with self.sync_lock:
+            for game_channel in game_channels:
+                try:
+                    await self.sync_channel_membership(game_channel)
+                except Exception as e:
+                    log.error(f"[!] Failed to sync membership of channel {game_channel.name}: {e}")
 
     # ################################### Worker loop definition ################################## #
-    @tasks.loop(seconds=20)
+    @tasks.loop(minutes=FULL_SYNC_MINUTES)
     async def worker(self):
         try:
             channels = await async_get_all_current_game_channels()
-            for channel in channels:
-                await self.sync_channel_membership(channel)
+            await self.sync_channels(channels)
         except Exception as e:
             log.error(f"[!] An unhandled exception has occured in the Channel Membership Controller Loop: " + str(e))
             log.debug(f"{traceback.format_exc()}")
-            self.initialised = False
 
     @worker.before_loop
     async def before_loop_start(self):
         await self.bot.wait_until_ready()
         log.info("[+] Starting service: Channel membership manager")
+
+    @tasks.loop(seconds=0)
+    async def dirty_worker(self):
+        try:
+            channel_ids = await dirty_channels.wait(DIRTY_POLL_SECONDS)
+            channels = await async_claim_dirty_game_channels(channel_ids)
+            if channels:
+                log.debug(f"[.] Syncing membership for {len(channels)} changed channels")
+                await self.sync_channels(channels)
+        except Exception as e:
+            log.error(f"[!] An unhandled exception has occured in the Channel Membership change worker: " + str(e))
+            log.debug(f"{traceback.format_exc()}")
+
+    @dirty_worker.before_loop
+    async def before_dirty_loop_start(self):
+        await self.bot.wait_until_ready()
+        dirty_channels.attach()
+        log.info("[+] Starting service: Channel membership change worker")
@@ -0,0 +1,34 @@
+from discord.ext import tasks, commands
+
+from discord_bot.logs import logger as log
+from core.utils.balances import async_verify_credit_balances
+
+# Stored credit balances are periodically checked against a full calculation in case they have drifted
+VERIFY_MINUTES = 60
+
+
+class CreditBalanceVerifier(commands.Cog):
+    bot = None
+
+    def __init__(self, bot):
+        """initialisation function"""
+        self.bot = bot
+        self.worker.start()
+
+    def cog_unload(self):
+        """cleanup function"""
+        self.worker.cancel()
+
+    @tasks.loop(minutes=VERIFY_MINUTES)
+    async def worker(self):
+        try:
+            corrected = await async_verify_credit_balances()
+            if corrected:
+                log.warning(f"[!] Corrected {corrected} credit balances which had drifted")
+        except Exception as e:
+            log.error(f"[!] An unhandled exception has occured in the Credit Balance Verifier Loop: " + str(e))
+
+    @worker.before_loop
+    async def before_loop_start(self):
+        await self.bot.wait_until_ready()
+        log.info("[+] Starting service: Credit balance verifier")
@@ -1,6 +1,8 @@
 from discord.ext import tasks, commands
 
 from discord_bot.logs import logger as log
+from discord_bot.utils.views import view_registry
+from core.utils.games import async_get_game_versions
 
 
 class EmbedController(commands.Cog):
@@ -15,11 +17,35 @@ class EmbedController(commands.Cog):
         """cleanup function"""
         self.worker.cancel()
 
+    def get_game_views(self) -> list:
+        """Get all registered game views which are attached to a message"""
+        return [view for view in view_registry.all() if view.message]
+
+    async def update_changed_views(self) -> int:
+        """Re-render only the views whose game has changed since they were last rendered"""
+        views = self.get_game_views()
+        if not views:
+            return 0
+        versions = await async_get_game_versions({view.game.pk for view in views})
+
+        updated = 0
+        for view in views:
+            version = versions.get(view.game.pk)
+            if version is None or version == view.rendered_version:
+                continue  # unchanged, or deleted and awaiting cleanup by its owner
+            try:
+                await view.update_message()
+                updated += 1
+            except Exception as e:
+                log.error(f"[!] Unable to update embed for game {view.game.name}: {e}")
+        return updated
+
     @tasks.loop(seconds=60)
     async def worker(self):
         try:
-            for view in self.bot.persistent_views:
-                await view.update_message()
+            updated = await self.update_changed_views()
+            if updated:
+                log.debug(f"[.] Updated {updated} changed game embeds, {len(view_registry)} views registered")
         except Exception as e:
             log.error(f"[!] An unhandled exception has occured in the EmbedManager Loop: " + str(e))
 
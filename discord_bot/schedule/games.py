@@ -1,16 +1,34 @@
+from asyncio import gather, Semaphore
+
 from discord.ext import tasks, commands
+from discord.errors import NotFound
+from django.utils import timezone
 
 from discord_bot.logs import logger as log
 from config.settings import DEFAULT_CHANNEL_NAME, PRIORITY_CHANNEL_NAME
 from discord_bot.utils.messaging import get_channel_by_name, async_get_bot_game_postings
 from discord_bot.components.games import GameDetailEmbed, GameControlView
 from discord_bot.utils.games import async_get_game_from_message, get_game_id_from_message
-from discord_bot.utils.views import add_persistent_view
-from core.utils.games import async_get_outstanding_games, async_check_game_expired
+from discord_bot.utils.views import ViewType, add_persistent_view, remove_persistent_views
+from discord_bot.utils.embed import async_update_game_embeds
+from discord_bot.utils.players import async_do_lottery_draw
+from discord_bot.utils.outbound import async_queue_send, async_queue_delete
+from discord_bot.utils.timing import startup_timer, ANNOUNCEMENT_VIEWS_REGISTERED
+from discord_bot.schedule.releases import release_scheduler
+from core.utils.games import async_get_outstanding_games, async_get_expired_game_ids, async_get_release_schedule
+from core.utils.postings import async_create_game_posting, async_get_game_postings, async_remove_game_postings
+from core.utils.postings import async_get_adopted_channel_ids, async_set_channel_adopted
+from core.utils.lottery import async_get_due_lotteries
+
+# Upper limit on the number of announcement messages deleted from discord at the same time
+MAX_CONCURRENT_DELETIONS = 4
+# Upper limit on the number of announcement messages fetched from discord at the same time during startup
+MAX_CONCURRENT_RECOVERIES = 8
 
 
 class GamesPoster(commands.Cog):
     bot = None
+    initialised = False
     current_games = {}
 
     channel_general = None
@@ -18,51 +36,120 @@ class GamesPoster(commands.Cog):
 
     def __init__(self, bot):
         """initialisation function"""
-        # self.refresh_state.start()
         self.bot = bot
+        self.current_games = {}
         self.worker.start()
+        self.release_worker.start()
 
     def cog_unload(self):
         """cleanup function"""
         self.worker.cancel()
+        self.release_worker.cancel()
 
-    async def fetch_message_state(self):
-        """Perform async initialisation"""
+    async def startup(self):
+        """Perform async initialisation, recovering any existing announcements"""
         try:
-            self.current_games = {}
             await self.get_bot_channels()
-            await self.recover_message_state()
+            if self.channel_priority and self.channel_general:
+                self.current_games = {}
+                await self.recover_message_state()
+                self.initialised = True
+                await self.refresh_release_schedule()
         except Exception as e:
-            log.error(f"[!] Exception in fetch_message_state: {e}")
+            log.error(f"[!] Exception in GamesPoster startup: {e}")
 
     async def get_bot_channels(self):
         """Attempt to get the specified channels"""
         self.channel_general = get_channel_by_name(DEFAULT_CHANNEL_NAME)
         self.channel_priority = get_channel_by_name(PRIORITY_CHANNEL_NAME)
 
+    def track_game_posting(self, game, message, channel, hydrated=True):
+        """Add an announcement message to the current game state and listen for its interactions"""
+        control_view = GameControlView(game)
+        # views for messages which have not been fetched yet will pick up the message from their first interaction
+        control_view.message = message if hydrated else None
+        self.current_games[game.pk] = {
+            "game": game,
+            "message": message,
+            "view": control_view,
+            "channel": channel,
+            "jump_url": message.jump_url,
+        }
+        add_persistent_view(control_view, ViewType.CONTROL)
+
     async def recover_message_state(self):
-        """Pull game postings from posting history and reconstruct a game/message status from it"""
-        for channel in [self.channel_priority, self.channel_general]:
-            messages = await async_get_bot_game_postings(channel)
-            for message in messages:
-                game = await async_get_game_from_message(message)
-                if not game:
-                    game_id = get_game_id_from_message(message)
-                    log.info(f"[-] Removing orphaned message (No matching game) for game ID {game_id}")
-                    await message.delete()
-                    continue
-
-                # Rebuild view handlers
-                control_view = GameControlView(game)
-                control_view.message = message
-                self.current_games[game.pk] = {
-                    "game": game,
-                    "message": message,
-                    "view": control_view,
-                    "channel": channel,
-                    "jump_url": message.jump_url,
-                }
-                add_persistent_view(control_view)
+        """Reconstruct the game/message state from the posting records held in the database"""
+        channels = {str(channel.id): channel for channel in [self.channel_priority, self.channel_general]}
+        postings = await async_get_game_postings()
+
+        # Views are registered straight away from the posting records, the messages themselves are fetched after
+        recovered = []
+        for posting in postings:
+            channel = channels.get(posting.channel_id)
+            if not channel:
+                log.info(f"[-] Discarding posting record for {posting.game.name}, channel no longer used")
+                await async_remove_game_postings([posting.game_id])
+                continue
+            message = channel.get_partial_message(int(posting.message_id))
+            self.track_game_posting(posting.game, message, channel, hydrated=False)
+            recovered.append(posting)
+        startup_timer.mark(ANNOUNCEMENT_VIEWS_REGISTERED)
+
+        semaphore = Semaphore(MAX_CONCURRENT_RECOVERIES)
+        await gather(*[self.recover_posted_message(posting, semaphore) for posting in recovered])
+        startup_timer.mark("Announcement messages recovered")
+
+        # Channels which predate the posting table need a one-off history scan, an empty channel is only scanned once
+        posted_channel_ids = set(posting.channel_id for posting in postings)
+        adopted_channel_ids = await async_get_adopted_channel_ids()
+        for channel_id, channel in channels.items():
+            if channel_id in adopted_channel_ids:
+                continue
+            if channel_id not in posted_channel_ids:
+                await self.adopt_untracked_postings(channel)
+            await async_set_channel_adopted(channel_id)
+
+    async def recover_posted_message(self, posting, semaphore):
+        """Fetch a recorded announcement from discord, discarding the record if it has been deleted"""
+        announcement = self.current_games.get(posting.game_id)
+        if not announcement:
+            return
+        async with semaphore:
+            try:
+                message = await announcement["channel"].fetch_message(int(posting.message_id))
+            except NotFound:
+                message = None
+
+        if not message:
+            log.info(f"[-] Discarding posting record for {posting.game.name}, announcement no longer exists")
+            self.current_games.pop(posting.game_id, None)
+            remove_persistent_views(posting.game_id, ViewType.CONTROL)
+            await async_remove_game_postings([posting.game_id])
+            return
+        announcement["message"] = message
+        # An interaction may already have supplied the message while this one was being fetched
+        if not announcement["view"].message:
+            announcement["view"].message = message
+
+    async def adopt_untracked_postings(self, channel):
+        """Pull game postings from a channel's history and record them in the database"""
+        log.info(f"[-] No posting records for channel {channel.name}, scanning message history")
+        messages = await async_get_bot_game_postings(channel)
+        for message in messages:
+            game = await async_get_game_from_message(message)
+            if not game:
+                game_id = get_game_id_from_message(message)
+                log.info(f"[-] Removing orphaned message (No matching game) for game ID {game_id}")
+                await async_queue_delete(message)
+                continue
+
+            if game.pk in self.current_games:
+                log.info(f"[-] Removing duplicate announcement for game {game.name}")
+                await async_queue_delete(message)
+                continue
+
+            self.track_game_posting(game, message, channel)
+            await async_create_game_posting(game, channel.id, message.id, message.jump_url)
 
     async def do_game_announcement(self, game, channel):
         """Build an announcement"""
@@ -73,16 +160,9 @@ class GamesPoster(commands.Cog):
 
         control_view = GameControlView(game)
         if channel:
-            message = await channel.send(embeds=embeds, view=control_view)
-            control_view.message = message
-            self.current_games[game.pk] = {
-                "game": game,
-                "message": message,
-                "view": control_view,
-                "channel": channel,
-                "jump_url": message.jump_url,
-            }
-            add_persistent_view(control_view)
+            message = await async_queue_send(channel, embeds=embeds, view=control_view)
+            self.track_game_posting(game, message, channel)
+            await async_create_game_posting(game, channel.id, message.id, message.jump_url)
 
     def get_jump_url(self, game):
         """Retrieve a link to the posted game details"""
@@ -96,11 +176,19 @@ class GamesPoster(commands.Cog):
             return None
         return self.current_games[game.id]["channel"]
 
-    async def remove_specific_game(self, game_id):
+    async def delete_announcement(self, game_id):
         """Pull a specific game ID from the game state and delete the associated message"""
-        announcement = self.current_games[game_id]
-        await announcement["message"].delete()
-        self.current_games.pop(game_id)
+        announcement = self.current_games.pop(game_id)
+        remove_persistent_views(game_id, ViewType.CONTROL)
+        try:
+            await async_queue_delete(announcement["message"])
+        except NotFound:
+            pass  # message has already been removed
+
+    async def remove_specific_game(self, game_id):
+        """Remove the announcement for a specific game ID, along with its posting record"""
+        await self.delete_announcement(game_id)
+        await async_remove_game_postings([game_id])
 
     async def post_outstanding_games(self):
         """Create new messages for any games that need to be announced"""
@@ -120,32 +208,63 @@ class GamesPoster(commands.Cog):
             except Exception as e:
                 log.error(f"[!] Exception caught in post_outstanding_games: {e.__class__}")
 
+    def release_pending(self, game_id, release, open_release, now) -> bool:
+        """Check if a game has reached a release time without having been announced in the matching channel"""
+        channel = self.current_games.get(game_id, {}).get("channel")
+        if open_release and open_release <= now:
+            return channel != self.channel_general
+        if release and release <= now:
+            return channel is None
+        return False
+
+    async def refresh_release_schedule(self):
+        """Rebuild the release schedule from the database, and announce anything that has been missed"""
+        release_schedule = await async_get_release_schedule()
+        now = timezone.now()
+        release_scheduler.rebuild(release_schedule, now)
+        if any(self.release_pending(*row, now) for row in release_schedule):
+            await self.post_outstanding_games()
+
     async def remove_stale_games(self):
-        """Go through existing games and check for anything stale"""
-        for key in self.current_games:
+        """Remove the announcements for any posted games which have expired, been withdrawn or deleted"""
+        expired = list(await async_get_expired_game_ids(list(self.current_games.keys())))
+        if not expired:
+            return
+
+        semaphore = Semaphore(MAX_CONCURRENT_DELETIONS)
+
+        async def remove_expired_game(game_id):
+            async with semaphore:
+                log.info(f"[-] Deleting expired game - {self.current_games[game_id]['game'].name}")
+                await self.delete_announcement(game_id)
+
+        results = await gather(*[remove_expired_game(game_id) for game_id in expired], return_exceptions=True)
+        for game_id, result in zip(expired, results):
+            if isinstance(result, Exception):
+                log.error(f"[!] Exception caught in remove_stale_games: {result.__class__}, key = {game_id}")
+        await async_remove_game_postings(expired)
+
+    async def draw_due_lotteries(self):
+        """Draw any lotteries which have reached their draw time"""
+        for lottery in await async_get_due_lotteries():
             try:
-                announcement = self.current_games[key]
-                if await async_check_game_expired(announcement["game"]):
-                    try:
-                        log.info(f"[-] Deleteing expired game - {announcement['game']}")
-                    except Exception as e:
-                        log.error(f"[!] Exception caught while logging game deletion: {e}")
-                    await announcement["message"].delete()
-                    self.current_games.pop(key)
-                    break  # because we've modified current_games we can't continue to iterate on it
+                log.info(f"[-] Drawing lottery for game: {lottery.game.name}")
+                await async_do_lottery_draw(lottery)
+                await async_update_game_embeds(lottery.game)
             except Exception as e:
-                log.error(f"[!] Exception caught in remove_stale_games: {e.__class__}, key = {key}")
+                log.error(f"[!] Exception caught drawing lottery {lottery.pk}: {e}")
 
-
-##########################################################################################################
+    # ######################################################################## #
     @tasks.loop(seconds=30)
     async def worker(self):
         try:
-            await self.fetch_message_state()
-
-            if self.channel_priority and self.channel_general:
+            if not self.initialised:
+                await self.startup()
+            elif self.channel_priority and self.channel_general:
                 await self.remove_stale_games()
-                await self.post_outstanding_games()
+                await self.draw_due_lotteries()
+                # Safety net for games changed outside of the bot process (web interface, admin panel)
+                await self.refresh_release_schedule()
         except Exception as e:
             log.error(f"[!] An unhandled exception has occured in the GamesPoster Loop: " + str(e))
 
@@ -153,3 +272,20 @@ class GamesPoster(commands.Cog):
     async def before_loop_start(self):
         await self.bot.wait_until_ready()
         log.info("[+] Starting service: Games poster")
+
+    @tasks.loop(seconds=0)
+    async def release_worker(self):
+        """Sleep until the next game release is due and then announce it"""
+        try:
+            due = await release_scheduler.wait_for_due()
+            if self.initialised:
+                log.info(f"[-] Release time reached for game(s): {due}")
+                await self.post_outstanding_games()
+        except Exception as e:
+            log.error(f"[!] An unhandled exception has occured in the GamesPoster release loop: " + str(e))
+
+    @release_worker.before_loop
+    async def before_release_loop_start(self):
+        await self.bot.wait_until_ready()
+        release_scheduler.attach()
+        log.info("[+] Starting service: Games release scheduler")
@@ -0,0 +1,104 @@
+from asyncio import Event, get_running_loop, wait_for, TimeoutError
+from heapq import heappush, heappop
+from threading import get_ident
+
+from django.utils import timezone
+
+
+class ReleaseScheduler:
+    """Timer heap of upcoming game release times, used to wake the games poster exactly when a game is due"""
+
+    def __init__(self):
+        """initialisation function"""
+        self.heap = []
+        self.entries = {}
+        self.loop = None
+        self.loop_thread = None
+        self.wakeup = Event()
+
+    def __len__(self):
+        """Number of games with outstanding release times"""
+        return len(self.entries)
+
+    def attach(self):
+        """Bind the scheduler to the running event loop so that other threads can update it"""
+        self.loop = get_running_loop()
+        self.loop_thread = get_ident()
+
+    def schedule(self, game_id: int, *release_times):
+        """Set the release times for a game, replacing any that were previously scheduled"""
+        times = set(release_time for release_time in release_times if release_time)
+        if not times:
+            return self.unschedule(game_id)
+        self.entries[game_id] = times
+        for release_time in times:
+            heappush(self.heap, (release_time, game_id))
+        self.wakeup.set()
+
+    def unschedule(self, game_id: int):
+        """Remove a game from the schedule, any heap entries for it are discarded lazily"""
+        self.entries.pop(game_id, None)
+        self.wakeup.set()
+
+    def rebuild(self, release_schedule: list[tuple], now=None):
+        """Replace the schedule with the future release times from (game id, release, open release) rows"""
+        now = now or timezone.now()
+        self.heap = []
+        self.entries = {}
+        for game_id, release, open_release in release_schedule:
+            self.schedule(game_id, *[t for t in (release, open_release) if t and t > now])
+        self.wakeup.set()
+
+    def call_threadsafe(self, function, *args):
+        """Run a scheduler update on the event loop thread, regardless of the calling thread"""
+        if self.loop is None or self.loop.is_closed():
+            return
+        if get_ident() == self.loop_thread:
+            return function(*args)
+        self.loop.call_soon_threadsafe(function, *args)
+
+    # ######################################################################## #
+    def is_current(self, entry: tuple) -> bool:
+        """Check if a heap entry still represents a scheduled release"""
+        release_time, game_id = entry
+        return release_time in self.entries.get(game_id, ())
+
+    def next_release(self):
+        """Get the time of the next scheduled release, if any"""
+        while self.heap and not self.is_current(self.heap[0]):
+            heappop(self.heap)
+        if self.heap:
+            return self.heap[0][0]
+        return None
+
+    def pop_due(self, now=None) -> set[int]:
+        """Remove and return the IDs of all games with a release time that has been reached"""
+        now = now or timezone.now()
+        due = set()
+        while self.heap and self.heap[0][0] <= now:
+            release_time, game_id = heappop(self.heap)
+            if release_time not in self.entries.get(game_id, ()):
+                continue
+            self.entries[game_id].discard(release_time)
+            if not self.entries[game_id]:
+                self.entries.pop(game_id)
+            due.add(game_id)
+        return due
+
+    async def wait_for_due(self) -> set[int]:
+        """Sleep until at least one scheduled release has been reached, then return the due game IDs"""
+        while True:
+            now = timezone.now()
+            due = self.pop_due(now)
+            if due:
+                return due
+            self.wakeup.clear()
+            next_release = self.next_release()
+            timeout = (next_release - now).total_seconds() if next_release else None
+            try:
+                await wait_for(self.wakeup.wait(), timeout)
+            except TimeoutError:
+                pass  # a release time has been reached
+
+
+release_scheduler = ReleaseScheduler()
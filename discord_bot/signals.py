@@ -0,0 +1,44 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Game, GameChannel
+from discord_bot.schedule.releases import release_scheduler
+from discord_bot.utils.channel import channel_game_index
+
+
+# ########################################################################## #
+@receiver(post_save, sender=Game)
+def release_schedule_game_saved(sender, instance, raw=False, **kwargs):
+    """Update the release schedule when a game is changed"""
+    if raw or not release_scheduler.loop:
+        return
+    now = timezone.now()
+    if instance.ready and instance.datetime and instance.datetime >= now:
+        # Releases which have already passed would be due immediately, and announce the game again
+        release_times = [t for t in (instance.datetime_release, instance.datetime_open_release) if t and t > now]
+        release_scheduler.call_threadsafe(release_scheduler.schedule, instance.pk, *release_times)
+    else:
+        release_scheduler.call_threadsafe(release_scheduler.unschedule, instance.pk)
+
+
+@receiver(post_delete, sender=Game)
+def release_schedule_game_deleted(sender, instance, **kwargs):
+    """Remove a deleted game from the release schedule"""
+    release_scheduler.call_threadsafe(release_scheduler.unschedule, instance.pk)
+
+
+# ########################################################################## #
+@receiver(post_save, sender=GameChannel)
+def channel_index_game_channel_saved(sender, instance, raw=False, **kwargs):
+    """Index a game channel as soon as it has been created"""
+    if raw or not instance.discord_id:
+        return
+    channel_game_index.set(instance.discord_id, instance.game_id)
+
+
+@receiver(post_delete, sender=GameChannel)
+def channel_index_game_channel_deleted(sender, instance, **kwargs):
+    """Remove a destroyed game channel from the index"""
+    if instance.discord_id:
+        channel_game_index.invalidate(instance.discord_id)
@@ -3,10 +3,12 @@ from config.settings import DISCORD_GAME_LOG_CHANNEL
 
 from discord_bot.logs import logger as log
 from discord_bot.bot import bot
+from discord_bot.utils.timing import startup_timer
 from discord_bot.commands import *
 
 from discord_bot.schedule.games import GamesPoster
 from discord_bot.schedule.embeds import EmbedController
+from discord_bot.schedule.credits import CreditBalanceVerifier
 from discord_bot.schedule.channels.controller import ChannelController
 from discord_bot.schedule.channels.membership import ChannelMembershipController
 
@@ -20,6 +22,7 @@ bot.add_cog(GamesPoster(bot))
 bot.add_cog(EmbedController(bot))
 bot.add_cog(ChannelMembershipController(bot))
 bot.add_cog(ChannelController(bot, guild_id))
+bot.add_cog(CreditBalanceVerifier(bot))
 
 
 def start_bot():
@@ -30,6 +33,7 @@ def start_bot():
 @bot.event
 async def on_ready():
     log.info(f"[-] {bot.user.name} has connected to discord")
+    startup_timer.mark("Connected to discord")
 
 
 @bot.event
@@ -0,0 +1,28 @@
+from asyncio import run
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from django.test import TestCase
+
+from discord_bot.schedule.calendar import GamesCalendarManager
+
+
+class TestGamesCalendar(TestCase):
+    """Tests for keeping the upcoming games calendar up to date"""
+
+    @patch("discord_bot.schedule.calendar.async_set_calendar_posting", new_callable=AsyncMock)
+    @patch("discord_bot.schedule.calendar.async_queue_edit", new_callable=AsyncMock)
+    @patch("discord_bot.schedule.calendar.async_get_game_embed_data", new_callable=AsyncMock, return_value={})
+    @patch("discord_bot.schedule.calendar.async_get_upcoming_games", new_callable=AsyncMock, return_value=[])
+    def test_unchanged_calendar_not_edited(self, get_games, get_data, queue_edit, set_posting) -> None:
+        """Later ticks with no changes to the games don't edit the calendar message"""
+        manager = GamesCalendarManager.__new__(GamesCalendarManager)
+        manager.channel_calendar = SimpleNamespace(id=1234)
+        manager.message = SimpleNamespace(id=5678)
+        first_tick = datetime(2042, 6, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+        with patch("django.utils.timezone.now", side_effect=[first_tick, first_tick + timedelta(seconds=30)]):
+            self.assertTrue(run(manager.post_upcoming_games()))
+            self.assertFalse(run(manager.post_upcoming_games()))
+        queue_edit.assert_awaited_once()
@@ -0,0 +1,46 @@
+from asyncio import run
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock
+
+from django.test import TestCase
+
+from core.models import Game, GameChannel
+from discord_bot.utils.channel import channel_game_index, async_get_game_for_channel
+
+
+class TestChannelGameIndex(TestCase):
+    """Tests for looking up the game represented by a discord channel"""
+
+    fixtures = ["test_dms", "test_games", "test_users", "test_ranks"]
+
+    def setUp(self) -> None:
+        self.game = Game.objects.get(pk=1)
+        self.channel = SimpleNamespace(id=1234, name="test-channel")
+        channel_game_index.games.clear()
+
+    def test_index_follows_channel_lifecycle(self) -> None:
+        """Channels are indexed when created and forgotten when destroyed"""
+        game_channel = GameChannel.objects.create(game=self.game, discord_id="1234", name="test-channel")
+        self.assertEqual(channel_game_index.get(1234), self.game.pk)
+
+        game_channel.delete()
+        self.assertIsNone(channel_game_index.get(1234))
+
+    @patch("discord_bot.utils.channel.async_get_game_by_id", new_callable=AsyncMock)
+    @patch("discord_bot.utils.channel.async_get_game_id_for_channel", new_callable=AsyncMock)
+    def test_lookup_uses_database(self, get_game_id, get_game) -> None:
+        """Channels missing from the index are found in the database once, without reading from discord"""
+        get_game_id.return_value = self.game.pk
+        get_game.return_value = self.game
+
+        self.assertEqual(run(async_get_game_for_channel(self.channel)), self.game)
+        self.assertEqual(run(async_get_game_for_channel(self.channel)), self.game)
+        get_game_id.assert_awaited_once_with(1234)
+        get_game.assert_awaited_with(self.game.pk)
+
+    @patch("discord_bot.utils.channel.async_get_game_id_for_channel", new_callable=AsyncMock)
+    def test_lookup_unknown_channel(self, get_game_id) -> None:
+        """Channels which are not game channels have no game"""
+        get_game_id.return_value = None
+        self.assertIsNone(run(async_get_game_for_channel(self.channel)))
+        self.assertEqual(len(channel_game_index), 0)
@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from discord import Permissions
+from discord.abc import _Overwrites
+
+from discord_bot.utils.channel import get_channel_overwrite_map, get_member_overwrite
+from discord_bot.utils.channelmember import ChannelMember
+from discord_bot.schedule.channels.membership import get_membership_diff, permission_update_needed
+
+
+class TargetStub:
+    """Minimal stand in for a discord role or member"""
+
+    def __init__(self, target_id):
+        self.id = target_id
+
+
+class GuildStub:
+    """Guild with a single cached role and member"""
+
+    def __init__(self):
+        self.role = TargetStub(1)
+        self.member = TargetStub(2)
+
+    def get_role(self, role_id):
+        return self.role if role_id == self.role.id else None
+
+    def get_member(self, member_id):
+        return self.member if member_id == self.member.id else None
+
+
+class ChannelStub:
+    """Channel with raw overwrite data, as received from discord"""
+
+    def __init__(self, overwrites):
+        self.guild = GuildStub()
+        self._overwrites = [_Overwrites(data) for data in overwrites]
+
+
+class MembershipStub:
+    """Expected channel membership for a player"""
+
+    read_messages = True
+    read_message_history = True
+    send_messages = True
+    use_slash_commands = True
+    manage_messages = False
+
+
+class TestChannelOverwrites(TestCase):
+    """Tests for building the complete overwrite map for a channel"""
+
+    def test_overwrite_map_keeps_uncached_members(self) -> None:
+        """Overwrites for members missing from the gateway cache are not dropped"""
+        view = Permissions(read_messages=True).value
+        channel = ChannelStub(
+            [
+                {"id": 1, "allow": 0, "deny": view, "type": _Overwrites.ROLE},
+                {"id": 2, "allow": view, "deny": 0, "type": _Overwrites.MEMBER},
+                {"id": 3, "allow": view, "deny": 0, "type": _Overwrites.MEMBER},
+            ]
+        )
+
+        overwrites = get_channel_overwrite_map(channel)
+        by_id = {target.id: overwrite for target, overwrite in overwrites.items()}
+        self.assertEqual(set(by_id.keys()), {1, 2, 3})
+        self.assertFalse(by_id[1].read_messages)
+        self.assertTrue(by_id[3].read_messages)
+
+    def test_member_overwrite(self) -> None:
+        """Expected members get their stored permissions, anyone else has access revoked"""
+        granted = get_member_overwrite(MembershipStub())
+        self.assertTrue(granted.send_messages)
+        self.assertFalse(granted.manage_messages)
+
+        revoked = get_member_overwrite(None)
+        self.assertFalse(revoked.read_messages)
+        self.assertFalse(revoked.read_message_history)
+
+
+def get_expected_member(discord_id, send_messages=True):
+    """Build an expected game channel member for a player or a read-only waitlister"""
+    permissions = {"read_messages": True, "read_message_history": True, "use_slash_commands": send_messages}
+    user = SimpleNamespace(discord_id=str(discord_id))
+    return SimpleNamespace(user=user, send_messages=send_messages, manage_messages=False, **permissions)
+
+
+def get_actual_member(discord_id, send_messages=True):
+    """Build a member as currently present in a discord channel"""
+    permissions = {"read_messages": True, "read_message_history": True, "use_slash_commands": send_messages}
+    name = f"user {discord_id}"
+    return ChannelMember(discord_id, name, send_messages=send_messages, manage_messages=False, **permissions)
+
+
+class TestMembershipDiff(TestCase):
+    """Tests for comparing the actual and expected members of a channel"""
+
+    def test_diff_added_removed_changed(self) -> None:
+        """Each member is classified by discord ID and permissions"""
+        actual = [get_actual_member(1), get_actual_member(2), get_actual_member(3, send_messages=False)]
+        expected = [get_expected_member(1), get_expected_member(3), get_expected_member(4)]
+
+        to_add, to_remove, to_update = get_membership_diff(actual, expected)
+        self.assertEqual([m.user.discord_id for m in to_add], ["4"])
+        self.assertEqual([m.discord_id for m in to_remove], [2])
+        self.assertEqual([m.user.discord_id for m in to_update], ["3"])
+
+    def test_diff_unchanged(self) -> None:
+        """A channel which matches the database state needs no changes"""
+        actual = [get_actual_member(1), get_actual_member(2, send_messages=False)]
+        expected = [get_expected_member(1), get_expected_member(2, send_messages=False)]
+        self.assertEqual(get_membership_diff(actual, expected), ([], [], []))
+
+    def test_diff_large_waitlist(self) -> None:
+        """Channels with very large read-only waitlists are compared in linear time"""
+        size = 20000
+        actual = [get_actual_member(i, send_messages=i < 10) for i in range(size)]
+        expected = [get_expected_member(i, send_messages=i < 10) for i in range(1, size + 1)]
+
+        target = "discord_bot.schedule.channels.membership.permission_update_needed"
+        with patch(target, side_effect=permission_update_needed) as compared:
+            to_add, to_remove, to_update = get_membership_diff(actual, expected)
+
+        self.assertEqual([m.user.discord_id for m in to_add], [str(size)])
+        self.assertEqual([m.discord_id for m in to_remove], [0])
+        self.assertEqual(to_update, [])
+        # Each member present in both lists is compared exactly once, rather than against every other member
+        self.assertEqual(compared.call_count, size - 1)
@@ -0,0 +1,56 @@
+from asyncio import run, gather, sleep, create_task
+
+from django.test import TestCase
+
+from discord_bot.utils.embed import EmbedUpdateDebouncer
+
+
+class GameStub:
+    """Minimal stand in for a game object"""
+
+    def __init__(self, pk):
+        self.pk = pk
+
+
+class TestEmbedUpdateDebouncer(TestCase):
+    """Tests for merging bursts of embed updates"""
+
+    def test_burst_is_rendered_once(self) -> None:
+        """Simultaneous requests for the same game result in a single render"""
+        rendered = []
+
+        async def render(game):
+            rendered.append(game.pk)
+            return True
+
+        async def scenario():
+            debouncer = EmbedUpdateDebouncer(render, delay=0.01)
+            requests = [debouncer.request(GameStub(1)) for _ in range(40)]
+            requests.append(debouncer.request(GameStub(2)))
+            return await gather(*requests)
+
+        results = run(scenario())
+        self.assertTrue(all(results))
+        self.assertEqual(sorted(rendered), [1, 2])
+
+    def test_request_during_render_is_not_lost(self) -> None:
+        """A request arriving while an update is being rendered triggers a further render"""
+        rendered = []
+
+        async def render(game):
+            rendered.append("start")
+            await sleep(0.05)
+            rendered.append("end")
+            return True
+
+        async def scenario():
+            debouncer = EmbedUpdateDebouncer(render, delay=0.01)
+            first = create_task(debouncer.request(GameStub(1)))
+            await sleep(0.03)
+            await gather(first, debouncer.request(GameStub(1)))
+            return debouncer
+
+        debouncer = run(scenario())
+        self.assertEqual(rendered, ["start", "end", "start", "end"])
+        self.assertEqual(debouncer.locks, {})
+
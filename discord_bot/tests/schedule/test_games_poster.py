@@ -0,0 +1,32 @@
+from asyncio import run
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from django.test import TestCase
+
+from discord_bot.schedule.games import GamesPoster
+
+
+class TestGamesPosterRecovery(TestCase):
+    """Tests for recovering the game announcements when the bot starts"""
+
+    @patch("discord_bot.schedule.games.async_set_channel_adopted", new_callable=AsyncMock)
+    @patch("discord_bot.schedule.games.async_get_adopted_channel_ids", new_callable=AsyncMock)
+    @patch("discord_bot.schedule.games.async_get_game_postings", new_callable=AsyncMock, return_value=[])
+    def test_empty_channel_history_scanned_once(self, get_postings, get_adopted, set_adopted) -> None:
+        """A signup channel without any announcements has its history scanned on the first startup only"""
+        adopted = set()
+        get_adopted.side_effect = lambda: set(adopted)
+        set_adopted.side_effect = adopted.add
+        poster = GamesPoster.__new__(GamesPoster)
+        poster.current_games = {}
+        poster.channel_priority = SimpleNamespace(id=1234, name="priority")
+        poster.channel_general = SimpleNamespace(id=5678, name="general")
+        poster.adopt_untracked_postings = AsyncMock()
+
+        run(poster.recover_message_state())
+        self.assertEqual(poster.adopt_untracked_postings.await_count, 2)
+        self.assertEqual(adopted, {"1234", "5678"})
+
+        run(poster.recover_message_state())
+        self.assertEqual(poster.adopt_untracked_postings.await_count, 2)
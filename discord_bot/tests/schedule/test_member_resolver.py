@@ -0,0 +1,57 @@
+from asyncio import run
+from unittest.mock import AsyncMock, patch
+
+from django.test import TestCase
+
+from discord_bot.bot import bot
+from discord_bot.utils.users import MemberResolver
+
+
+class UserStub:
+    """Minimal stand in for a discord user"""
+
+    def __init__(self, discord_id):
+        self.id = discord_id
+        self.name = f"user-{discord_id}"
+
+
+class TestMemberResolver(TestCase):
+    """Tests for the cached discord user lookup"""
+
+    def test_fetched_users_are_cached(self) -> None:
+        """Users are only fetched from discord the first time they are needed"""
+        resolver = MemberResolver()
+        fetch = AsyncMock(side_effect=lambda discord_id: UserStub(discord_id))
+
+        with patch.object(bot, "fetch_user", fetch):
+            first = run(resolver.resolve("1234"))
+            second = run(resolver.resolve(1234))
+
+        self.assertIs(first, second)
+        self.assertEqual(fetch.await_count, 1)
+        stats = resolver.get_stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["cache"], 1)
+
+    def test_cache_is_bounded_and_expires(self) -> None:
+        """The least recently used users are evicted, and entries expire after their TTL"""
+        resolver = MemberResolver(max_size=2, ttl=0)
+        fetch = AsyncMock(side_effect=lambda discord_id: UserStub(discord_id))
+
+        with patch.object(bot, "fetch_user", fetch):
+            for discord_id in [1, 2, 3]:
+                run(resolver.resolve(discord_id))
+            self.assertEqual(len(resolver), 2)
+            self.assertNotIn(1, resolver.fetched)
+            run(resolver.resolve(3))
+
+        # zero TTL means every lookup goes back to discord
+        self.assertEqual(fetch.await_count, 4)
+
+    def test_failed_lookup(self) -> None:
+        """Unknown users resolve to None"""
+        resolver = MemberResolver()
+        with patch.object(bot, "fetch_user", AsyncMock(side_effect=Exception("Unknown User"))):
+            self.assertIsNone(run(resolver.resolve(1234)))
+        self.assertIsNone(run(resolver.resolve(None)))
+        self.assertEqual(resolver.get_stats()["failed"], 1)
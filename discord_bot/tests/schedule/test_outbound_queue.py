@@ -0,0 +1,70 @@
+from asyncio import run, gather
+
+from django.test import TestCase
+
+from discord_bot.utils.outbound import OutboundQueue, Priority
+
+
+class TestOutboundQueue(TestCase):
+    """Tests for the priority outbound request queue"""
+
+    def test_requests_sent_in_priority_order(self) -> None:
+        """Interaction responses are sent before queued housekeeping work"""
+        sent = []
+
+        def make_request(name):
+            async def request():
+                sent.append(name)
+                return name
+
+            return request
+
+        async def scenario():
+            queue = OutboundQueue(workers=1)
+            futures = [
+                queue.submit(make_request("housekeeping"), Priority.HOUSEKEEPING),
+                queue.submit(make_request("edit"), Priority.EMBED_EDIT),
+                queue.submit(make_request("interaction"), Priority.INTERACTION),
+            ]
+            return await gather(*futures)
+
+        results = run(scenario())
+        self.assertEqual(sent, ["interaction", "edit", "housekeeping"])
+        self.assertEqual(results, ["housekeeping", "edit", "interaction"])
+
+    def test_pending_edits_are_coalesced(self) -> None:
+        """Only the latest version of a queued edit to the same message is sent"""
+        sent = []
+
+        def make_edit(version):
+            async def request():
+                sent.append(version)
+                return version
+
+            return request
+
+        async def scenario():
+            queue = OutboundQueue(workers=1)
+            first = queue.submit(make_edit(1), Priority.EMBED_EDIT, coalesce_key="edit-1")
+            second = queue.submit(make_edit(2), Priority.INTERACTION, coalesce_key="edit-1")
+            results = await gather(first, second)
+            return results, queue.get_metrics()
+
+        results, metrics = run(scenario())
+        self.assertEqual(sent, [2])
+        self.assertEqual(results, [2, 2])
+        self.assertEqual(metrics["EMBED_EDIT"]["coalesced"], 1)
+        self.assertEqual(metrics["INTERACTION"]["completed"], 1)
+
+    def test_failed_request_raises_to_caller(self) -> None:
+        """Exceptions from a request are passed back to the code that queued it"""
+
+        async def failing():
+            raise ValueError("boom")
+
+        async def scenario():
+            queue = OutboundQueue(workers=1)
+            await queue.request(failing, Priority.CHANNEL_MESSAGE)
+
+        with self.assertRaises(ValueError):
+            run(scenario())
@@ -0,0 +1,105 @@
+from asyncio import run
+from datetime import timedelta
+from threading import get_ident
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Game
+from discord_bot.schedule.releases import ReleaseScheduler
+
+
+class TestReleaseScheduler(TestCase):
+    """Tests for the game release timer heap"""
+
+    def test_pop_due_returns_only_reached_releases(self) -> None:
+        """Only games with a release time in the past are returned"""
+        now = timezone.now()
+        scheduler = ReleaseScheduler()
+        scheduler.schedule(1, now - timedelta(seconds=1))
+        scheduler.schedule(2, now + timedelta(minutes=5))
+
+        self.assertEqual(scheduler.pop_due(now), {1})
+        self.assertEqual(scheduler.pop_due(now), set())
+        self.assertEqual(scheduler.next_release(), now + timedelta(minutes=5))
+
+    def test_reschedule_discards_old_release_time(self) -> None:
+        """Changing a game's release times replaces the previous entries"""
+        now = timezone.now()
+        scheduler = ReleaseScheduler()
+        scheduler.schedule(1, now - timedelta(seconds=1))
+        scheduler.schedule(1, now + timedelta(hours=1), now + timedelta(hours=2))
+
+        self.assertEqual(scheduler.pop_due(now), set())
+        self.assertEqual(scheduler.pop_due(now + timedelta(minutes=90)), {1})
+        self.assertEqual(len(scheduler), 1)
+
+    def test_unschedule(self) -> None:
+        """Removed games are never returned"""
+        now = timezone.now()
+        scheduler = ReleaseScheduler()
+        scheduler.schedule(1, now - timedelta(seconds=1))
+        scheduler.unschedule(1)
+
+        self.assertEqual(scheduler.pop_due(now), set())
+        self.assertIsNone(scheduler.next_release())
+
+    def test_rebuild_ignores_past_releases(self) -> None:
+        """Rebuilding from the database only keeps release times yet to be reached"""
+        now = timezone.now()
+        scheduler = ReleaseScheduler()
+        scheduler.rebuild(
+            [(1, now - timedelta(hours=1), now + timedelta(hours=1)), (2, now - timedelta(hours=1), None)], now
+        )
+
+        self.assertEqual(len(scheduler), 1)
+        self.assertEqual(scheduler.next_release(), now + timedelta(hours=1))
+
+    def test_wait_for_due(self) -> None:
+        """Waiting wakes up when the next release time is reached"""
+        scheduler = ReleaseScheduler()
+        scheduler.schedule(1, timezone.now() + timedelta(milliseconds=50))
+
+        due = run(scheduler.wait_for_due())
+        self.assertEqual(due, {1})
+
+
+class TestReleaseScheduleSignals(TestCase):
+    """Tests for keeping the release schedule in step with changes to games"""
+
+    fixtures = ["test_dms", "test_games", "test_users", "test_ranks"]
+
+    def test_game_changes_update_schedule(self) -> None:
+        """Saving a game schedules its release times, and deleting it removes them"""
+        scheduler = ReleaseScheduler()
+        scheduler.loop = MagicMock(is_closed=MagicMock(return_value=False))
+        scheduler.loop_thread = get_ident()
+        game = Game.objects.get(pk=1)
+        game.ready = True
+        game.datetime_release = timezone.now() + timedelta(hours=1)
+        game.datetime_open_release = timezone.now() + timedelta(hours=2)
+
+        with patch("discord_bot.signals.release_scheduler", scheduler):
+            game.save()
+            self.assertEqual(scheduler.next_release(), game.datetime_release)
+            game.delete()
+        self.assertEqual(len(scheduler), 0)
+
+    def test_past_releases_not_scheduled(self) -> None:
+        """Release times which have already passed are left out of the schedule"""
+        scheduler = ReleaseScheduler()
+        scheduler.loop = MagicMock(is_closed=MagicMock(return_value=False))
+        scheduler.loop_thread = get_ident()
+        game = Game.objects.get(pk=1)
+        game.ready = True
+        game.datetime_release = timezone.now() - timedelta(hours=1)
+        game.datetime_open_release = timezone.now() + timedelta(hours=1)
+
+        with patch("discord_bot.signals.release_scheduler", scheduler):
+            game.save()
+            self.assertEqual(scheduler.next_release(), game.datetime_open_release)
+            game.datetime_open_release = timezone.now() - timedelta(minutes=1)
+            game.save()
+        self.assertEqual(len(scheduler), 0)
+        self.assertEqual(scheduler.pop_due(), set())
@@ -0,0 +1,69 @@
+from asyncio import run, gather, sleep
+
+from django.test import TestCase
+
+from discord_bot.utils.admission import SignupQueue
+
+
+class GameStub:
+    """Minimal stand in for a game object"""
+
+    def __init__(self, pk):
+        self.pk = pk
+        self.name = f"game {pk}"
+
+
+class TestSignupQueue(TestCase):
+    """Tests for admitting signups to a game in batches"""
+
+    def test_signups_batched_in_arrival_order(self) -> None:
+        """A burst of signups is admitted in arrival order, in batches, with each member getting their own result"""
+        batches = []
+
+        async def admit(game, members):
+            batches.append(list(members))
+            await sleep(0.01)
+            return [f"player-{member}" for member in members]
+
+        async def scenario():
+            queue = SignupQueue(admit, batch_size=4)
+            results = await gather(*[queue.submit(GameStub(1), member) for member in range(10)])
+            return queue, results
+
+        queue, results = run(scenario())
+        self.assertEqual(results, [f"player-{member}" for member in range(10)])
+        self.assertEqual(batches, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+        self.assertEqual(queue.stats["batches"], 3)
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(queue.workers, {})
+
+    def test_games_are_admitted_independently(self) -> None:
+        """Signups for different games are not batched together"""
+        batches = []
+
+        async def admit(game, members):
+            batches.append((game.pk, list(members)))
+            return list(members)
+
+        async def scenario():
+            queue = SignupQueue(admit)
+            return await gather(queue.submit(GameStub(1), "a"), queue.submit(GameStub(2), "b"))
+
+        self.assertEqual(run(scenario()), ["a", "b"])
+        self.assertEqual(sorted(batches), [(1, ["a"]), (2, ["b"])])
+
+    def test_failed_batch_is_refused(self) -> None:
+        """An error admitting a batch refuses those signups without stopping later batches"""
+        calls = []
+
+        async def admit(game, members):
+            calls.append(list(members))
+            if len(calls) == 1:
+                raise ValueError("database unavailable")
+            return list(members)
+
+        async def scenario():
+            queue = SignupQueue(admit, batch_size=2)
+            return await gather(*[queue.submit(GameStub(1), member) for member in "abc"])
+
+        self.assertEqual(run(scenario()), [None, None, "c"])
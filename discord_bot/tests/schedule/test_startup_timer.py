@@ -0,0 +1,25 @@
+from django.test import TestCase
+
+from discord_bot.utils.timing import StartupTimer
+
+
+class TestStartupTimer(TestCase):
+    """Tests for the startup timing report"""
+
+    def test_serviceable_once_required_stages_reached(self) -> None:
+        """Interactions are only reported as serviceable once every required stage has been reached"""
+        timer = StartupTimer("announcements", "mustering")
+        timer.mark("announcements")
+        self.assertIsNone(timer.serviceable)
+        self.assertIn("waiting for: mustering", timer.get_report()[-1])
+
+        timer.mark("mustering")
+        self.assertIsNotNone(timer.serviceable)
+        self.assertTrue(timer.get_report()[-1].startswith("Interactions serviceable"))
+
+    def test_first_occurence_kept(self) -> None:
+        """Repeated stages (such as reconnecting to discord) keep their original time"""
+        timer = StartupTimer()
+        first = timer.mark("connected")
+        self.assertEqual(timer.mark("connected"), first)
+        self.assertEqual(len(timer.get_report()), 2)
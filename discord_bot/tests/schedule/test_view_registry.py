@@ -0,0 +1,62 @@
+from asyncio import run
+
+from django.test import TestCase
+
+from discord.ui import View
+
+from discord_bot.utils.views import ViewRegistry, ViewType
+
+
+class GameStub:
+    """Minimal stand in for a game object"""
+
+    def __init__(self, pk):
+        self.pk = pk
+
+
+class StubView(View):
+    """Persistent view bound to a game"""
+
+    def __init__(self, game):
+        self.game = game
+        super().__init__(timeout=None)
+
+
+class TestViewRegistry(TestCase):
+    """Tests for the persistent view registry"""
+
+    def test_registration_is_deduplicated(self) -> None:
+        """Registering a replacement view for a game stops the previous one"""
+
+        async def scenario():
+            registry = ViewRegistry()
+            first = StubView(GameStub(1))
+            second = StubView(GameStub(1))
+            registry.register(first, ViewType.CONTROL)
+            registry.register(first, ViewType.CONTROL)
+            registry.register(second, ViewType.CONTROL)
+            registry.register(StubView(GameStub(1)), ViewType.MUSTERING)
+            return registry, first, second
+
+        registry, first, second = run(scenario())
+        self.assertEqual(len(registry), 2)
+        self.assertTrue(first.is_finished())
+        self.assertIs(registry.get(1, ViewType.CONTROL), second)
+
+    def test_unregister(self) -> None:
+        """Views for expired games are removed and stopped"""
+
+        async def scenario():
+            registry = ViewRegistry()
+            control = registry.register(StubView(GameStub(1)), ViewType.CONTROL)
+            registry.register(StubView(GameStub(1)), ViewType.MUSTERING)
+            registry.register(StubView(GameStub(2)), ViewType.CONTROL)
+            removed = registry.unregister(1, ViewType.CONTROL)
+            removed += registry.unregister(1)
+            return registry, control, removed
+
+        registry, control, removed = run(scenario())
+        self.assertEqual(removed, 2)
+        self.assertEqual(len(registry), 1)
+        self.assertTrue(control.is_finished())
+        self.assertIsNone(registry.get(1, ViewType.MUSTERING))
@@ -0,0 +1,68 @@
+from asyncio import create_task, get_running_loop
+
+from discord_bot.logs import logger as log
+from discord_bot.utils.games import async_add_discord_members_to_game
+from discord_bot.utils.players import async_do_waitlist_updates
+
+# Upper limit on the number of signups for a game handled in a single database transaction
+SIGNUP_BATCH_SIZE = 10
+
+
+class SignupQueue:
+    """Per game admission queue, signups are handled in arrival order in small batches by one task per game"""
+
+    def __init__(self, admit, batch_size: int = SIGNUP_BATCH_SIZE):
+        """initialisation function"""
+        self.admit = admit
+        self.batch_size = batch_size
+        self.pending = {}
+        self.workers = {}
+        self.stats = {"submitted": 0, "batches": 0, "largest_batch": 0}
+
+    def __len__(self):
+        """Number of signups waiting to be processed"""
+        return sum(len(requests) for requests in self.pending.values())
+
+    async def submit(self, game, member):
+        """Queue a member to join a game, and wait for the resulting player (if any)"""
+        future = get_running_loop().create_future()
+        self.pending.setdefault(game.pk, []).append((member, future))
+        self.stats["submitted"] += 1
+
+        worker = self.workers.get(game.pk)
+        if not worker or worker.done():
+            self.workers[game.pk] = create_task(self.drain(game))
+        return await future
+
+    async def drain(self, game):
+        """Admit the queued signups for a game until there are none left"""
+        try:
+            while self.pending.get(game.pk):
+                requests = self.pending[game.pk][: self.batch_size]
+                del self.pending[game.pk][: self.batch_size]
+                self.stats["batches"] += 1
+                self.stats["largest_batch"] = max(self.stats["largest_batch"], len(requests))
+
+                try:
+                    results = await self.admit(game, [member for member, _ in requests])
+                except Exception as e:
+                    log.error(f"[!] Exception admitting {len(requests)} signups to {game.name}: {e}")
+                    results = [None] * len(requests)
+
+                for (_, future), result in zip(requests, results):
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            self.pending.pop(game.pk, None)
+            self.workers.pop(game.pk, None)
+
+
+async def admit_signups(game, members):
+    """Add a batch of members to a game, then fill any space left in the party from the waitlist"""
+    players = await async_add_discord_members_to_game(members, game)
+    if any(players):
+        await async_do_waitlist_updates(game)
+    return players
+
+
+signup_queue = SignupQueue(admit_signups)
@@ -1,6 +1,6 @@
 from typing import List
 
-from discord import PermissionOverwrite
+from discord import PermissionOverwrite, Permissions, Object
 from discord import User as DiscordUser
 from discord.channel import TextChannel
 from discord.member import Member
@@ -13,10 +13,12 @@ from core.errors import ChannelError
 from core.utils.announcements import async_get_player_announce_text
 from core.utils.user import async_get_user_by_discord_id
 from core.utils.channel_members import async_add_user_to_game_channel, async_remove_user_from_game_channel
-from core.utils.channels import async_get_game_channel_for_game
+from core.utils.channels import async_get_game_channel_for_game, async_get_game_id_for_channel
+from core.utils.games import async_get_game_by_id
 from core.utils.announcements import get_player_permissions_text
-from discord_bot.utils.games import async_get_game_from_message
 from discord_bot.utils.channelmember import ChannelMember as ActualChannelMember
+from discord_bot.utils.outbound import Priority, async_queue_send, async_queue_call
+from discord_bot.utils.users import member_resolver
 
 
 def get_discord_channel(game_channel: GameChannel) -> TextChannel:
@@ -26,20 +28,16 @@ def get_discord_channel(game_channel: GameChannel) -> TextChannel:
 
 
 async def refresh_discord_channel(game_channel: GameChannel) -> TextChannel:
-    channel = await bot.fetch_channel(int(game_channel.discord_id))
+    """Get the discord channel for a game channel, from the gateway cache where possible"""
+    channel = bot.get_channel(int(game_channel.discord_id))
+    if not channel:
+        channel = await bot.fetch_channel(int(game_channel.discord_id))
     return channel
 
 
 async def get_discord_user_by_id(discord_id):
-    """retrieve a discord user object from the server by its ID"""
-    try:
-        if not discord_id:
-            return None
-
-        discord_user = await bot.fetch_user(discord_id)
-        return discord_user
-    except Exception as e:
-        return None
+    """retrieve a discord user object by its ID, from the gateway cache where possible"""
+    return await member_resolver.resolve(discord_id)
 
 
 async def async_get_channel_for_game(game: Game) -> TextChannel:
@@ -55,15 +53,49 @@ async def async_get_channel_for_game(game: Game) -> TextChannel:
     return None
 
 
+class ChannelGameIndex:
+    """In-process map of discord channel IDs to the ID of the game they represent"""
+
+    def __init__(self):
+        """initialisation function"""
+        self.games = {}
+
+    def __len__(self):
+        """Number of channels currently indexed"""
+        return len(self.games)
+
+    def get(self, channel_id) -> int | None:
+        """Get the game ID for a channel, if it has been indexed"""
+        return self.games.get(str(channel_id))
+
+    def set(self, channel_id, game_id: int):
+        """Record the game represented by a channel"""
+        self.games[str(channel_id)] = game_id
+
+    def invalidate(self, channel_id):
+        """Forget the game for a channel which no longer exists"""
+        self.games.pop(str(channel_id), None)
+
+
+channel_game_index = ChannelGameIndex()
+
+
 async def async_get_game_for_channel(channel: TextChannel) -> Game | None:
     """Given a discord channel, attempt to derive which game it represents"""
     try:
-        message = await async_get_channel_first_message(channel)
-        game = await async_get_game_from_message(message)
-        if game:
-            return game
-        return None
+        game_id = channel_game_index.get(channel.id)
+        if game_id is None:
+            game_id = await async_get_game_id_for_channel(channel.id)
+            if game_id is None:
+                return None
+            channel_game_index.set(channel.id, game_id)
+
+        game = await async_get_game_by_id(game_id)
+        if not game:
+            channel_game_index.invalidate(channel.id)
+        return game
     except Exception as e:
+        log.error(f"[!] Unable to get the game for channel {channel.name}")
         return None
 
 
@@ -72,7 +104,7 @@ async def async_notify_game_channel(game: Game, message: str):
     channel = await async_get_channel_for_game(game)
     if channel:
         log.debug(f"[.] Sending message to channel [{channel.name}]: {message}")
-        status = await channel.send(message)
+        status = await async_queue_send(channel, message)
         return status
     else:
         log.debug(f"Cannot send message to non-existant channel")
@@ -88,7 +120,7 @@ async def async_game_channel_tag_added_user(game_channel: GameChannel, member: G
     else:
         user_text = discord_user.display_name
     text = await async_get_player_announce_text(member.user, user_text)
-    message = await game_channel.send(text)
+    message = await async_queue_send(game_channel, text)
     return message
 
 
@@ -96,7 +128,7 @@ async def async_game_channel_tag_removed_user(game_channel: GameChannel, user_na
     """Send a message to the game channel notifying the DM that a player has dropped"""
     try:
         text = f"{user_name} left the channel"
-        message = await game_channel.send(text)
+        message = await async_queue_send(game_channel, text)
         return message
     except Exception as e:
         log.error(f"[!] Exception occured whilst tagging a removed user: ${e}")
@@ -111,7 +143,7 @@ async def async_game_channel_tag_promoted_waitlist_user(game_channel: GameChanne
     else:
         user_text = discord_user.display_name
     text = await async_get_player_announce_text(member.user, user_text, waitlist=True)
-    message = await game_channel.send(text)
+    message = await async_queue_send(game_channel, text)
     return message
 
 
@@ -123,7 +155,7 @@ async def async_game_channel_tag_modified_user_permissions(game_channel: GameCha
     else:
         user_text = discord_user.display_name
     text = get_player_permissions_text(member, user_text)
-    message = await game_channel.send(text)
+    message = await async_queue_send(game_channel, text)
     return message
 
 
@@ -149,7 +181,9 @@ async def async_channel_add_discord_user(
 
     # then apply the overwrites to the user
     try:
-        await channel.set_permissions(user, overwrite=overwrite)
+        await async_queue_call(
+            lambda: channel.set_permissions(user, overwrite=overwrite), Priority.HOUSEKEEPING, f"channel-{channel.id}"
+        )
         return True
     except Exception as e:
         log.error(f"[!] Exception occured adding discord user {user.display_name} to channel: {e}")
@@ -160,13 +194,17 @@ async def async_channel_remove_discord_user(channel: TextChannel, user: DiscordU
     """Remove a specific player from a game channel"""
     try:
         log.debug(f"[-] Removing discord user [{user.display_name}] from channel [{channel.name}]")
-        await channel.set_permissions(
-            user,
-            read_messages=False,
-            send_messages=False,
-            read_message_history=False,
-            use_slash_commands=False,
-            manage_messages=False,
+        await async_queue_call(
+            lambda: channel.set_permissions(
+                user,
+                read_messages=False,
+                send_messages=False,
+                read_message_history=False,
+                use_slash_commands=False,
+                manage_messages=False,
+            ),
+            Priority.HOUSEKEEPING,
+            f"channel-{channel.id}",
         )
         return True
     except Exception as e:
@@ -247,6 +285,54 @@ async def async_get_actual_channel_members(channel: TextChannel):
     return members
 
 
+def get_channel_overwrite_map(channel: TextChannel) -> dict:
+    """Get all of a channel's overwrites keyed by target, keeping those for members missing from the cache"""
+    overwrites = {}
+    for entry in channel._overwrites:
+        overwrite = PermissionOverwrite.from_pair(Permissions(entry.allow), Permissions(entry.deny))
+        if entry.is_role():
+            target = channel.guild.get_role(entry.id)
+        else:
+            target = channel.guild.get_member(entry.id) or Object(id=entry.id)
+        if target is not None:
+            overwrites[target] = overwrite
+    return overwrites
+
+
+def get_member_overwrite(membership: GameChannelMember | None) -> PermissionOverwrite:
+    """Get the overwrite for an expected channel member, or one revoking access if there is no membership"""
+    if not membership:
+        return PermissionOverwrite(
+            read_messages=False,
+            send_messages=False,
+            read_message_history=False,
+            use_slash_commands=False,
+            manage_messages=False,
+        )
+    return PermissionOverwrite(
+        read_messages=membership.read_messages,
+        send_messages=membership.send_messages,
+        read_message_history=membership.read_message_history,
+        use_slash_commands=membership.use_slash_commands,
+        manage_messages=membership.manage_messages,
+    )
+
+
+async def async_apply_channel_overwrites(channel: TextChannel, overwrites: dict) -> bool:
+    """Replace all of the permission overwrites for a channel in a single request"""
+    try:
+        updated = await async_queue_call(
+            lambda: channel.edit(overwrites=overwrites), Priority.HOUSEKEEPING, f"channel-{channel.id}"
+        )
+        if updated:
+            # keep the cached channel in step until discord sends the channel update event
+            channel._overwrites = updated._overwrites
+        return True
+    except Exception as e:
+        log.error(f"[!] Exception occured updating permissions for channel {channel.name}: {e}")
+    return False
+
+
 # ################################################################################### #
 #               Channel Membership Manager add / remove functions                     #
 # ################################################################################### #
@@ -1,26 +1,22 @@
-from asyncio import gather, create_task
-from enum import Enum
+from asyncio import gather, create_task, shield, sleep, Lock
+from hashlib import sha256
+from json import dumps
 
-from discord_bot.bot import bot
 from discord_bot.logs import logger as log
+from discord_bot.utils.views import ViewType, view_registry
 from core.models import Game
 
 
 # ######################### Utility function ################################### #
-class ViewType(Enum):
-    MUSTERING = 1
-    CONTROL = 2
+def get_view_for_game(game: Game, view_type: ViewType):
+    """Get the view for a game from the registered persistent views"""
+    return view_registry.get(game.pk, view_type)
 
 
-def get_view_for_game(game: Game, view_type: ViewType):
-    """Get the view for a game from the bot's connected views"""
-    for view in bot.persistent_views:
-        view_name = str(type(view))
-        if view_type is ViewType.MUSTERING and "MusteringView" in view_name and view.game == game:
-            return view
-        if view_type is ViewType.CONTROL and "GameControlView" in view_name and view.game == game:
-            return view
-    return None
+def get_embed_digest(embeds: list) -> str:
+    """Get a stable digest representing the rendered content of a list of embeds"""
+    content = dumps([embed.to_dict() for embed in embeds], sort_keys=True, default=str)
+    return sha256(content.encode("utf8")).hexdigest()
 
 
 # ######################### Mustering Embeds ################################### #
@@ -48,8 +44,8 @@ async def async_update_game_listing_embed(game: Game):
 
 
 # ######################### Higher order functions ################################### #
-async def async_update_game_embeds(game: Game):
-    """Update all embeds for the specified game"""
+async def async_update_game_embeds_now(game: Game):
+    """Immediately update all embeds for the specified game"""
     pending = []
     try:
         pending.append(create_task(async_update_mustering_embed(game)))
@@ -59,3 +55,44 @@ async def async_update_game_embeds(game: Game):
         log.error(f"[!] Error in embed update: {e}")
         return False
     return True
+
+
+class EmbedUpdateDebouncer:
+    """Collapses bursts of update requests for a game into a single render after a short delay"""
+
+    def __init__(self, render, delay: float = 1.5):
+        """initialisation function"""
+        self.render = render
+        self.delay = delay
+        self.pending = {}
+        self.locks = {}
+
+    async def request(self, game: Game):
+        """Request an update for a game, returning once an update started after this request has completed"""
+        flush = self.pending.get(game.pk)
+        if not flush:
+            flush = create_task(self.flush(game))
+            self.pending[game.pk] = flush
+        # shielded so that a cancelled caller doesn't cancel the update for everyone else waiting on it
+        return await shield(flush)
+
+    async def flush(self, game: Game):
+        """Wait for the burst to settle then render the game's current state"""
+        await sleep(self.delay)
+        lock = self.locks.setdefault(game.pk, Lock())
+        async with lock:
+            # Requests arriving from here on may not be reflected in this render, so they schedule another
+            self.pending.pop(game.pk, None)
+            try:
+                return await self.render(game)
+            finally:
+                if game.pk not in self.pending:
+                    self.locks.pop(game.pk, None)
+
+
+embed_update_debouncer = EmbedUpdateDebouncer(async_update_game_embeds_now)
+
+
+async def async_update_game_embeds(game: Game):
+    """Update all embeds for the specified game, merging with any other updates requested at the same time"""
+    return await embed_update_debouncer.request(game)
@@ -6,9 +6,12 @@ from discord_bot.bot import bot
 from discord import Member as DiscordMember
 from discord.ui import Button
 
-from core.utils.games import async_get_game_by_id, user_can_join_game
-from core.utils.games_rework import add_user_to_game, remove_user_from_game, remove_player_by_discord_id
+from core.utils.games import async_get_game_by_id
+from core.utils.games_rework import add_user_to_game, add_users_to_game, remove_user_from_game
+from core.utils.games_rework import remove_player_by_discord_id
+from core.utils.lottery import buy_lottery_tickets
 from core.utils.user import get_user_by_discord_id
+from core.exceptions import LotteryException
 from core.models import Game, Player
 
 from discord_bot.utils.auth import create_user_from_discord_member
@@ -62,10 +65,10 @@ def add_discord_member_to_game(member: DiscordMember, game: Game, force: bool =
             user = create_user_from_discord_member(member)
         except Exception as e:
             return None
-    if force or user_can_join_game(user, game):
-        return add_user_to_game(user, game, force)
-    log.debug(f"[>] {user} unsuccessful attempted signup to {game}")
-    return False
+    player = add_user_to_game(user, game, force)
+    if not player:
+        log.debug(f"[>] {user} unsuccessful attempted signup to {game}")
+    return player
 
 
 @sync_to_async
@@ -75,6 +78,53 @@ def async_add_discord_member_to_game(member: DiscordMember, game: Game, force: b
     return player
 
 
+def add_discord_members_to_game(members: list[DiscordMember], game: Game) -> list[Player | None]:
+    """Add a batch of discord members to a game in the order given, returning the player (if any) for each"""
+    game.refresh_from_db()
+    admitted = {}
+    for member in members:
+        user = get_user_by_discord_id(member.id)
+        if not user:
+            try:
+                user = create_user_from_discord_member(member)
+            except Exception as e:
+                continue
+        # Repeated clicks from the same member within a batch only count once
+        if user.pk not in admitted:
+            admitted[user.pk] = (member.id, user)
+
+    users = [user for _, user in admitted.values()]
+    players = dict(zip([member_id for member_id, _ in admitted.values()], add_users_to_game(users, game)))
+    return [players.pop(member.id, None) for member in members]
+
+
+@sync_to_async
+def async_add_discord_members_to_game(members: list[DiscordMember], game: Game) -> list[Player | None]:
+    """Async wrapper to add a batch of discord members to a game"""
+    return add_discord_members_to_game(members, game)
+
+
+def buy_discord_member_lottery_ticket(member: DiscordMember, game: Game) -> str:
+    """Buy a ticket in a game's lottery for a discord member, returning a message describing the outcome"""
+    user = get_user_by_discord_id(member.id)
+    if not user:
+        try:
+            user = create_user_from_discord_member(member)
+        except Exception as e:
+            return "Unable to buy you a lottery ticket"
+    try:
+        held = buy_lottery_tickets(user, game)
+    except LotteryException as e:
+        return f"Unable to buy you a lottery ticket - {e}"
+    return f"You hold {held} ticket{'s' if held > 1 else ''} in the lottery for {game.name}"
+
+
+@sync_to_async
+def async_buy_discord_member_lottery_ticket(member: DiscordMember, game: Game) -> str:
+    """Async wrapper to buy a lottery ticket for a discord member"""
+    return buy_discord_member_lottery_ticket(member, game)
+
+
 def remove_discord_member_from_game(member: DiscordMember, game: Game) -> bool:
     """Remove a discord member from a game"""
     user = get_user_by_discord_id(member.id)
@@ -2,17 +2,17 @@ from discord import Forbidden, User as DiscordUser, Member as DiscordMember
 
 from discord_bot.bot import bot
 from discord_bot.logs import logger as log
+from discord_bot.utils.outbound import Priority, async_queue_send
+from discord_bot.utils.users import member_resolver
 
 
 DISCORD_MAX_MESSAGE_LENGTH = 2000
 
 async def async_send_dm(user: DiscordUser | DiscordMember | int | str, message: str, **kwargs):
-    if type(user) == int:
-        user = await bot.get_or_fetch_user(user)
-    if type(user) == str:
-        user = await bot.get_or_fetch_user(int(user))
+    if type(user) in [int, str]:
+        user = await member_resolver.resolve(user)
     try:
-        return await user.send(message, **kwargs)
+        return await async_queue_send(user, message, priority=Priority.SIGNUP_DM, **kwargs)
     except Forbidden:
         return None
     except Exception as e:
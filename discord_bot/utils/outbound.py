@@ -0,0 +1,243 @@
+from asyncio import Event, create_task, get_running_loop, wait_for, TimeoutError
+from enum import IntEnum
+from heapq import heappush, heappop, heapify
+from itertools import count
+from time import monotonic
+
+from discord_bot.logs import logger as log
+
+
+class Priority(IntEnum):
+    """Outbound request classes, lower values are sent first"""
+
+    INTERACTION = 0
+    SIGNUP_DM = 1
+    CHANNEL_MESSAGE = 2
+    EMBED_EDIT = 3
+    HOUSEKEEPING = 4
+
+
+class RequestBudget:
+    """Token bucket limiting the rate of requests made against a single rate limit bucket"""
+
+    def __init__(self, capacity: int, period: float):
+        """initialisation function"""
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = monotonic()
+
+    def refill(self, now: float):
+        """Top up the available tokens based on the time elapsed"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Time in seconds until a request could be made against this budget"""
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        """Spend a token from the budget"""
+        self.refill(now)
+        self.tokens -= 1
+
+
+class OutboundRequest:
+    """A pending request to the discord API"""
+
+    def __init__(self, factory, priority: Priority, sequence: int, bucket: str = None, coalesce_key: str = None):
+        """initialisation function"""
+        self.factory = factory
+        self.priority = priority
+        self.sequence = sequence
+        self.bucket = bucket
+        self.coalesce_key = coalesce_key
+        self.enqueued = monotonic()
+        self.future = get_running_loop().create_future()
+
+    def __lt__(self, other):
+        """Requests are ordered by priority class and then by arrival"""
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class OutboundQueue:
+    """Central priority queue for requests made to discord, with per bucket budgeting and edit coalescing"""
+
+    # Discord allows roughly 5 requests per 5 seconds for most per-channel routes, and 50 per second globally
+    bucket_capacity = 5
+    bucket_period = 5.0
+    global_capacity = 40
+    global_period = 1.0
+    metrics_interval = 300
+
+    def __init__(self, workers: int = 4):
+        """initialisation function"""
+        self.worker_count = workers
+        self.workers = []
+        self.heap = []
+        self.pending = {}
+        self.buckets = {}
+        self.global_budget = None
+        self.sequence = count()
+        self.wakeup = Event()
+        self.metrics = {priority: self.empty_metrics() for priority in Priority}
+        self.metrics_logged = monotonic()
+
+    def __len__(self):
+        """Number of requests waiting to be sent"""
+        return len(self.heap)
+
+    @staticmethod
+    def empty_metrics() -> dict:
+        return {"submitted": 0, "coalesced": 0, "completed": 0, "failed": 0, "wait_total": 0.0, "wait_max": 0.0}
+
+    def start(self):
+        """Start the worker tasks on the running event loop, if not already running"""
+        self.workers = [worker for worker in self.workers if not worker.done()]
+        if not self.global_budget:
+            self.global_budget = RequestBudget(self.global_capacity, self.global_period)
+        while len(self.workers) < self.worker_count:
+            self.workers.append(create_task(self.worker()))
+
+    def submit(self, factory, priority: Priority, bucket: str = None, coalesce_key: str = None):
+        """Add a request to the queue, returning a future for its result. Factory must return a new awaitable"""
+        self.start()
+        self.metrics[priority]["submitted"] += 1
+
+        existing = self.pending.get(coalesce_key) if coalesce_key else None
+        if existing:
+            # The queued request hasn't been sent yet, so only the most recent version needs to be sent
+            existing.factory = factory
+            self.metrics[existing.priority]["coalesced"] += 1
+            if priority < existing.priority:
+                existing.priority = priority
+                heapify(self.heap)
+            return existing.future
+
+        request = OutboundRequest(factory, priority, next(self.sequence), bucket, coalesce_key)
+        if coalesce_key:
+            self.pending[coalesce_key] = request
+        heappush(self.heap, request)
+        self.wakeup.set()
+        return request.future
+
+    async def request(self, factory, priority: Priority, bucket: str = None, coalesce_key: str = None):
+        """Queue a request and wait for its result"""
+        return await self.submit(factory, priority, bucket, coalesce_key)
+
+    # ######################################################################## #
+    def get_budget(self, bucket: str) -> RequestBudget:
+        """Get (or create) the budget for a rate limit bucket"""
+        if bucket not in self.buckets:
+            self.buckets[bucket] = RequestBudget(self.bucket_capacity, self.bucket_period)
+        return self.buckets[bucket]
+
+    def take_next(self) -> tuple[OutboundRequest | None, float | None]:
+        """Get the highest priority request with budget available, or the time to wait until one is"""
+        now = monotonic()
+        if self.global_budget.delay(now):
+            return None, self.global_budget.delay(now)
+
+        skipped = []
+        selected = None
+        wait = None
+        while self.heap:
+            request = heappop(self.heap)
+            delay = self.get_budget(request.bucket).delay(now) if request.bucket else 0.0
+            if not delay:
+                selected = request
+                break
+            skipped.append(request)
+            wait = delay if wait is None else min(wait, delay)
+        for request in skipped:
+            heappush(self.heap, request)
+
+        if selected:
+            self.global_budget.consume(now)
+            if selected.bucket:
+                self.get_budget(selected.bucket).consume(now)
+            if selected.coalesce_key:
+                self.pending.pop(selected.coalesce_key, None)
+        return selected, wait
+
+    def record(self, request: OutboundRequest, started: float, failed: bool):
+        """Update the metrics for a completed request"""
+        metrics = self.metrics[request.priority]
+        waited = started - request.enqueued
+        metrics["failed" if failed else "completed"] += 1
+        metrics["wait_total"] += waited
+        metrics["wait_max"] = max(metrics["wait_max"], waited)
+
+        if started - self.metrics_logged > self.metrics_interval:
+            self.metrics_logged = started
+            log.debug(f"[.] Outbound queue status: {self.get_metrics()}")
+
+    def get_metrics(self) -> dict:
+        """Summarise queue depth and wait times for each priority class"""
+        summary = {}
+        for priority, metrics in self.metrics.items():
+            finished = metrics["completed"] + metrics["failed"]
+            summary[priority.name] = {
+                "depth": len([request for request in self.heap if request.priority == priority]),
+                "submitted": metrics["submitted"],
+                "coalesced": metrics["coalesced"],
+                "completed": metrics["completed"],
+                "failed": metrics["failed"],
+                "wait_avg": round(metrics["wait_total"] / finished, 3) if finished else 0.0,
+                "wait_max": round(metrics["wait_max"], 3),
+            }
+        return summary
+
+    async def worker(self):
+        """Send queued requests in priority order for as long as the bot is running"""
+        while True:
+            request, wait = self.take_next()
+            if not request:
+                self.wakeup.clear()
+                try:
+                    await wait_for(self.wakeup.wait(), wait)
+                except TimeoutError:
+                    pass  # budget has been replenished
+                continue
+
+            started = monotonic()
+            try:
+                result = await request.factory()
+                if not request.future.done():
+                    request.future.set_result(result)
+                self.record(request, started, failed=False)
+            except Exception as e:
+                if not request.future.done():
+                    request.future.set_exception(e)
+                self.record(request, started, failed=True)
+
+
+outbound_queue = OutboundQueue()
+
+
+# ######################################################################## #
+async def async_queue_send(target, *args, priority: Priority = Priority.CHANNEL_MESSAGE, **kwargs):
+    """Send a message to a channel or user via the outbound queue"""
+    bucket = f"channel-{target.id}"
+    return await outbound_queue.request(lambda: target.send(*args, **kwargs), priority, bucket)
+
+
+async def async_queue_edit(message, priority: Priority = Priority.EMBED_EDIT, **kwargs):
+    """Edit a message via the outbound queue, pending edits to the same message are merged"""
+    bucket = f"channel-{message.channel.id}"
+    coalesce_key = f"edit-{message.id}"
+    return await outbound_queue.request(lambda: message.edit(**kwargs), priority, bucket, coalesce_key)
+
+
+async def async_queue_delete(message, priority: Priority = Priority.HOUSEKEEPING):
+    """Delete a message via the outbound queue"""
+    bucket = f"channel-{message.channel.id}"
+    return await outbound_queue.request(lambda: message.delete(), priority, bucket)
+
+
+async def async_queue_call(factory, priority: Priority, bucket: str = None, coalesce_key: str = None):
+    """Make an arbitrary discord request via the outbound queue"""
+    return await outbound_queue.request(factory, priority, bucket, coalesce_key)
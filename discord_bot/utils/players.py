@@ -6,6 +6,7 @@ from core.utils.games import check_game_pending, async_get_player_list, async_ge
 from discord_bot.utils.channel import async_get_game_channel_for_game
 from core.utils.players import async_populate_game_from_waitlist, async_get_user_from_player
 from core.utils.channel_members import async_add_user_to_game_channel
+from core.utils.lottery import async_draw_lottery
 from core.errors import ChannelError
 
 from discord_bot.logs import logger as log
@@ -31,6 +32,19 @@ async def async_do_waitlist_updates(game):
             await async_send_dm(user.discord_id, message)
 
 
+async def async_do_lottery_draw(lottery):
+    """Draw the winners of a lottery and let each entrant know where they ended up"""
+    game = lottery.game
+    players = await async_draw_lottery(lottery)
+    for player in players:
+        if player.standby:
+            message = f"You were drawn for a place in the waitlist for {game.name} {discord_countdown(game.datetime)}"
+        else:
+            message = f"You won a place in the lottery for {game.name} {discord_countdown(game.datetime)}!"
+        await async_send_dm(player.discord_id, message)
+    return players
+
+
 async def async_get_party_for_game(game, include_waitlist=False):
     """Get a list of all players who are part of the game's party"""
     party = await async_get_player_list(game)
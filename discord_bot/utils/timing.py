@@ -0,0 +1,44 @@
+from time import monotonic
+
+from discord_bot.logs import logger as log
+
+
+class StartupTimer:
+    """Record how long after process start each stage of bot startup was reached"""
+
+    def __init__(self, *required: str):
+        """initialisation function"""
+        self.started = monotonic()
+        self.required = set(required)
+        self.events = {}
+        self.serviceable = None
+
+    def mark(self, event: str) -> float:
+        """Record the time a startup stage was reached, only the first occurence of each stage is kept"""
+        if event in self.events:
+            return self.events[event]
+        elapsed = monotonic() - self.started
+        self.events[event] = elapsed
+        log.info(f"[+] Startup: {event} after {elapsed:.2f}s")
+
+        if self.serviceable is None and self.required.issubset(self.events):
+            self.serviceable = elapsed
+            log.info(f"[+] Startup: all interactions serviceable after {elapsed:.2f}s")
+        return elapsed
+
+    def get_report(self) -> list[str]:
+        """Summarise the startup stages reached so far, in the order they occured"""
+        report = [f"{event}: {elapsed:.2f}s" for event, elapsed in sorted(self.events.items(), key=lambda e: e[1])]
+        if self.serviceable is not None:
+            report.append(f"Interactions serviceable: {self.serviceable:.2f}s")
+        else:
+            waiting = ", ".join(sorted(self.required.difference(self.events)))
+            report.append(f"Interactions not yet serviceable, waiting for: {waiting}")
+        return report
+
+
+# Buttons on existing messages work once the persistent views for both announcements and game channels are registered
+ANNOUNCEMENT_VIEWS_REGISTERED = "Announcement views registered"
+MUSTERING_VIEWS_REGISTERED = "Mustering views registered"
+
+startup_timer = StartupTimer(ANNOUNCEMENT_VIEWS_REGISTERED, MUSTERING_VIEWS_REGISTERED)
@@ -1,14 +1,92 @@
+from collections import OrderedDict
+from time import monotonic
+
+from discord import User as DiscordUser, Member as DiscordMember
+
 from discord_bot.bot import bot
+from discord_bot.logs import logger as log
 
 
-async def async_get_username_for_discord_id(discord_id: str) -> str | None:
-    try:
+class MemberResolver:
+    """Look up discord users from the gateway cache, only falling back to the REST API for unknown users"""
+
+    def __init__(self, max_size: int = 1000, ttl: float = 3600):
+        """initialisation function"""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.fetched = OrderedDict()
+        self.stats = {"guild": 0, "client": 0, "cache": 0, "fetched": 0, "failed": 0}
+
+    def __len__(self):
+        """Number of users held in the fetched user cache"""
+        return len(self.fetched)
+
+    def get_cached(self, discord_id: int) -> DiscordMember | DiscordUser | None:
+        """Get a user from the gateway cache or previously fetched users, without making any requests"""
+        for guild in bot.guilds:
+            member = guild.get_member(discord_id)
+            if member:
+                self.stats["guild"] += 1
+                return member
         user = bot.get_user(discord_id)
         if user:
-            return user.name
-        user = await bot.fetch_user(discord_id)
+            self.stats["client"] += 1
+            return user
+
+        entry = self.fetched.get(discord_id)
+        if entry:
+            fetched_at, user = entry
+            if monotonic() - fetched_at < self.ttl:
+                self.fetched.move_to_end(discord_id)
+                self.stats["cache"] += 1
+                return user
+            del self.fetched[discord_id]
+        return None
+
+    def store(self, discord_id: int, user: DiscordUser):
+        """Add a fetched user to the cache, evicting the least recently used if full"""
+        self.fetched[discord_id] = (monotonic(), user)
+        self.fetched.move_to_end(discord_id)
+        while len(self.fetched) > self.max_size:
+            self.fetched.popitem(last=False)
+
+    async def resolve(self, discord_id: int | str) -> DiscordMember | DiscordUser | None:
+        """Get a discord user (as a guild member where possible) by their ID"""
+        if not discord_id:
+            return None
+        discord_id = int(discord_id)
+        user = self.get_cached(discord_id)
         if user:
-            return user.name
-    except Exception as e:
-        print(e)
+            return user
+
+        try:
+            user = await bot.fetch_user(discord_id)
+            self.stats["fetched"] += 1
+            self.store(discord_id, user)
+            return user
+        except Exception as e:
+            self.stats["failed"] += 1
+            log.debug(f"[.] Unable to fetch discord user {discord_id}: {e}")
+        return None
+
+    def get_stats(self) -> dict:
+        """Get the lookup counters, along with the overall cache hit rate"""
+        hits = self.stats["guild"] + self.stats["client"] + self.stats["cache"]
+        misses = self.stats["fetched"] + self.stats["failed"]
+        total = hits + misses
+        return {**self.stats, "hits": hits, "misses": misses, "hit_rate": round(hits / total, 3) if total else 0.0}
+
+
+member_resolver = MemberResolver()
+
+
+async def async_get_discord_user(discord_id: int | str) -> DiscordMember | DiscordUser | None:
+    """Get a discord user by their ID, from the cache where possible"""
+    return await member_resolver.resolve(discord_id)
+
+
+async def async_get_username_for_discord_id(discord_id: str) -> str | None:
+    user = await member_resolver.resolve(discord_id)
+    if user:
+        return user.name
     return None
@@ -1,6 +1,65 @@
+from enum import Enum
+
 from discord_bot.bot import bot
 
 
-def add_persistent_view(view):
+class ViewType(Enum):
+    MUSTERING = 1
+    CONTROL = 2
+
+
+class ViewRegistry:
+    """Index of the persistent views attached to game messages, keyed by game ID and view type"""
+
+    def __init__(self):
+        """initialisation function"""
+        self.views = {}
+
+    def __len__(self):
+        """Number of views currently registered"""
+        return len(self.views)
+
+    def register(self, view, view_type: ViewType):
+        """Register a view with the bot, replacing any existing view of the same type for that game"""
+        key = (view.game.pk, view_type)
+        existing = self.views.get(key)
+        if existing is view:
+            return view
+        if existing:
+            # stopped views are pruned by the bot's view store the next time it is modified
+            existing.stop()
+        self.views[key] = view
+        bot.add_view(view)
+        return view
+
+    def unregister(self, game_id: int, view_type: ViewType = None) -> int:
+        """Stop and remove the views for a game, optionally only those of a specific type"""
+        view_types = [view_type] if view_type else list(ViewType)
+        removed = 0
+        for current_type in view_types:
+            view = self.views.pop((game_id, current_type), None)
+            if view:
+                view.stop()
+                removed += 1
+        return removed
+
+    def get(self, game_id: int, view_type: ViewType):
+        """Get the registered view of the specified type for a game"""
+        return self.views.get((game_id, view_type))
+
+    def all(self) -> list:
+        """Get all registered views"""
+        return list(self.views.values())
+
+
+view_registry = ViewRegistry()
+
+
+def add_persistent_view(view, view_type: ViewType):
     """Register a persistent view with the bot"""
-    bot.add_view(view)
+    return view_registry.register(view, view_type)
+
+
+def remove_persistent_views(game_id: int, view_type: ViewType = None) -> int:
+    """Unregister the persistent views for a game which is no longer displayed"""
+    return view_registry.unregister(game_id, view_type)